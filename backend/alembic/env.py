@@ -1,3 +1,5 @@
+import os
+import sys
 from logging.config import fileConfig
 
 from sqlalchemy import engine_from_config
@@ -5,6 +7,11 @@ from sqlalchemy import pool
 
 from alembic import context
 
+# Make the `backend` package importable when alembic runs from backend/
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from backend.app.database import SQLALCHEMY_DATABASE_URL
+from backend.app.models import SQLModel
+
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
 config = context.config
@@ -14,11 +21,20 @@ config = context.config
 if config.config_file_name is not None:
     fileConfig(config.config_file_name)
 
+# The application decides which database to migrate
+config.set_main_option("sqlalchemy.url", SQLALCHEMY_DATABASE_URL)
+
 # add your model's MetaData object here
 # for 'autogenerate' support
 # from myapp import mymodel
 # target_metadata = mymodel.Base.metadata
-target_metadata = None
+target_metadata = SQLModel.metadata
+
+from backend.app.fts import is_search_table
+
+# The FTS5 tables are managed by their own migration, not autogenerate
+def include_name(name, type_, parent_names):
+    return not (type_ == "table" and is_search_table(name))
 
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
@@ -44,6 +60,8 @@ def run_migrations_offline() -> None:
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
+        render_as_batch=True,
+        include_name=include_name,
     )
 
     with context.begin_transaction():
@@ -65,7 +83,11 @@ def run_migrations_online() -> None:
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection,
+            target_metadata=target_metadata,
+            # SQLite can only alter tables by copying them
+            render_as_batch=True,
+            include_name=include_name,
         )
 
         with context.begin_transaction():
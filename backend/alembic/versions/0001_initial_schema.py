@@ -0,0 +1,110 @@
+"""initial schema
+
+Revision ID: 0001
+Revises: 
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Tables as created by SQLModel.metadata.create_all before migrations existed.
+    # Databases created that way should be stamped with `alembic stamp 0001`.
+    op.create_table(
+        'patients',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('study_code', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('abbreviation_name', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('year_of_birth', sa.Integer(), nullable=False),
+        sa.Column('gender', sa.Enum('male', 'female', name='genderenum'), nullable=False),
+        sa.Column('status', sa.Enum('active', 'inactive', name='statusenum'), nullable=False),
+        sa.Column('summary', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_patients_study_code', 'patients', ['study_code'], unique=True)
+    op.create_table(
+        'possible_reasons',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('reason', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('reason'),
+    )
+    op.create_table(
+        'events',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('event', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('event'),
+    )
+    op.create_table(
+        'system_log',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('email_mode', sa.Boolean(), nullable=False),
+        sa.Column('change_email_mode_timestamp', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_table(
+        'patient_day_records',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('patient_id', sa.Integer(), nullable=False),
+        sa.Column('date_of_alert', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column('time_of_alert', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column('date_of_assessment', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column('time_of_assessment', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column('possible_reason_id', sa.Integer(), nullable=True),
+        sa.Column('new_information', sa.Integer(), nullable=True),
+        sa.Column('expected_alert', sa.Integer(), nullable=True),
+        sa.Column('event_at_alert_id', sa.Integer(), nullable=True),
+        sa.Column('event_during_24_hours', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column('notes', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.ForeignKeyConstraint(['patient_id'], ['patients.id']),
+        sa.ForeignKeyConstraint(['possible_reason_id'], ['possible_reasons.id']),
+        sa.ForeignKeyConstraint(['event_at_alert_id'], ['events.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_table(
+        'model_log',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('patient_id', sa.Integer(), nullable=False),
+        sa.Column('content', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('raw_content', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('date', sa.Date(), nullable=False),
+        sa.Column('time', sa.Time(), nullable=False),
+        sa.Column('ack', sa.Boolean(), nullable=False),
+        sa.ForeignKeyConstraint(['patient_id'], ['patients.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_table(
+        'pipeline_log',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('patient_id', sa.Integer(), nullable=False),
+        sa.Column('date', sa.Date(), nullable=False),
+        sa.Column('time', sa.Time(), nullable=False),
+        sa.Column('content', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('raw_content', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.ForeignKeyConstraint(['patient_id'], ['patients.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('pipeline_log')
+    op.drop_table('model_log')
+    op.drop_table('patient_day_records')
+    op.drop_table('system_log')
+    op.drop_table('events')
+    op.drop_table('possible_reasons')
+    op.drop_index('ix_patients_study_code', table_name='patients')
+    op.drop_table('patients')
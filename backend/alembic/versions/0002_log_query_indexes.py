@@ -0,0 +1,31 @@
+"""indexes for the per-patient log and day record queries
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 09:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_model_log_patient_id_date_time', 'model_log', ['patient_id', 'date', 'time'])
+    op.create_index('ix_pipeline_log_patient_id_date_time', 'pipeline_log', ['patient_id', 'date', 'time'])
+    op.create_index('ix_patient_day_records_patient_id', 'patient_day_records', ['patient_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_patient_day_records_patient_id', table_name='patient_day_records')
+    op.drop_index('ix_pipeline_log_patient_id_date_time', table_name='pipeline_log')
+    op.drop_index('ix_model_log_patient_id_date_time', table_name='model_log')
@@ -0,0 +1,28 @@
+"""partial index over unacknowledged model logs for the patient stats listing
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_model_log_patient_id_unacked', 'model_log', ['patient_id'], unique=False,
+                    sqlite_where=sa.text('ack = 0'))
+
+
+def downgrade() -> None:
+    op.drop_index('ix_model_log_patient_id_unacked', table_name='model_log')
@@ -0,0 +1,57 @@
+"""association table between day records and their events during the 24 hours
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'patient_day_record_events',
+        sa.Column('record_id', sa.Integer(), nullable=False),
+        sa.Column('event_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['record_id'], ['patient_day_records.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['event_id'], ['events.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('record_id', 'event_id'),
+    )
+    op.create_index('ix_patient_day_record_events_event_id_record_id', 'patient_day_record_events',
+                    ['event_id', 'record_id'], unique=False)
+
+    # Link existing records to the events named in their comma-separated
+    # string, the same way crud does on create/update. Names that are not
+    # an event are left in the string only.
+    bind = op.get_bind()
+    event_ids = dict(bind.execute(sa.text('SELECT event, id FROM events')).all())
+    records = bind.execute(sa.text(
+        "SELECT id, event_during_24_hours FROM patient_day_records "
+        "WHERE event_during_24_hours IS NOT NULL AND event_during_24_hours != ''"
+    ))
+    insert = sa.text('INSERT INTO patient_day_record_events (record_id, event_id) VALUES (:record_id, :event_id)')
+    while rows := records.fetchmany(10_000):
+        links = [
+            {'record_id': record_id, 'event_id': event_ids[name]}
+            for record_id, value in rows
+            for name in {name.strip() for name in value.split(',')}
+            if name in event_ids
+        ]
+        if links:
+            bind.execute(insert, links)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_patient_day_record_events_event_id_record_id', table_name='patient_day_record_events')
+    op.drop_table('patient_day_record_events')
@@ -0,0 +1,50 @@
+"""FTS5 full-text indexes over model/pipeline log text and day record notes
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# FTS table -> (source table, indexed columns), as in backend/app/fts.py
+FTS_TABLES = {
+    'model_log_fts': ('model_log', ('content', 'raw_content')),
+    'pipeline_log_fts': ('pipeline_log', ('content',)),
+    'patient_day_record_notes_fts': ('patient_day_records', ('notes',)),
+}
+
+
+def upgrade() -> None:
+    for fts, (table, columns) in FTS_TABLES.items():
+        names = ', '.join(columns)
+        new = ', '.join(f'new.{column}' for column in columns)
+        old = ', '.join(f'old.{column}' for column in columns)
+        op.execute(f"CREATE VIRTUAL TABLE {fts} USING fts5({names}, content='{table}', content_rowid='id')")
+        op.execute(f'CREATE TRIGGER {fts}_ai AFTER INSERT ON {table} BEGIN '
+                   f'INSERT INTO {fts}(rowid, {names}) VALUES (new.id, {new}); END')
+        op.execute(f'CREATE TRIGGER {fts}_ad AFTER DELETE ON {table} BEGIN '
+                   f"INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.id, {old}); END")
+        op.execute(f'CREATE TRIGGER {fts}_au AFTER UPDATE OF {names} ON {table} BEGIN '
+                   f"INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.id, {old}); "
+                   f'INSERT INTO {fts}(rowid, {names}) VALUES (new.id, {new}); END')
+        # Index the rows already in the table
+        op.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    for fts in FTS_TABLES:
+        for suffix in ('ai', 'ad', 'au'):
+            op.execute(f'DROP TRIGGER IF EXISTS {fts}_{suffix}')
+        op.execute(f'DROP TABLE IF EXISTS {fts}')
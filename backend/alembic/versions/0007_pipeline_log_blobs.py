@@ -0,0 +1,70 @@
+"""shared, reference-counted blobs for deduplicated pipeline log payloads
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# As in backend/app/dedup.py
+TRIGGERS = [
+    "CREATE TRIGGER log_blobs_pipeline_log_ai AFTER INSERT ON pipeline_log "
+    "WHEN new.raw_content_hash IS NOT NULL BEGIN "
+    "UPDATE log_blobs SET refcount = refcount + 1 WHERE hash = new.raw_content_hash; END",
+    "CREATE TRIGGER log_blobs_pipeline_log_ad AFTER DELETE ON pipeline_log "
+    "WHEN old.raw_content_hash IS NOT NULL BEGIN "
+    "UPDATE log_blobs SET refcount = refcount - 1 WHERE hash = old.raw_content_hash; "
+    "DELETE FROM log_blobs WHERE hash = old.raw_content_hash AND refcount <= 0; END",
+    "CREATE TRIGGER log_blobs_pipeline_log_au AFTER UPDATE OF raw_content_hash ON pipeline_log "
+    "WHEN old.raw_content_hash IS NOT new.raw_content_hash BEGIN "
+    "UPDATE log_blobs SET refcount = refcount + 1 WHERE hash = new.raw_content_hash; "
+    "UPDATE log_blobs SET refcount = refcount - 1 WHERE hash = old.raw_content_hash; "
+    "DELETE FROM log_blobs WHERE hash = old.raw_content_hash AND refcount <= 0; END",
+]
+
+
+def upgrade() -> None:
+    op.create_table('log_blobs',
+    sa.Column('hash', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('content', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('size', sa.Integer(), nullable=False),
+    sa.Column('refcount', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('hash')
+    )
+    # SQLite accepts an inline REFERENCES on ADD COLUMN for a column that
+    # defaults to NULL, so the (large) table is not rebuilt as batch mode would
+    op.execute('ALTER TABLE pipeline_log ADD COLUMN raw_content_hash VARCHAR REFERENCES log_blobs (hash)')
+    for statement in TRIGGERS:
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    for suffix in ('ai', 'ad', 'au'):
+        op.execute(f'DROP TRIGGER IF EXISTS log_blobs_pipeline_log_{suffix}')
+    # Put deduplicated payloads back inline before dropping the blobs
+    op.execute("UPDATE pipeline_log SET raw_content = (SELECT content FROM log_blobs WHERE hash = raw_content_hash) "
+               "WHERE raw_content_hash IS NOT NULL")
+    with op.batch_alter_table('pipeline_log') as batch_op:
+        batch_op.drop_column('raw_content_hash')
+    op.drop_table('log_blobs')
+    # Rebuilding the table dropped its full-text triggers (see 0006); ids are
+    # kept, so the index itself is still valid
+    op.execute('CREATE TRIGGER pipeline_log_fts_ai AFTER INSERT ON pipeline_log BEGIN '
+               'INSERT INTO pipeline_log_fts(rowid, content) VALUES (new.id, new.content); END')
+    op.execute('CREATE TRIGGER pipeline_log_fts_ad AFTER DELETE ON pipeline_log BEGIN '
+               "INSERT INTO pipeline_log_fts(pipeline_log_fts, rowid, content) VALUES ('delete', old.id, old.content); END")
+    op.execute('CREATE TRIGGER pipeline_log_fts_au AFTER UPDATE OF content ON pipeline_log BEGIN '
+               "INSERT INTO pipeline_log_fts(pipeline_log_fts, rowid, content) VALUES ('delete', old.id, old.content); "
+               'INSERT INTO pipeline_log_fts(rowid, content) VALUES (new.id, new.content); END')
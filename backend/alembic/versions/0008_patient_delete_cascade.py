@@ -0,0 +1,89 @@
+"""ON DELETE CASCADE from patients to their records and logs; soft-delete column
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0008'
+down_revision: Union[str, None] = '0007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# The foreign keys were created unnamed; this names them on reflection so
+# batch mode can drop them
+NAMING_CONVENTION = {'fk': 'fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s'}
+
+CHILD_TABLES = ('patient_day_records', 'model_log', 'pipeline_log')
+
+# FTS table -> (source table, indexed columns), as in backend/app/fts.py
+FTS_TABLES = {
+    'model_log_fts': ('model_log', ('content', 'raw_content')),
+    'patient_day_record_notes_fts': ('patient_day_records', ('notes',)),
+    'pipeline_log_fts': ('pipeline_log', ('content',)),
+}
+
+# As in backend/app/dedup.py
+BLOB_TRIGGERS = [
+    "CREATE TRIGGER log_blobs_pipeline_log_ai AFTER INSERT ON pipeline_log "
+    "WHEN new.raw_content_hash IS NOT NULL BEGIN "
+    "UPDATE log_blobs SET refcount = refcount + 1 WHERE hash = new.raw_content_hash; END",
+    "CREATE TRIGGER log_blobs_pipeline_log_ad AFTER DELETE ON pipeline_log "
+    "WHEN old.raw_content_hash IS NOT NULL BEGIN "
+    "UPDATE log_blobs SET refcount = refcount - 1 WHERE hash = old.raw_content_hash; "
+    "DELETE FROM log_blobs WHERE hash = old.raw_content_hash AND refcount <= 0; END",
+    "CREATE TRIGGER log_blobs_pipeline_log_au AFTER UPDATE OF raw_content_hash ON pipeline_log "
+    "WHEN old.raw_content_hash IS NOT new.raw_content_hash BEGIN "
+    "UPDATE log_blobs SET refcount = refcount + 1 WHERE hash = new.raw_content_hash; "
+    "UPDATE log_blobs SET refcount = refcount - 1 WHERE hash = old.raw_content_hash; "
+    "DELETE FROM log_blobs WHERE hash = old.raw_content_hash AND refcount <= 0; END",
+]
+
+
+# Rebuilding a table drops its triggers: the full-text ones (see 0006) and
+# pipeline_log's blob reference counts (see 0007). Ids are kept, so the
+# indexes and counts themselves are still valid.
+def _recreate_triggers() -> None:
+    for fts, (table, columns) in FTS_TABLES.items():
+        names = ', '.join(columns)
+        new = ', '.join(f'new.{column}' for column in columns)
+        old = ', '.join(f'old.{column}' for column in columns)
+        op.execute(f'CREATE TRIGGER {fts}_ai AFTER INSERT ON {table} BEGIN '
+                   f'INSERT INTO {fts}(rowid, {names}) VALUES (new.id, {new}); END')
+        op.execute(f'CREATE TRIGGER {fts}_ad AFTER DELETE ON {table} BEGIN '
+                   f"INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.id, {old}); END")
+        op.execute(f'CREATE TRIGGER {fts}_au AFTER UPDATE OF {names} ON {table} BEGIN '
+                   f"INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.id, {old}); "
+                   f'INSERT INTO {fts}(rowid, {names}) VALUES (new.id, {new}); END')
+    for statement in BLOB_TRIGGERS:
+        op.execute(statement)
+
+
+# The migration connection does not turn foreign keys on, so dropping the
+# old copy of a table cascades nowhere
+def _replace_patient_foreign_keys(ondelete) -> None:
+    for table in CHILD_TABLES:
+        name = f'fk_{table}_patient_id_patients'
+        with op.batch_alter_table(table, recreate='always', naming_convention=NAMING_CONVENTION) as batch_op:
+            batch_op.drop_constraint(name, type_='foreignkey')
+            batch_op.create_foreign_key(name, 'patients', ['patient_id'], ['id'], ondelete=ondelete)
+    _recreate_triggers()
+
+
+def upgrade() -> None:
+    op.add_column('patients', sa.Column('deleted_at', sa.DateTime(), nullable=True))
+    _replace_patient_foreign_keys('CASCADE')
+
+
+def downgrade() -> None:
+    _replace_patient_foreign_keys(None)
+    with op.batch_alter_table('patients') as batch_op:
+        batch_op.drop_column('deleted_at')
@@ -0,0 +1,42 @@
+"""Version counters on patients and day records for optimistic PATCH updates
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18 22:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0009'
+down_revision: Union[str, None] = '0008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+VERSIONED_TABLES = ('patients', 'patient_day_records')
+
+
+def upgrade() -> None:
+    # Existing rows start at version 1
+    for table in VERSIONED_TABLES:
+        op.add_column(table, sa.Column('version', sa.Integer(), nullable=False, server_default='1'))
+
+
+def downgrade() -> None:
+    for table in VERSIONED_TABLES:
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('version')
+    # Rebuilding patient_day_records dropped its full-text triggers (see 0006)
+    fts = 'patient_day_record_notes_fts'
+    op.execute(f'CREATE TRIGGER {fts}_ai AFTER INSERT ON patient_day_records BEGIN '
+               f'INSERT INTO {fts}(rowid, notes) VALUES (new.id, new.notes); END')
+    op.execute(f'CREATE TRIGGER {fts}_ad AFTER DELETE ON patient_day_records BEGIN '
+               f"INSERT INTO {fts}({fts}, rowid, notes) VALUES ('delete', old.id, old.notes); END")
+    op.execute(f'CREATE TRIGGER {fts}_au AFTER UPDATE OF notes ON patient_day_records BEGIN '
+               f"INSERT INTO {fts}({fts}, rowid, notes) VALUES ('delete', old.id, old.notes); "
+               f'INSERT INTO {fts}(rowid, notes) VALUES (new.id, new.notes); END')
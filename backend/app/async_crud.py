@@ -0,0 +1,17 @@
+from starlette.concurrency import run_in_threadpool
+from sqlmodel.ext.asyncio.session import AsyncSession
+from backend.app.database import AnySession
+
+# Awaitable access to the functions in crud.py for the async routers.
+#
+# crud.py stays the single implementation and keeps serving scripts such as
+# create_db.py. With an AsyncSession the function runs through run_sync, so
+# its queries go through aiosqlite without occupying a worker thread; with a
+# plain Session (DB_ASYNC=0) it runs in Starlette's threadpool as before.
+#
+#     patient = await call(crud.get_patient_by_id, db, patient_id=patient_id)
+
+async def call(fn, db: AnySession, *args, **kwargs):
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(lambda session: fn(*args, db=session, **kwargs))
+    return await run_in_threadpool(fn, *args, db=db, **kwargs)
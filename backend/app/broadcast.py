@@ -0,0 +1,99 @@
+import asyncio
+import json
+from datetime import date, datetime, time
+from typing import Iterable, Optional
+
+# In-process fan-out of server events to Server-Sent Events clients.
+#
+# Each connected client owns a Subscription with a bounded queue. Events are
+# encoded once and pushed to the subscribers of their patient plus everyone
+# subscribed to all patients; events without a patient (model status) go to
+# every subscriber. publish() may be called from the event loop or from a
+# threadpool thread, and is a no-op in scripts that never start the app.
+#
+# The hub lives in one process. Model status and model log events are found
+# by watchers that poll the database (model_status.watch_heartbeats,
+# stream.watch_model_logs), so each worker's clients also see what was written
+# through the other workers.
+
+QUEUE_SIZE = 100
+
+def _json_default(value):
+    if isinstance(value, (date, time, datetime)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+def format_sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=_json_default, separators=(',', ':'))}\n\n"
+
+class Subscription:
+    def __init__(self, patient_ids: Optional[frozenset[int]]):
+        self.patient_ids = patient_ids
+        self.queue: asyncio.Queue[str] = asyncio.Queue(QUEUE_SIZE)
+
+    def offer(self, message: str):
+        # A client that stopped reading loses its oldest events, not newer ones
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(message)
+
+class Hub:
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._everything: set[Subscription] = set()
+        self._by_patient: dict[int, set[Subscription]] = {}
+
+    # Called on app startup with the loop that serves the stream endpoint
+    def bind(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._everything) + len({s for subs in self._by_patient.values() for s in subs})
+
+    # Patients someone follows, or None when a subscriber follows all of them
+    def watched_patients(self) -> Optional[set[int]]:
+        return None if self._everything else set(self._by_patient)
+
+    def subscribe(self, patient_ids: Optional[Iterable[int]] = None) -> Subscription:
+        subscription = Subscription(frozenset(patient_ids) if patient_ids else None)
+        if subscription.patient_ids is None:
+            self._everything.add(subscription)
+        else:
+            for patient_id in subscription.patient_ids:
+                self._by_patient.setdefault(patient_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        if subscription.patient_ids is None:
+            self._everything.discard(subscription)
+            return
+        for patient_id in subscription.patient_ids:
+            subscribers = self._by_patient.get(patient_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._by_patient[patient_id]
+
+    def publish(self, event: str, data: dict, patient_id: Optional[int] = None):
+        if self._loop is None or self._loop.is_closed() or not (self._everything or self._by_patient):
+            return
+        message = format_sse(event, data)
+        try:
+            on_loop = asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            on_loop = False
+        if on_loop:
+            self._deliver(message, patient_id)
+        else:
+            self._loop.call_soon_threadsafe(self._deliver, message, patient_id)
+
+    def _deliver(self, message: str, patient_id: Optional[int]):
+        if patient_id is None:
+            targets = self._everything.union(*self._by_patient.values())
+        else:
+            targets = self._everything.union(self._by_patient.get(patient_id, ()))
+        for subscription in targets:
+            subscription.offer(message)
+
+hub = Hub()
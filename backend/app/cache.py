@@ -0,0 +1,72 @@
+import hashlib
+import json
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+from sqlmodel import Session, select
+from backend.app.config import get_settings
+from backend.app.models import PossibleReason, Event
+
+# In-process cache of the option tables (possible reasons, events).
+#
+# These tables are read by every form and patient page but change rarely, so
+# each one is held as an immutable snapshot. The CRUD functions that write
+# them call invalidate() after committing. The version is a hash of the
+# content, so every worker hands out the same version and ETag for the same
+# data; the TTL bounds how long a worker can serve data another worker has
+# since changed.
+
+@dataclass(frozen=True)
+class Snapshot:
+    # Hash of the rows; changes whenever they do, but has no order
+    version: str
+    etag: str
+    rows: tuple
+
+    # Rows after `after_id` in id order, like the uncached listing queries
+    def page(self, after_id: Optional[int] = None, limit: Optional[int] = None) -> list:
+        rows = [row for row in self.rows if after_id is None or row.id > after_id]
+        return rows if limit is None else rows[:limit]
+
+class TableCache:
+    def __init__(self, model, ttl_seconds: float):
+        self.model = model
+        self.ttl_seconds = ttl_seconds
+        # Bumped by every invalidate(), so a load that raced a write is dropped
+        self._generation = 0
+        self._snapshot: Optional[Snapshot] = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    # The current snapshot, or None if it has to be (re)loaded
+    def fresh(self) -> Optional[Snapshot]:
+        snapshot = self._snapshot
+        if snapshot is None or time.monotonic() - self._loaded_at > self.ttl_seconds:
+            return None
+        return snapshot
+
+    def load(self, db: Session) -> Snapshot:
+        generation = self._generation
+        # Copies, so no request can modify or lazy-load through a cached row
+        rows = tuple(self.model(**row.model_dump()) for row in db.exec(select(self.model).order_by(self.model.id)))
+        payload = json.dumps([row.model_dump() for row in rows], sort_keys=True, default=str)
+        version = hashlib.sha1(payload.encode()).hexdigest()[:16]
+        snapshot = Snapshot(version, f'"{self.model.__tablename__}-{version}"', rows)
+        with self._lock:
+            # A write committed while we were reading makes this snapshot stale
+            if generation == self._generation:
+                self._snapshot = snapshot
+                self._loaded_at = time.monotonic()
+        return snapshot
+
+    def get(self, db: Session) -> Snapshot:
+        return self.fresh() or self.load(db)
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self._snapshot = None
+
+possible_reasons_cache = TableCache(PossibleReason, get_settings().options_cache_ttl)
+events_cache = TableCache(Event, get_settings().options_cache_ttl)
@@ -0,0 +1,128 @@
+import os
+from dataclasses import dataclass, replace
+from functools import lru_cache
+
+# Settings read from the environment.
+# DB_PROFILE picks a named set of database defaults; any DB_* variable overrides a single value.
+
+MIB = 1024 * 1024
+
+PROFILES = {
+    # Local development: statements echoed, modest caches
+    "dev": dict(
+        echo=True,
+        pool_size=5,
+        max_overflow=10,
+        journal_mode="WAL",
+        synchronous="NORMAL",
+        busy_timeout_ms=5000,
+        cache_size_kib=16 * 1024,
+        mmap_size=0,
+        startup_mode="create",
+    ),
+    # Deployed API: no echo, larger page cache and memory-mapped reads
+    "prod": dict(
+        echo=False,
+        pool_size=10,
+        max_overflow=20,
+        journal_mode="WAL",
+        synchronous="NORMAL",
+        busy_timeout_ms=5000,
+        cache_size_kib=64 * 1024,
+        mmap_size=256 * MIB,
+        startup_mode="check",
+    ),
+    # Throughput measurements on throwaway databases: durability traded for speed
+    "bench": dict(
+        echo=False,
+        pool_size=20,
+        max_overflow=40,
+        journal_mode="WAL",
+        synchronous="OFF",
+        busy_timeout_ms=10000,
+        cache_size_kib=128 * 1024,
+        mmap_size=512 * MIB,
+        startup_mode="create",
+    ),
+}
+
+STARTUP_MODES = ("create", "check")
+
+@dataclass(frozen=True)
+class Settings:
+    database_url: str = "sqlite:///./sql_app.db"
+    profile: str = "dev"
+    echo: bool = True
+    pool_size: int = 5
+    max_overflow: int = 10
+    pool_timeout: float = 30.0
+    journal_mode: str = "WAL"
+    synchronous: str = "NORMAL"
+    busy_timeout_ms: int = 5000
+    cache_size_kib: int = 16 * 1024
+    mmap_size: int = 0
+    foreign_keys: bool = True
+    # Routers talk to the database through aiosqlite instead of the threadpool
+    async_db: bool = True
+    # Where model heartbeats are kept: "sqlite" (shared by workers) or "memory"
+    heartbeat_store: str = "sqlite"
+    # Seconds a worker may serve cached option tables without rereading them
+    options_cache_ttl: float = 60.0
+    # Logs older than this many days are moved to the archive by retention.py
+    retention_days: int = 180
+    # Archive database for old logs; empty means <database>.archive.db next to the main one
+    archive_database_url: str = ""
+    # Store pipeline log payloads once per distinct content (see dedup.py)
+    pipeline_log_dedup: bool = False
+    # DELETE /api/patients/{id} withdraws the patient (reversibly) unless ?soft=false
+    patient_soft_delete: bool = False
+    # Statements taking at least this long go to the slow-query log (see slow_queries.py)
+    slow_query_ms: float = 50.0
+    # Slow statements kept in memory per worker; 0 turns the log off
+    slow_query_log_size: int = 500
+    # What a worker does with the schema on start (see startup.py): "create"
+    # runs create_all, "check" only verifies the Alembic revision
+    startup_mode: str = "create"
+
+def _env_bool(value: str) -> bool:
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+# Environment variable -> (field, parser)
+_OVERRIDES = {
+    "DATABASE_URL": ("database_url", str),
+    "DB_ECHO": ("echo", _env_bool),
+    "DB_POOL_SIZE": ("pool_size", int),
+    "DB_MAX_OVERFLOW": ("max_overflow", int),
+    "DB_POOL_TIMEOUT": ("pool_timeout", float),
+    "DB_JOURNAL_MODE": ("journal_mode", str),
+    "DB_SYNCHRONOUS": ("synchronous", str),
+    "DB_BUSY_TIMEOUT_MS": ("busy_timeout_ms", int),
+    "DB_CACHE_SIZE_KIB": ("cache_size_kib", int),
+    "DB_MMAP_SIZE": ("mmap_size", int),
+    "DB_FOREIGN_KEYS": ("foreign_keys", _env_bool),
+    "DB_ASYNC": ("async_db", _env_bool),
+    "HEARTBEAT_STORE": ("heartbeat_store", str),
+    "OPTIONS_CACHE_TTL": ("options_cache_ttl", float),
+    "RETENTION_DAYS": ("retention_days", int),
+    "ARCHIVE_DATABASE_URL": ("archive_database_url", str),
+    "PIPELINE_LOG_DEDUP": ("pipeline_log_dedup", _env_bool),
+    "PATIENT_SOFT_DELETE": ("patient_soft_delete", _env_bool),
+    "SLOW_QUERY_MS": ("slow_query_ms", float),
+    "SLOW_QUERY_LOG_SIZE": ("slow_query_log_size", int),
+    "STARTUP_MODE": ("startup_mode", str),
+}
+
+def load_settings(environ=os.environ) -> Settings:
+    profile = environ.get("DB_PROFILE", "dev")
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown DB_PROFILE {profile!r}, expected one of {sorted(PROFILES)}")
+    settings = replace(Settings(), profile=profile, **PROFILES[profile])
+    overrides = {field: parse(environ[name]) for name, (field, parse) in _OVERRIDES.items() if name in environ}
+    settings = replace(settings, **overrides)
+    if settings.startup_mode not in STARTUP_MODES:
+        raise ValueError(f"Unknown STARTUP_MODE {settings.startup_mode!r}, expected one of {list(STARTUP_MODES)}")
+    return settings
+
+@lru_cache
+def get_settings() -> Settings:
+    return load_settings()
@@ -3,15 +3,22 @@ import os
 # Add project root directory to sys.path
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../"))
 sys.path.insert(0, project_root)
-from sqlmodel import SQLModel, Session
-from backend.app.database import engine
+from sqlmodel import Session
+from backend.app.database import engine, create_tables
 from backend.app.models import PossibleReason, Event
 
 def init_db():
-    # Create tables if they do not exist
-    SQLModel.metadata.create_all(engine)
+    from backend.app.startup import SchemaDrift, stamp_unversioned
+    # Create tables if they do not exist, recording them as migrated
+    create_tables(engine)
+    try:
+        stamp_unversioned(engine)
+    except SchemaDrift as drift:
+        print(drift)
+    add_default_options()
 
-    # Add default records for PossibleReason and Event
+# Add default records for PossibleReason and Event; also run after migrations
+def add_default_options():
     with Session(engine) as session:
         # Check if the default records already exist
         default_reason = session.query(PossibleReason).filter_by(reason="reasons").first()
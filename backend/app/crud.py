@@ -1,10 +1,18 @@
 from sqlmodel import Session, select
 from backend.app.models import (
-    Patient, PatientDayRecord, PossibleReason, 
-    Event, ModelLog, PipelineLog, SystemLog
+    Patient, PatientDayRecord, PatientDayRecordEvent, PossibleReason, 
+    Event, ModelLog, PipelineLog, SystemLog,
+    ModelLogBase, PipelineLogBase, StatusEnum
 )
 from datetime import datetime,date,time
-from sqlalchemy import desc, asc
+from sqlalchemy import desc, asc, delete, insert, update, tuple_, func, literal, type_coerce, String
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
+from backend.app import dedup
+from backend.app.config import get_settings
+from backend.app.cache import possible_reasons_cache, events_cache
+from backend.app.pagination import encode_cursor, log_key
+from backend.app.schemas import PatientDashboard, PatientDayRecordRead
 
 # --- Patient CRUD Operations ---
 
@@ -14,26 +22,142 @@ def create_patient(db: Session, patient: Patient):
     db.refresh(patient)
     return patient
 
-def get_patients(db: Session, skip: int = 0, limit: int | None = None):
-    query = db.query(Patient)
-    # Apply offset
-    query = query.offset(skip)
+def get_patients(db: Session, after_id: int | None = None, limit: int | None = None):
+    query = db.query(Patient).filter(Patient.deleted_at.is_(None)).order_by(Patient.id)
+    # Continue after the last id of the previous page
+    if after_id is not None:
+        query = query.filter(Patient.id > after_id)
     # Apply limit only if provided
     if limit is not None:
         query = query.limit(limit)
     return query.all()
 
+# Only the named patient columns as rows, in that order; the id is always selected for the cursor
+def get_patient_rows(db: Session, fields: list[str], after_id: int | None = None, limit: int | None = None):
+    table = Patient.__table__
+    statement = (
+        select(*(table.c[name] for name in dict.fromkeys([*fields, "id"])))
+        .where(table.c.deleted_at.is_(None))
+        .order_by(table.c.id)
+    )
+    if after_id is not None:
+        statement = statement.where(table.c.id > after_id)
+    if limit is not None:
+        statement = statement.limit(limit)
+    return db.execute(statement).all()
+
+
+# Columns the patient stats listing can be sorted on
+PATIENT_STATS_SORTS = ("id", "study_code", "unacked_alerts", "last_alert", "day_record_count")
+
+# Patients with their unacknowledged alert count, last alert time and day
+# record count in one statement. Each table is aggregated on its own before
+# the join so log rows and day records don't multiply each other; the
+# unacked count reads only the partial ack = 0 index and the last alert is
+# one seek per patient into the (patient_id, date, time) index.
+def get_patient_stats(db: Session, status: StatusEnum | None = None, min_unacked: int | None = None,
+                      sort: str = "id", descending: bool = False, after: tuple | None = None, limit: int | None = None):
+    unacked = (
+        select(ModelLog.patient_id, func.count().label("unacked_alerts"))
+        .where(ModelLog.ack == False)  # noqa: E712 - renders "ack = 0", matching the partial index
+        .group_by(ModelLog.patient_id)
+        .subquery()
+    )
+    day_records = (
+        select(PatientDayRecord.patient_id, func.count().label("day_record_count"))
+        .group_by(PatientDayRecord.patient_id)
+        .subquery()
+    )
+    last_alert = (
+        select(type_coerce(ModelLog.date.concat(" ").concat(ModelLog.time), String))
+        .where(ModelLog.patient_id == Patient.id)
+        .order_by(desc(ModelLog.date), desc(ModelLog.time))
+        .limit(1)
+        .scalar_subquery()
+    )
+    stats = (
+        select(
+            *Patient.__table__.columns,
+            func.coalesce(unacked.c.unacked_alerts, 0).label("unacked_alerts"),
+            last_alert.label("last_alert"),
+            func.coalesce(day_records.c.day_record_count, 0).label("day_record_count"),
+        )
+        .outerjoin(unacked, unacked.c.patient_id == Patient.id)
+        .outerjoin(day_records, day_records.c.patient_id == Patient.id)
+        .where(Patient.deleted_at.is_(None))
+    )
+    if status is not None:
+        stats = stats.where(Patient.status == status)
+    stats = stats.subquery()
+
+    # Patients without alerts sort before every alert time
+    sort_key = func.coalesce(stats.c[sort], "") if sort == "last_alert" else stats.c[sort]
+    query = select(stats, sort_key.label("sort_key"))
+    if min_unacked is not None:
+        query = query.where(stats.c.unacked_alerts >= min_unacked)
+    key = tuple_(sort_key, stats.c.id)
+    # Continue after the (sort value, id) of the previous page
+    if after is not None:
+        query = query.where(key < tuple_(*after) if descending else key > tuple_(*after))
+    query = query.order_by(*(desc(c) if descending else asc(c) for c in (sort_key, stats.c.id)))
+    if limit is not None:
+        query = query.limit(limit)
+    return db.execute(query).mappings().all()
+
+# Withdrawn patients are only found with include_withdrawn
+def get_patient_by_id(db: Session, patient_id: int, include_withdrawn: bool = False):
+    patient = db.get(Patient, patient_id)
+    if patient is None or (patient.deleted_at is not None and not include_withdrawn):
+        return None
+    return patient
 
-def get_patient_by_id(db: Session, patient_id: int):
-    return db.get(Patient, patient_id)
+# Patient, day records with reason/event names, recent model logs and the
+# unacknowledged alert count in four queries
+def get_patient_dashboard(db: Session, patient_id: int, log_limit: int):
+    patient = get_patient_by_id(db, patient_id)
+    if not patient:
+        return None
+
+    records = db.exec(
+        select(PatientDayRecord)
+        .where(PatientDayRecord.patient_id == patient_id)
+        .options(joinedload(PatientDayRecord.possible_reason), joinedload(PatientDayRecord.event_at_alert))
+        .order_by(PatientDayRecord.id)
+    ).all()
+    day_records = [
+        PatientDayRecordRead(
+            **record.model_dump(),
+            possible_reason_name=record.possible_reason.reason if record.possible_reason else None,
+            event_at_alert_name=record.event_at_alert.event if record.event_at_alert else None,
+        )
+        for record in records
+    ]
+
+    # The newest `log_limit` logs, then every older alert still unacknowledged
+    model_logs = get_model_logs(db, patient_id=patient_id, limit=log_limit + 1)
+    next_cursor = None
+    if len(model_logs) > log_limit:
+        model_logs = model_logs[:log_limit]
+        next_cursor = encode_cursor(*log_key(model_logs[-1]))
+        model_logs += db.exec(
+            select(ModelLog)
+            .where(ModelLog.patient_id == patient_id, ModelLog.ack == False,  # noqa: E712
+                   tuple_(ModelLog.date, ModelLog.time, ModelLog.id) < log_key(model_logs[-1]))
+            .order_by(desc(ModelLog.date), desc(ModelLog.time), desc(ModelLog.id))
+        ).all()
+    unacked = db.scalar(
+        select(func.count()).select_from(ModelLog).where(ModelLog.patient_id == patient_id, ModelLog.ack == False)  # noqa: E712
+    )
+    return PatientDashboard(patient=patient, day_records=day_records, model_logs=model_logs, unacked_model_logs=unacked,
+                            model_logs_next_cursor=next_cursor)
 
 def get_patient_by_study_code(db: Session, patient_code: str):
-    statement = select(Patient).where(Patient.study_code == patient_code)
+    statement = select(Patient).where(Patient.study_code == patient_code, Patient.deleted_at.is_(None))
     return db.exec(statement).first()
 
 def update_patient(db: Session, patient_id: int, patient: Patient):
     # Fetch the existing patient
-    existing_patient = db.get(Patient, patient_id)
+    existing_patient = get_patient_by_id(db, patient_id)
     if not existing_patient:
         return None
 
@@ -45,6 +169,7 @@ def update_patient(db: Session, patient_id: int, patient: Patient):
     existing_patient.status = patient.status
     existing_patient.summary = patient.summary
     # existing_patient.status_date = patient.status_date
+    existing_patient.version += 1
 
     # Commit changes to the database
     db.add(existing_patient)
@@ -53,37 +178,164 @@ def update_patient(db: Session, patient_id: int, patient: Patient):
 
     return existing_patient
 
-def delete_patient(db: Session, patient_id: int):
-    # Fetch the patient
+# Change some fields of a patient in one statement if it is still at `version`
+def patch_patient(db: Session, patient_id: int, changes: dict, version: int):
+    patient = _patch(db, Patient, patient_id, changes, version, Patient.__table__.c.deleted_at.is_(None))
+    db.commit()
+    return patient
+
+# Delete a patient with everything recorded for them, or with soft=True only
+# withdraw them. Withdrawing stamps deleted_at: it is instant, hides the
+# patient from listings, lookups, search and exports, and restore_patient
+# undoes it. Deleting is a single DELETE that the ON DELETE CASCADE foreign
+# keys carry to the day records (and their event links) and both log tables;
+# the full-text and blob triggers fire for each row removed.
+def delete_patient(db: Session, patient_id: int, soft: bool = False):
     patient = db.get(Patient, patient_id)
     if not patient:
         return None
 
-    # Delete all associated day records
-    statement = select(PatientDayRecord).where(PatientDayRecord.patient_id == patient_id)
-    day_records = db.exec(statement).all()
-    for record in day_records:
-        db.delete(record)
-
-    # Delete the patient
-    db.delete(patient)
+    if soft:
+        if patient.deleted_at is None:
+            patient.deleted_at = datetime.now()
+            db.add(patient)
+            db.commit()
+            db.refresh(patient)
+        return patient
+
+    if not get_settings().foreign_keys:
+        # Nothing cascades with DB_FOREIGN_KEYS off, so delete the children first
+        record_ids = select(PatientDayRecord.id).where(PatientDayRecord.patient_id == patient_id)
+        db.execute(delete(PatientDayRecordEvent).where(PatientDayRecordEvent.record_id.in_(record_ids)))
+        for model in (PatientDayRecord, ModelLog, PipelineLog):
+            db.execute(delete(model).where(model.patient_id == patient_id))
+    db.execute(delete(Patient).where(Patient.id == patient_id))
     db.commit()
     return patient
 
+# Bring back a withdrawn patient
+def restore_patient(db: Session, patient_id: int):
+    patient = db.get(Patient, patient_id)
+    if not patient:
+        return None
+    if patient.deleted_at is not None:
+        patient.deleted_at = None
+        db.add(patient)
+        db.commit()
+        db.refresh(patient)
+    return patient
+
+# --- Optimistic updates ---
+
+# Raised when a row has been updated since the version the client read
+class VersionConflict(Exception):
+    def __init__(self, current_version: int):
+        super().__init__(f"Row is now at version {current_version}")
+        self.current_version = current_version
+
+# UPDATE ... SET <changes>, version = version + 1 WHERE id = ? AND version = ?
+# RETURNING * on a versioned table: one statement instead of get, setattr,
+# commit and refresh. With no changes it only reads the row and checks the
+# version, writing nothing. Returns the updated row as a model, or None when
+# there is no such row (or it fails `criteria`). Does not commit, but rolls
+# back before re-raising an IntegrityError.
+def _patch(db: Session, model, row_id: int, changes: dict, version: int, *criteria):
+    table = model.__table__
+    match = (table.c.id == row_id, *criteria)
+    if changes:
+        statement = (update(table).where(*match, table.c.version == version)
+                     .values(**changes, version=table.c.version + 1).returning(*table.c))
+    else:
+        statement = select(*table.c).where(*match, table.c.version == version)
+    try:
+        row = db.execute(statement).first()
+    except IntegrityError:
+        # A unique value that is taken; main.py turns it into a 409
+        db.rollback()
+        raise
+    if row is None:
+        # Only on failure: tell a missing row from a stale version
+        current_version = db.scalar(select(table.c.version).where(*match))
+        if current_version is None:
+            return None
+        raise VersionConflict(current_version)
+    return model(**row._mapping)
+
 # --- PatientDayRecord CRUD Operations ---
 
+# Ids of withdrawn patients; their day records and logs are hidden with them
+def _withdrawn_patients():
+    return select(Patient.id).where(Patient.deleted_at.is_not(None))
+
+# A day record, unless it doesn't exist or its patient is withdrawn
+def _get_day_record(db: Session, record_id: int):
+    record = db.get(PatientDayRecord, record_id)
+    if record is None or db.get(Patient, record.patient_id).deleted_at is not None:
+        return None
+    return record
+
+# Forms submit '' for an unselected option; store NULL so foreign key checks pass
+def _blank_references_to_none(record: PatientDayRecord):
+    for field in ("possible_reason_id", "event_at_alert_id"):
+        if getattr(record, field, None) == "":
+            setattr(record, field, None)
+
+# Raised when a day record refers to a patient or option that doesn't exist
+class MissingReference(Exception):
+    def __init__(self, fields: list[str]):
+        super().__init__(f"No such {', '.join(fields)}")
+        self.fields = fields
+
+DAY_RECORD_REFERENCES = {"patient_id": Patient, "possible_reason_id": PossibleReason, "event_at_alert_id": Event}
+
+# Check the references among `values` before writing, since SQLite's foreign
+# key error doesn't say which one failed. A withdrawn patient counts as missing.
+def _check_references(db: Session, values: dict):
+    missing = []
+    for field, model in DAY_RECORD_REFERENCES.items():
+        if values.get(field) in (None, ""):
+            continue
+        row = db.get(model, values[field])
+        if row is None or getattr(row, "deleted_at", None) is not None:
+            missing.append(field)
+    if missing:
+        raise MissingReference(missing)
+
+# Event names in a comma-separated event_during_24_hours string
+def event_names(value: str | None) -> set[str]:
+    return {name.strip() for name in (value or "").split(",") if name.strip()}
+
+# Link the record to the events its string names; names that are not an
+# event stay in the string only
+def _sync_record_events(db: Session, record: PatientDayRecord):
+    names = event_names(record.event_during_24_hours)
+    record.events = list(db.exec(select(Event).where(Event.event.in_(names))).all()) if names else []
+
 # Create a new PatientDayRecord
 def create_patient_day_record(db: Session, record: PatientDayRecord):
+    _blank_references_to_none(record)
+    _check_references(db, record.dict())
+    _sync_record_events(db, record)
     db.add(record)
     db.commit()
     db.refresh(record)
     return record
 
-# Get all PatientDayRecords for a specific patient
-def get_patient_day_records(db: Session, patient_id: int, skip: int = 0, limit: int | None = None):
-    query = db.query(PatientDayRecord).filter(PatientDayRecord.patient_id == patient_id)
-    # Apply offset
-    query = query.offset(skip)
+# Get PatientDayRecords for a patient, an event during the 24 hours, or both
+def get_patient_day_records(db: Session, patient_id: int | None = None, event_id: int | None = None,
+                            alert_since: date | None = None, after_id: int | None = None, limit: int | None = None):
+    query = db.query(PatientDayRecord).filter(PatientDayRecord.patient_id.not_in(_withdrawn_patients())).order_by(PatientDayRecord.id)
+    if patient_id is not None:
+        query = query.filter(PatientDayRecord.patient_id == patient_id)
+    if event_id is not None:
+        query = query.join(PatientDayRecordEvent, PatientDayRecordEvent.record_id == PatientDayRecord.id) \
+            .filter(PatientDayRecordEvent.event_id == event_id)
+    # Alert dates are stored as ISO text, so they compare as strings
+    if alert_since is not None:
+        query = query.filter(PatientDayRecord.date_of_alert >= alert_since.isoformat())
+    # Continue after the last id of the previous page
+    if after_id is not None:
+        query = query.filter(PatientDayRecord.id > after_id)
     # Apply limit only if provided
     if limit is not None:
         query = query.limit(limit)
@@ -91,28 +343,49 @@ def get_patient_day_records(db: Session, patient_id: int, skip: int = 0, limit:
 
 # Get a single PatientDayRecord by ID
 def get_patient_day_record_by_id(db: Session, record_id: int):
-    return db.get(PatientDayRecord, record_id)
+    return _get_day_record(db, record_id)
 
 # Update an existing PatientDayRecord
 def update_patient_day_record(db: Session, record_id: int, updated_record: PatientDayRecord):
     # Fetch the existing record
-    record = db.get(PatientDayRecord, record_id)
+    record = _get_day_record(db, record_id)
     if not record:
         return None
 
     # Update fields
-    for field, value in updated_record.dict(exclude_unset=True).items():
+    values = updated_record.dict(exclude_unset=True, exclude={"version"})
+    _check_references(db, values)
+    for field, value in values.items():
         setattr(record, field, value)
+    _blank_references_to_none(record)
+    _sync_record_events(db, record)
+    record.version += 1
 
     db.add(record)
     db.commit()
     db.refresh(record)
     return record
 
+# Change some fields of a day record in one statement if it is still at
+# `version`; the event links are rewritten only when the event string changes
+def patch_patient_day_record(db: Session, record_id: int, changes: dict, version: int):
+    _check_references(db, changes)
+    record = _patch(db, PatientDayRecord, record_id, changes, version,
+                    PatientDayRecord.__table__.c.patient_id.not_in(_withdrawn_patients()))
+    if record is not None and "event_during_24_hours" in changes:
+        db.execute(delete(PatientDayRecordEvent).where(PatientDayRecordEvent.record_id == record_id))
+        names = event_names(record.event_during_24_hours)
+        if names:
+            db.execute(insert(PatientDayRecordEvent).from_select(
+                ["record_id", "event_id"], select(literal(record_id), Event.id).where(Event.event.in_(names))
+            ))
+    db.commit()
+    return record
+
 # Delete a PatientDayRecord
 def delete_patient_day_record(db: Session, record_id: int):
     # Fetch the record
-    record = db.get(PatientDayRecord, record_id)
+    record = _get_day_record(db, record_id)
     if not record:
         return None
 
@@ -127,18 +400,13 @@ def delete_patient_day_record(db: Session, record_id: int):
 def create_possible_reason(db: Session, reason: PossibleReason):
     db.add(reason)
     db.commit()
+    possible_reasons_cache.invalidate()
     db.refresh(reason)
     return reason
 
-# Get all PossibleReasons
-def get_possible_reasons(db: Session, skip: int = 0, limit: int = None):
-    query = db.query(PossibleReason)
-    # Apply offset
-    query = query.offset(skip)
-    # Apply limit only if provided
-    if limit is not None:
-        query = query.limit(limit)
-    return query.all()
+# Get all PossibleReasons (served from the options cache)
+def get_possible_reasons(db: Session, after_id: int | None = None, limit: int | None = None):
+    return possible_reasons_cache.get(db).page(after_id, limit)
 
 # Get a single PossibleReason by ID
 def get_possible_reason_by_id(db: Session, reason_id: int):
@@ -153,6 +421,7 @@ def update_possible_reason(db: Session, reason_id: int, updated_reason: Possible
         setattr(reason, field, value)
     db.add(reason)
     db.commit()
+    possible_reasons_cache.invalidate()
     db.refresh(reason)
     return reason
 
@@ -163,6 +432,7 @@ def delete_possible_reason(db: Session, reason_id: int):
         return None
     db.delete(reason)
     db.commit()
+    possible_reasons_cache.invalidate()
     return reason
 
 # --- Event CRUD Operations ---
@@ -171,18 +441,13 @@ def delete_possible_reason(db: Session, reason_id: int):
 def create_event(db: Session, event: Event):
     db.add(event)
     db.commit()
+    events_cache.invalidate()
     db.refresh(event)
     return event
 
-# Get all Events
-def get_events(db: Session, skip: int = 0, limit: int = None):
-    query = db.query(Event)
-    # Apply offset
-    query = query.offset(skip)
-    # Apply limit only if provided
-    if limit is not None:
-        query = query.limit(limit)
-    return query.all()
+# Get all Events (served from the options cache)
+def get_events(db: Session, after_id: int | None = None, limit: int | None = None):
+    return events_cache.get(db).page(after_id, limit)
 
 
 # Get a single Event by ID
@@ -198,6 +463,7 @@ def update_event(db: Session, event_id: int, updated_event: Event):
         setattr(event, field, value)
     db.add(event)
     db.commit()
+    events_cache.invalidate()
     db.refresh(event)
     return event
 
@@ -208,6 +474,7 @@ def delete_event(db: Session, event_id: int):
         return None
     db.delete(event)
     db.commit()
+    events_cache.invalidate()
     return event
 
 
@@ -224,17 +491,64 @@ def create_model_log(db: Session, log: ModelLog):
     db.refresh(log)
     return log
 
+# Insert many ModelLogs in one transaction and return their ids in input order
+def create_model_logs(db: Session, logs: list[ModelLogBase]):
+    rows = [log.model_dump() for log in logs]
+    _check_log_patients(db, rows)
+    return _bulk_insert(db, ModelLog, rows)
+
+# Highest model log id, where the stream watcher starts
+def get_last_model_log_id(db: Session) -> int:
+    return db.scalar(select(func.max(ModelLog.id))) or 0
+
+# What the stream watcher needs to notice, from one snapshot: up to `limit`
+# model logs after `after_id` in id order, and the number of unacknowledged
+# alerts per patient among logs up to the last of them (patients without any
+# are left out; `patient_ids` None means every patient)
+def get_model_log_changes(db: Session, after_id: int, patient_ids: set[int] | None, limit: int):
+    logs = db.exec(select(ModelLog).where(ModelLog.id > after_id).order_by(ModelLog.id).limit(limit)).all()
+    last_id = logs[-1].id if logs else after_id
+    statement = (
+        select(ModelLog.patient_id, func.count())
+        .where(ModelLog.ack == False, ModelLog.id <= last_id)  # noqa: E712 - "ack = 0", the partial index
+        .group_by(ModelLog.patient_id)
+    )
+    if patient_ids is not None:
+        statement = statement.where(ModelLog.patient_id.in_(patient_ids))
+    return logs, dict(db.exec(statement).all())
 
 
-def get_model_logs(db: Session, patient_id: int, skip: int = 0, limit: int = None):
-    query = db.query(ModelLog).filter(ModelLog.patient_id == patient_id).order_by(desc(ModelLog.date), desc(ModelLog.time))
+# Newest first; `before` is the (date, time, id) of the last log of the previous page
+def get_model_logs(db: Session, patient_id: int, before: tuple | None = None, limit: int | None = None):
+    query = db.query(ModelLog).filter(ModelLog.patient_id == patient_id).order_by(desc(ModelLog.date), desc(ModelLog.time), desc(ModelLog.id))
+    if before is not None:
+        query = query.filter(tuple_(ModelLog.date, ModelLog.time, ModelLog.id) < before)
 
-    if limit:  # Apply limit only if it's provided
+    if limit is not None:  # Apply limit only if it's provided
         query = query.limit(limit)
 
-    return query.offset(skip).all()
+    return query.all()
 
+# Only the named columns of a patient's model or pipeline logs as rows, in the
+# order of get_model_logs; date, time and id are always selected for the cursor
+def get_log_rows(db: Session, model, patient_id: int, fields: list[str], before: tuple | None = None, limit: int | None = None):
+    table = model.__table__
+    columns = [
+        dedup.raw_content if model is PipelineLog and name == "raw_content" else table.c[name]
+        for name in dict.fromkeys([*fields, "date", "time", "id"])
+    ]
+    statement = select(*columns).where(table.c.patient_id == patient_id, table.c.patient_id.not_in(_withdrawn_patients())) \
+        .order_by(desc(table.c.date), desc(table.c.time), desc(table.c.id))
+    if model is PipelineLog and "raw_content" in fields:
+        statement = dedup.join_blobs(statement)
+    if before is not None:
+        statement = statement.where(tuple_(table.c.date, table.c.time, table.c.id) < before)
+    if limit is not None:
+        statement = statement.limit(limit)
+    return db.execute(statement).all()
 
+
+# Logs moved out by retention.py are not found here; see retention.get_archived_log
 def get_model_log_by_id(db: Session, log_id: int):
     return db.get(ModelLog, log_id)
 
@@ -251,6 +565,21 @@ def update_model_log(db: Session, log_id: int, updated_log: ModelLog):
     return log
 
 
+# Acknowledge alerts with a single UPDATE: the given ids, or every alert of
+# a patient up to a point in time. Returns how many were unacknowledged.
+def ack_model_logs(db: Session, ids: list[int] | None = None, patient_id: int | None = None, up_to: datetime | None = None):
+    statement = update(ModelLog).where(ModelLog.ack == False)  # noqa: E712 - renders "ack = 0", matching the partial index
+    if ids is not None:
+        statement = statement.where(ModelLog.id.in_(ids))
+    if patient_id is not None:
+        statement = statement.where(ModelLog.patient_id == patient_id)
+    if up_to is not None:
+        statement = statement.where(tuple_(ModelLog.date, ModelLog.time) <= (up_to.date(), up_to.time()))
+    # Open patient pages hear of it through the stream watcher
+    count = db.execute(statement.values(ack=True), execution_options={"synchronize_session": False}).rowcount
+    db.commit()
+    return count
+
 def delete_model_log(db: Session, log_id: int):
     log = db.get(ModelLog, log_id)
     if not log:
@@ -261,41 +590,66 @@ def delete_model_log(db: Session, log_id: int):
 
 # --- PipelineLog CRUD Operations ---
 
-def create_pipeline_log(db: Session, log: PipelineLog):
+# deduplicate: store raw_content as a shared blob (see dedup.py); defaults
+# to the PIPELINE_LOG_DEDUP setting
+def create_pipeline_log(db: Session, log: PipelineLog, deduplicate: bool | None = None):
     if isinstance(log.date, str):
         log.date = date.fromisoformat(log.date)
     if isinstance(log.time, str):
         log.time = time.fromisoformat(log.time)
+    log.raw_content_hash = None
+    if _deduplicate(deduplicate):
+        log.raw_content_hash = dedup.store_blobs(db, [log.raw_content])[0]
+        log.raw_content = ""
     db.add(log)
     db.commit()
     db.refresh(log)
-    return log
+    return dedup.resolve(db, [log])[0]
 
+# Insert many PipelineLogs in one transaction and return their ids in input order
+def create_pipeline_logs(db: Session, logs: list[PipelineLogBase], deduplicate: bool | None = None):
+    rows = [log.model_dump() for log in logs]
+    _check_log_patients(db, rows)
+    if rows and _deduplicate(deduplicate):
+        dedup.pack(db, rows)
+    return _bulk_insert(db, PipelineLog, rows)
 
-def get_pipeline_logs(db: Session, patient_id: int, skip: int = 0, limit: int = None):
-    query = db.query(PipelineLog).filter(PipelineLog.patient_id == patient_id)
-    # Apply offset
-    query = query.offset(skip)
+def _deduplicate(deduplicate: bool | None) -> bool:
+    return get_settings().pipeline_log_dedup if deduplicate is None else deduplicate
+
+
+# Newest first; `before` is the (date, time, id) of the last log of the previous page
+def get_pipeline_logs(db: Session, patient_id: int, before: tuple | None = None, limit: int | None = None):
+    query = db.query(PipelineLog).filter(PipelineLog.patient_id == patient_id).order_by(desc(PipelineLog.date), desc(PipelineLog.time), desc(PipelineLog.id))
+    if before is not None:
+        query = query.filter(tuple_(PipelineLog.date, PipelineLog.time, PipelineLog.id) < before)
     # Apply limit only if provided
     if limit is not None:
         query = query.limit(limit)
-    return query.all()
+    return dedup.resolve(db, query.all())
 
 
+# Logs moved out by retention.py are not found here; see retention.get_archived_log
 def get_pipeline_log_by_id(db: Session, log_id: int):
-    return db.get(PipelineLog, log_id)
+    log = db.get(PipelineLog, log_id)
+    return dedup.resolve(db, [log])[0] if log else None
 
 
-def update_pipeline_log(db: Session, log_id: int, updated_log: PipelineLog):
+def update_pipeline_log(db: Session, log_id: int, updated_log: PipelineLog, deduplicate: bool | None = None):
     log = db.get(PipelineLog, log_id)
     if not log:
         return None
-    for field, value in updated_log.dict(exclude_unset=True).items():
+    values = updated_log.dict(exclude_unset=True)
+    if "raw_content" in values:
+        values["raw_content_hash"] = None
+        if _deduplicate(deduplicate):
+            dedup.pack(db, [values])
+    for field, value in values.items():
         setattr(log, field, value)
     db.add(log)
     db.commit()
     db.refresh(log)
-    return log
+    return dedup.resolve(db, [log])[0]
 
 
 def delete_pipeline_log(db: Session, log_id: int):
@@ -306,6 +660,35 @@ def delete_pipeline_log(db: Session, log_id: int):
     db.commit()
     return log
 
+# Raised when logs in a batch name patients that don't exist; `indexes` are
+# the positions of those logs in the batch
+class UnknownPatients(Exception):
+    def __init__(self, indexes: list[int]):
+        super().__init__(f"No such patient_id at {len(indexes)} positions")
+        self.indexes = indexes
+
+# Look up the batch's distinct patient ids in one query, so a bad one is
+# reported by position instead of failing the whole insert on the foreign key
+def _check_log_patients(db: Session, rows: list[dict]):
+    patient_ids = {row["patient_id"] for row in rows}
+    if not patient_ids:
+        return
+    known = set(db.scalars(select(Patient.id).where(Patient.id.in_(patient_ids))))
+    if known != patient_ids:
+        raise UnknownPatients([index for index, row in enumerate(rows) if row["patient_id"] not in known])
+
+# Shared executemany-style insert for the log tables; rows are column dicts
+def _bulk_insert(db: Session, model, rows: list[dict]):
+    if not rows:
+        return []
+    # Ids in the order of rows. SQLite gives SQLAlchemy no way to match
+    # multi-row RETURNING to its rows, so it inserts them one statement at a
+    # time, still in this one transaction.
+    statement = insert(model).returning(model.id, sort_by_parameter_order=True)
+    ids = list(db.scalars(statement, rows))
+    db.commit()
+    return ids
+
 # --- SystemLog CRUD Operations ---
 
 def create_system_log(log: SystemLog, db: Session):
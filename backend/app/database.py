@@ -1,10 +1,93 @@
-from sqlmodel import create_engine, Session
+from typing import Union
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlmodel import SQLModel, create_engine, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from backend.app.config import Settings, get_settings
+from backend.app import metrics, slow_queries
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./sql_app.db"
+settings = get_settings()
+SQLALCHEMY_DATABASE_URL = settings.database_url
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL, echo=True)
+# Either session type; routers hand it to async_crud.call without caring which
+AnySession = Union[AsyncSession, Session]
+
+# Connection-level PRAGMAs; SQLite forgets them when a connection closes
+def apply_sqlite_pragmas(dbapi_connection, settings: Settings):
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={settings.journal_mode}")
+    cursor.execute(f"PRAGMA synchronous={settings.synchronous}")
+    cursor.execute(f"PRAGMA busy_timeout={settings.busy_timeout_ms}")
+    # Negative cache_size is in KiB rather than pages
+    cursor.execute(f"PRAGMA cache_size=-{settings.cache_size_kib}")
+    cursor.execute(f"PRAGMA mmap_size={settings.mmap_size}")
+    cursor.execute(f"PRAGMA foreign_keys={'ON' if settings.foreign_keys else 'OFF'}")
+    cursor.close()
+
+def _is_file_database(url) -> bool:
+    return url.database not in (None, "", ":memory:")
+
+def _listen_for_pragmas(engine, settings: Settings):
+    event.listen(engine, "connect", lambda dbapi_connection, _: apply_sqlite_pragmas(dbapi_connection, settings))
+
+def make_engine(settings: Settings):
+    url = make_url(settings.database_url)
+    kwargs = {"echo": settings.echo}
+    if url.get_backend_name() == "sqlite":
+        # Sessions are handed between threadpool threads by FastAPI
+        kwargs["connect_args"] = {"check_same_thread": False}
+        # In-memory databases use a single-connection pool that takes no sizing
+        if _is_file_database(url):
+            kwargs.update(pool_size=settings.pool_size, max_overflow=settings.max_overflow, pool_timeout=settings.pool_timeout)
+    engine = create_engine(url, **kwargs)
+    if url.get_backend_name() == "sqlite":
+        _listen_for_pragmas(engine, settings)
+    return engine
+
+# Same database through aiosqlite, for the async request path
+def make_async_engine(settings: Settings):
+    url = make_url(settings.database_url)
+    kwargs = {"echo": settings.echo}
+    if url.get_backend_name() == "sqlite":
+        url = url.set(drivername="sqlite+aiosqlite")
+        if _is_file_database(url):
+            kwargs.update(poolclass=AsyncAdaptedQueuePool, pool_size=settings.pool_size,
+                          max_overflow=settings.max_overflow, pool_timeout=settings.pool_timeout)
+    engine = create_async_engine(url, **kwargs)
+    if url.get_backend_name() == "sqlite":
+        _listen_for_pragmas(engine.sync_engine, settings)
+    return engine
+
+engine = make_engine(settings)
+async_engine = make_async_engine(settings) if settings.async_db else None
+# Statement and pool counters for /metrics, slow statements for /api/debug/slow-queries
+for label, instrumented in (("sync", engine), ("async", async_engine and async_engine.sync_engine)):
+    if instrumented is not None:
+        metrics.instrument_engine(instrumented, label)
+        slow_queries.instrument_engine(instrumented, label)
+
+# create_all plus the SQLite objects the metadata doesn't describe: the
+# full-text search tables (fts.py) and the payload refcount triggers (dedup.py)
+def create_tables(engine):
+    from backend.app import dedup, fts
+    SQLModel.metadata.create_all(engine)
+    if engine.dialect.name == "sqlite":
+        with engine.begin() as connection:
+            fts.create_search_index(connection)
+            dedup.create_blob_triggers(connection)
 
 # Dependency for database session
 def get_session():
     with Session(engine) as session:
         yield session
+
+# Dependency for an async database session
+async def get_async_session():
+    # Routers serialize returned rows after the commit, so keep them loaded
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
+
+# Dependency used by the routers: async or sync session depending on DB_ASYNC
+get_db = get_async_session if settings.async_db else get_session
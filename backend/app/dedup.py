@@ -0,0 +1,145 @@
+import sys
+import os
+# Add project root directory to sys.path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../"))
+sys.path.insert(0, project_root)
+import argparse
+import hashlib
+
+from sqlalchemy import bindparam, func, insert, select, update
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlmodel import Session
+from backend.app.database import engine
+from backend.app.models import LogBlob, PipelineLog
+
+# Content-addressed storage of pipeline log payloads.
+# The pipeline repeats the same raw_content ("no new data", identical status
+# dumps) for every patient on every cycle. With deduplication on, each
+# distinct payload is stored once in log_blobs under its SHA-256 and the log
+# row keeps only the hash (raw_content is left ''). Triggers count the rows
+# referring to each blob and drop it with the last one, so every delete path
+# - crud, retention, cascades - keeps the counts right. Reads put the
+# payload back, so the API returns the same logs either way.
+#
+#     python -m backend.app.dedup --vacuum   # deduplicate the payloads already stored
+
+BATCH_SIZE = 5000
+
+TRIGGERS = [
+    "CREATE TRIGGER IF NOT EXISTS log_blobs_pipeline_log_ai AFTER INSERT ON pipeline_log "
+    "WHEN new.raw_content_hash IS NOT NULL BEGIN "
+    "UPDATE log_blobs SET refcount = refcount + 1 WHERE hash = new.raw_content_hash; END",
+    "CREATE TRIGGER IF NOT EXISTS log_blobs_pipeline_log_ad AFTER DELETE ON pipeline_log "
+    "WHEN old.raw_content_hash IS NOT NULL BEGIN "
+    "UPDATE log_blobs SET refcount = refcount - 1 WHERE hash = old.raw_content_hash; "
+    "DELETE FROM log_blobs WHERE hash = old.raw_content_hash AND refcount <= 0; END",
+    "CREATE TRIGGER IF NOT EXISTS log_blobs_pipeline_log_au AFTER UPDATE OF raw_content_hash ON pipeline_log "
+    "WHEN old.raw_content_hash IS NOT new.raw_content_hash BEGIN "
+    "UPDATE log_blobs SET refcount = refcount + 1 WHERE hash = new.raw_content_hash; "
+    "UPDATE log_blobs SET refcount = refcount - 1 WHERE hash = old.raw_content_hash; "
+    "DELETE FROM log_blobs WHERE hash = old.raw_content_hash AND refcount <= 0; END",
+]
+
+def create_blob_triggers(connection):
+    for statement in TRIGGERS:
+        connection.exec_driver_sql(statement)
+
+def hash_payload(payload: str) -> str:
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+# Make sure each payload has a blob and return their hashes in order. New
+# blobs start at refcount 0; inserting the logs that use them counts them.
+def store_blobs(db: Session, payloads: list[str]) -> list[str]:
+    hashes = [hash_payload(payload) for payload in payloads]
+    blobs = {digest: payload for digest, payload in zip(hashes, payloads)}
+    db.execute(insert(LogBlob).prefix_with("OR IGNORE"), [
+        {"hash": digest, "content": payload, "size": len(payload.encode()), "refcount": 0}
+        for digest, payload in blobs.items()
+    ])
+    return hashes
+
+# Move the raw_content of pipeline log values (dicts) into blobs
+def pack(db: Session, rows: list[dict]):
+    for row, digest in zip(rows, store_blobs(db, [row["raw_content"] for row in rows])):
+        row["raw_content"] = ""
+        row["raw_content_hash"] = digest
+
+# Fill in raw_content of loaded logs that point to a blob, without marking
+# them as changed
+def resolve(db: Session, logs: list[PipelineLog]) -> list[PipelineLog]:
+    hashes = {log.raw_content_hash for log in logs if log.raw_content_hash}
+    if hashes:
+        payloads = dict(db.execute(select(LogBlob.hash, LogBlob.content).where(LogBlob.hash.in_(hashes))).all())
+        for log in logs:
+            if log.raw_content_hash:
+                set_committed_value(log, "raw_content", payloads[log.raw_content_hash])
+    return logs
+
+# raw_content for Core selects over pipeline_log; use with join_blobs()
+raw_content = func.coalesce(LogBlob.content, PipelineLog.raw_content).label("raw_content")
+
+def join_blobs(statement):
+    return statement.outerjoin(LogBlob, LogBlob.hash == PipelineLog.raw_content_hash)
+
+def dedup_stats(db: Session):
+    # models.py imports this module, and schemas.py imports models.py
+    from backend.app.schemas import DedupStats
+
+    blobs, stored_bytes, deduplicated_logs, logical_bytes = db.execute(select(
+        func.count(),
+        func.coalesce(func.sum(LogBlob.size), 0),
+        func.coalesce(func.sum(LogBlob.refcount), 0),
+        func.coalesce(func.sum(LogBlob.size * LogBlob.refcount), 0),
+    )).one()
+    return DedupStats(
+        total_logs=db.scalar(select(func.count()).select_from(PipelineLog)),
+        deduplicated_logs=deduplicated_logs,
+        blobs=blobs,
+        logical_bytes=logical_bytes,
+        stored_bytes=stored_bytes,
+        ratio=logical_bytes / stored_bytes if stored_bytes else None,
+    )
+
+# Deduplicate the payloads of pipeline logs stored inline; returns the
+# number of logs converted
+def deduplicate_existing(db: Session, batch_size: int = BATCH_SIZE) -> int:
+    statement = (
+        update(PipelineLog.__table__)
+        .where(PipelineLog.__table__.c.id == bindparam("log_id"))
+        .values(raw_content="", raw_content_hash=bindparam("digest"))
+    )
+    converted = 0
+    last_id = 0
+    while True:
+        rows = db.execute(
+            select(PipelineLog.id, PipelineLog.raw_content)
+            .where(PipelineLog.raw_content_hash.is_(None), PipelineLog.id > last_id)
+            .order_by(PipelineLog.id).limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        hashes = store_blobs(db, [payload for _, payload in rows])
+        db.connection().execute(statement, [
+            {"log_id": log_id, "digest": digest} for (log_id, _), digest in zip(rows, hashes)
+        ])
+        db.commit()
+        converted += len(rows)
+        last_id = rows[-1].id
+    return converted
+
+def main():
+    from backend.app.retention import vacuum
+
+    parser = argparse.ArgumentParser(description="Move the payloads of existing pipeline logs into shared blobs")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--vacuum", action="store_true", help="VACUUM the database afterwards to shrink the file")
+    args = parser.parse_args()
+    with Session(engine) as db:
+        converted = deduplicate_existing(db, args.batch_size)
+        print(f"Deduplicated {converted} pipeline logs")
+        print(dedup_stats(db).model_dump_json(indent=2))
+    if args.vacuum:
+        vacuum()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+import csv
+import io
+import json
+import zlib
+from functools import lru_cache
+from itertools import chain
+
+from sqlalchemy import Boolean, Date, DateTime, Integer, Time, Enum as SAEnum, asc, select
+from backend.app.database import engine
+from backend.app import dedup, retention
+from backend.app.models import Patient, PatientDayRecord, PossibleReason, Event, ModelLog, PipelineLog
+
+# pyarrow takes about 0.1 s to import, so the first Parquet export loads it
+# rather than every worker at start. None when it is not installed.
+@lru_cache(maxsize=None)
+def arrow():
+    try:
+        import pyarrow
+        import pyarrow.compute
+        import pyarrow.parquet
+    except ImportError:  # Parquet export is optional
+        return None
+    return pyarrow
+
+# Streaming exports of the study data.
+# Each dataset is a flat Core select that is read in chunks of CHUNK_SIZE
+# rows from a dedicated connection and encoded chunk by chunk, so memory use
+# does not grow with the size of the study. The log datasets also cover the
+# logs retention.py moved to the archive database.
+
+CHUNK_SIZE = 10_000
+
+FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+# Day records with their patient, reason and event resolved
+def day_records_query():
+    return (
+        select(
+            PatientDayRecord.id.label("record_id"),
+            Patient.id.label("patient_id"),
+            Patient.study_code,
+            Patient.abbreviation_name,
+            Patient.year_of_birth,
+            Patient.gender,
+            Patient.status.label("patient_status"),
+            PatientDayRecord.date_of_alert,
+            PatientDayRecord.time_of_alert,
+            PatientDayRecord.date_of_assessment,
+            PatientDayRecord.time_of_assessment,
+            PossibleReason.reason.label("possible_reason"),
+            PatientDayRecord.new_information,
+            PatientDayRecord.expected_alert,
+            Event.event.label("event_at_alert"),
+            PatientDayRecord.event_during_24_hours,
+            PatientDayRecord.notes,
+        )
+        .join(Patient, Patient.id == PatientDayRecord.patient_id)
+        .where(Patient.deleted_at.is_(None))
+        .outerjoin(PossibleReason, PossibleReason.id == PatientDayRecord.possible_reason_id)
+        .outerjoin(Event, Event.id == PatientDayRecord.event_at_alert_id)
+        .order_by(asc(PatientDayRecord.patient_id), asc(PatientDayRecord.id))
+    )
+
+def _log_query(model, *extra, raw_content=None):
+    raw_content = model.raw_content if raw_content is None else raw_content
+    return (
+        select(model.id, model.patient_id, Patient.study_code, model.date, model.time, *extra, model.content, raw_content)
+        .join(Patient, Patient.id == model.patient_id)
+        .where(Patient.deleted_at.is_(None))
+        # Insertion order: a straight scan of the table. Walking the
+        # (patient_id, date, time) index instead costs a random table lookup
+        # per row and doubles the export time.
+        .order_by(asc(model.id))
+    )
+
+def model_logs_query():
+    return _log_query(ModelLog, ModelLog.ack)
+
+def pipeline_logs_query():
+    # Deduplicated payloads are written out in full
+    return dedup.join_blobs(_log_query(PipelineLog, raw_content=dedup.raw_content))
+
+DATASETS = {
+    "day_records": day_records_query,
+    "model_logs": model_logs_query,
+    "pipeline_logs": pipeline_logs_query,
+}
+
+# Datasets that include the archived logs of a model
+ARCHIVED = {
+    "model_logs": ModelLog,
+    "pipeline_logs": PipelineLog,
+}
+
+# Read a statement in chunks of rows on its own connection. The generator is
+# consumed after the request's session is gone, so it can't borrow that one.
+# Rows come straight from the DBAPI cursor as the values SQLite stores (ISO
+# date/time text, 0/1 booleans, enum names); skipping SQLAlchemy's row and
+# type processing roughly halves the time of a multi-million-row export.
+def iter_chunks(statement, chunk_size: int = CHUNK_SIZE, bind=None):
+    with (bind or engine).connect() as conn:
+        compiled = statement.compile(conn)
+        cursor = conn.connection.dbapi_connection.cursor()
+        try:
+            cursor.execute(str(compiled), [compiled.params[name] for name in compiled.positiontup or ()])
+            while rows := cursor.fetchmany(chunk_size):
+                yield rows
+        finally:
+            cursor.close()
+
+# Archived logs of `model` as raw rows with the columns of the dataset's
+# `statement`, oldest first. The study code comes from the live patients,
+# which also leaves out withdrawn ones, and raw_content is decompressed.
+# Rows still in the main table (an interrupted retention run leaves them in
+# both) are left to the main select.
+def iter_archived_chunks(model, statement, chunk_size: int = CHUNK_SIZE):
+    if not retention.archive_exists():
+        return
+    archive = retention.ARCHIVES[model]
+    keys = statement.selected_columns.keys()
+    names = [name for name in keys if name != "study_code"]
+    with engine.connect() as conn:
+        study_codes = dict(conn.execute(select(Patient.id, Patient.study_code).where(Patient.deleted_at.is_(None))).all())
+        archived = select(*(archive.c[name] for name in names)).order_by(asc(archive.c.id))
+        for rows in iter_chunks(archived, chunk_size, retention.get_archive_engine()):
+            live = set(conn.scalars(select(model.id).where(model.id.in_([row[0] for row in rows]))))
+            chunk = []
+            for row in rows:
+                values = dict(zip(names, row))
+                if values["id"] in live or values["patient_id"] not in study_codes:
+                    continue
+                values["study_code"] = study_codes[values["patient_id"]]
+                values["raw_content"] = zlib.decompress(values["raw_content"]).decode()
+                chunk.append([values[key] for key in keys])
+            if chunk:
+                yield chunk
+
+# The select of a dataset and its raw rows in chunks; for the log datasets
+# the archived logs, which are the oldest, come first
+def dataset_rows(dataset: str, chunk_size: int = CHUNK_SIZE):
+    statement = DATASETS[dataset]()
+    chunks = iter_chunks(statement, chunk_size)
+    if dataset in ARCHIVED:
+        chunks = chain(iter_archived_chunks(ARCHIVED[dataset], statement, chunk_size), chunks)
+    return statement, chunks
+
+# Times are stored as HH:MM:SS.ffffff; written as the API returns them
+# (time.isoformat(), which leaves out zero microseconds)
+def _time_text(value):
+    return value[:8] if value is not None and value.endswith(".000000") else value
+
+# Per-column fixups for the raw values: enums are stored by name, booleans
+# as 0/1 and times with microseconds
+def _converters(statement) -> dict:
+    converters = {}
+    for i, column in enumerate(statement.selected_columns):
+        if isinstance(column.type, SAEnum) and column.type.enum_class is not None:
+            converters[i] = {member.name: member.value for member in column.type.enum_class}.get
+        elif isinstance(column.type, Boolean):
+            converters[i] = lambda value: None if value is None else bool(value)
+        elif isinstance(column.type, Time):
+            converters[i] = _time_text
+    return converters
+
+def iter_converted(statement, chunks):
+    converters = _converters(statement)
+    for rows in chunks:
+        if converters:
+            rows = [list(row) for row in rows]
+            for row in rows:
+                for i, convert in converters.items():
+                    row[i] = convert(row[i])
+        yield rows
+
+def write_csv(statement, chunks):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(statement.selected_columns.keys())
+    for rows in iter_converted(statement, chunks):
+        writer.writerows(rows)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+def write_ndjson(statement, chunks):
+    keys = statement.selected_columns.keys()
+    for rows in iter_converted(statement, chunks):
+        yield "".join(json.dumps(dict(zip(keys, row))) + "\n" for row in rows).encode()
+
+def _arrow_type(column):
+    pa = arrow()
+    column_type = column.type
+    if isinstance(column_type, Boolean):
+        return pa.bool_()
+    if isinstance(column_type, Integer):
+        return pa.int64()
+    if isinstance(column_type, DateTime):
+        return pa.timestamp("us")
+    if isinstance(column_type, Date):
+        return pa.date32()
+    if isinstance(column_type, Time):
+        return pa.time64("us")
+    return pa.string()
+
+# Arrow array from a column of raw values; dates and times arrive as ISO text
+def _arrow_array(values, arrow_type):
+    pa = arrow()
+    if pa.types.is_time(arrow_type):
+        # Arrow has no string -> time cast, so go through a timestamp
+        stamps = pa.compute.binary_join_element_wise("1970-01-01 ", pa.array(values, pa.string()), "")
+        return stamps.cast(pa.timestamp("us")).cast(arrow_type)
+    if pa.types.is_temporal(arrow_type):
+        return pa.array(values, pa.string()).cast(arrow_type)
+    return pa.array(values, arrow_type)
+
+# File object that hands back whatever the Parquet writer has written so far
+class _Drain(io.RawIOBase):
+    def __init__(self):
+        self.parts = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self) -> bytes:
+        data = b"".join(self.parts)
+        self.parts.clear()
+        return data
+
+# One Parquet row group per chunk; only the footer waits for the end
+def write_parquet(statement, chunks):
+    pa = arrow()
+    schema = pa.schema([(column.key, _arrow_type(column)) for column in statement.selected_columns])
+    sink = _Drain()
+    with pa.parquet.ParquetWriter(sink, schema, compression="zstd") as writer:
+        for rows in iter_converted(statement, chunks):
+            arrays = [_arrow_array(values, field.type) for values, field in zip(zip(*rows), schema)]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            yield sink.drain()
+    yield sink.drain()
+
+WRITERS = {
+    "csv": write_csv,
+    "ndjson": write_ndjson,
+    "parquet": write_parquet,
+}
@@ -0,0 +1,50 @@
+# SQLite FTS5 indexes over log and note text, used by search.py.
+# Each searchable table gets an external-content FTS5 table (the text is not
+# stored twice) kept in step by triggers, so every write path - crud, bulk
+# inserts, imports, migrations - is covered. Updates only touch the index
+# when an indexed column changes, so acknowledging a log costs nothing.
+
+# FTS table -> (source table, indexed columns)
+FTS_TABLES = {
+    "model_log_fts": ("model_log", ("content", "raw_content")),
+    "pipeline_log_fts": ("pipeline_log", ("content",)),
+    "patient_day_record_notes_fts": ("patient_day_records", ("notes",)),
+}
+
+def fts_ddl(fts: str, table: str, columns: tuple[str, ...]) -> list[str]:
+    names = ", ".join(columns)
+    new = ", ".join(f"new.{column}" for column in columns)
+    old = ", ".join(f"old.{column}" for column in columns)
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({names}, content='{table}', content_rowid='id')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {fts}(rowid, {names}) VALUES (new.id, {new}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.id, {old}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {names} ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.id, {old}); "
+        f"INSERT INTO {fts}(rowid, {names}) VALUES (new.id, {new}); END",
+    ]
+
+# Create missing FTS tables and triggers, indexing rows already present
+def create_search_index(connection):
+    for fts, (table, columns) in FTS_TABLES.items():
+        exists = connection.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (fts,)
+        ).first()
+        for statement in fts_ddl(fts, table, columns):
+            connection.exec_driver_sql(statement)
+        if not exists:
+            connection.exec_driver_sql(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+# Drop the FTS tables and triggers. Bulk loads use this to skip per-row
+# indexing and call create_search_index afterwards, which rebuilds in one pass.
+def drop_search_index(connection):
+    for fts in FTS_TABLES:
+        for suffix in ("ai", "ad", "au"):
+            connection.exec_driver_sql(f"DROP TRIGGER IF EXISTS {fts}_{suffix}")
+        connection.exec_driver_sql(f"DROP TABLE IF EXISTS {fts}")
+
+# The FTS tables and their shadow tables are not part of the metadata
+def is_search_table(name: str) -> bool:
+    return any(name == fts or name.startswith(f"{fts}_") for fts in FTS_TABLES)
@@ -0,0 +1,80 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+from sqlalchemy.dialects.sqlite import insert
+from sqlmodel import select
+from backend.app.models import Heartbeat
+
+# Heartbeat state for the model status router.
+#
+# Every uvicorn worker answers /api/model/status, so the last heartbeat of each
+# named model or pipeline has to live somewhere all workers can read. The
+# SQLite store keeps one row per name and writes it with a single UPSERT; the
+# in-memory store is for a single process (tests, --workers 1).
+
+@dataclass(frozen=True)
+class HeartbeatState:
+    name: str
+    running: bool
+    last_seen: datetime
+
+class HeartbeatStore(ABC):
+    @abstractmethod
+    def beat(self, name: str, running: bool, at: datetime) -> HeartbeatState:
+        ...
+
+    @abstractmethod
+    def get(self, name: str) -> Optional[HeartbeatState]:
+        ...
+
+    @abstractmethod
+    def all(self) -> list[HeartbeatState]:
+        ...
+
+class InMemoryHeartbeatStore(HeartbeatStore):
+    def __init__(self):
+        self._states: dict[str, HeartbeatState] = {}
+
+    def beat(self, name, running, at):
+        state = self._states[name] = HeartbeatState(name, running, at)
+        return state
+
+    def get(self, name):
+        return self._states.get(name)
+
+    def all(self):
+        return list(self._states.values())
+
+class SQLiteHeartbeatStore(HeartbeatStore):
+    def __init__(self, engine):
+        self.engine = engine
+
+    def beat(self, name, running, at):
+        statement = insert(Heartbeat).values(name=name, running=running, last_seen=at)
+        statement = statement.on_conflict_do_update(
+            index_elements=[Heartbeat.name],
+            set_={"running": statement.excluded.running, "last_seen": statement.excluded.last_seen},
+        )
+        with self.engine.begin() as conn:
+            conn.execute(statement)
+        return HeartbeatState(name, running, at)
+
+    def get(self, name):
+        with self.engine.connect() as conn:
+            row = conn.execute(select(Heartbeat.name, Heartbeat.running, Heartbeat.last_seen)
+                               .where(Heartbeat.name == name)).first()
+        return HeartbeatState(*row) if row else None
+
+    def all(self):
+        with self.engine.connect() as conn:
+            rows = conn.execute(select(Heartbeat.name, Heartbeat.running, Heartbeat.last_seen)
+                                .order_by(Heartbeat.name)).all()
+        return [HeartbeatState(*row) for row in rows]
+
+def make_heartbeat_store(kind: str, engine) -> HeartbeatStore:
+    if kind == "memory":
+        return InMemoryHeartbeatStore()
+    if kind == "sqlite":
+        return SQLiteHeartbeatStore(engine)
+    raise ValueError(f"Unknown HEARTBEAT_STORE {kind!r}, expected 'sqlite' or 'memory'")
@@ -0,0 +1,222 @@
+import sys
+import os
+# Add project root directory to sys.path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../"))
+sys.path.insert(0, project_root)
+import argparse
+import csv
+import io
+import json
+
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session
+from backend.app.database import engine
+from backend.app.models import (
+    Patient, PatientBase, PatientDayRecord, PatientDayRecordBase, PatientDayRecordEvent, PossibleReason, Event
+)
+import backend.app.crud as crud
+from backend.app.schemas import ImportResult, ImportRowError
+
+# Bulk import of patients and day records from CSV or NDJSON.
+# The file is parsed as a stream and handled CHUNK_SIZE rows at a time: one
+# lookup per chunk resolves study codes and reason/event names, and the valid
+# rows are inserted and committed in one transaction (SQLite takes them one
+# statement at a time, so each row's id comes back in order). Rows that fail
+# validation, lookup or a database constraint are skipped and listed in the
+# result.
+#
+#     python -m backend.app.importer patients patients.csv
+
+CHUNK_SIZE = 1000
+FORMATS = ("csv", "ndjson")
+
+# (record number, row dict or None, parse error or None) for each record.
+# CSV has no null, so empty cells count as missing. A file that can't be
+# read further (bad encoding, broken CSV) ends with one error record.
+def read_rows(stream, format: str):
+    number = 0
+    if format == "csv":
+        reader = csv.DictReader(io.TextIOWrapper(stream, encoding="utf-8-sig", newline=""))
+        try:
+            for row in reader:
+                number += 1
+                yield number, {key: value for key, value in row.items() if key and value not in ("", None)}, None
+        except (UnicodeDecodeError, csv.Error) as exc:
+            yield number + 1, None, f"unreadable file: {exc}"
+        return
+    for line in stream:
+        if not line.strip():
+            continue
+        number += 1
+        try:
+            row = json.loads(line)
+        except ValueError:
+            yield number, None, "invalid JSON"
+            continue
+        if not isinstance(row, dict):
+            yield number, None, "expected a JSON object"
+            continue
+        yield number, row, None
+
+def _chunks(rows, size: int):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def _messages(exc: ValidationError) -> list[str]:
+    return [f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in exc.errors()]
+
+# Distinct string values of a column, for the per-chunk IN lookups
+def _keys(rows: list[dict], column: str) -> set[str]:
+    return {value for row in rows if isinstance(value := row.get(column), str)}
+
+def _fail(result: ImportResult, number: int, errors: list[str]):
+    result.failed += 1
+    result.errors.append(ImportRowError(row=number, errors=errors))
+
+def _insert_rows(db: Session, model, rows: list[tuple[int, dict]], link=None):
+    ids = list(db.scalars(insert(model).returning(model.id, sort_by_parameter_order=True),
+                          [values for _, values in rows]))
+    if link:
+        link(ids, rows)
+
+# Insert a chunk in one transaction; link(ids, rows) may add dependent rows,
+# with ids in the order of rows. If the database rejects the chunk (e.g. a
+# study code added by someone else since the lookup), it is rolled back and
+# inserted again a row at a time, so only the rows at fault are reported.
+def _insert(db: Session, model, rows: list[tuple[int, dict]], result: ImportResult, link=None):
+    if not rows:
+        return
+    try:
+        _insert_rows(db, model, rows, link)
+        db.commit()
+        result.inserted += len(rows)
+        return
+    except IntegrityError:
+        db.rollback()
+    for row in rows:
+        try:
+            _insert_rows(db, model, [row], link)
+            db.commit()
+            result.inserted += 1
+        except IntegrityError as exc:
+            db.rollback()
+            _fail(result, row[0], [f"rejected by the database: {exc.orig}"])
+
+# Earlier chunks are committed by now, so the lookup covers them
+def import_patient_chunk(db: Session, chunk: list, result: ImportResult):
+    codes = _keys([row for _, row, _ in chunk if row], "study_code")
+    existing = set(db.scalars(select(Patient.study_code).where(Patient.study_code.in_(codes))))
+    seen = set()
+    valid = []
+    for number, row, error in chunk:
+        if error:
+            _fail(result, number, [error])
+            continue
+        try:
+            patient = PatientBase.model_validate(row)
+        except ValidationError as exc:
+            _fail(result, number, _messages(exc))
+            continue
+        if patient.study_code in existing or patient.study_code in seen:
+            _fail(result, number, [f"study_code: {patient.study_code!r} already exists"])
+            continue
+        seen.add(patient.study_code)
+        valid.append((number, patient.model_dump()))
+    _insert(db, Patient, valid, result)
+
+# Day records name their patient by study_code and the reason/event by
+# their text (possible_reason, event_at_alert), as in the day_records export
+def import_day_record_chunk(db: Session, chunk: list, result: ImportResult):
+    rows = [row for _, row, _ in chunk if row]
+    patient_ids = dict(db.execute(select(Patient.study_code, Patient.id)
+                                  .where(Patient.study_code.in_(_keys(rows, "study_code")))).all())
+    reason_ids = dict(db.execute(select(PossibleReason.reason, PossibleReason.id)
+                                 .where(PossibleReason.reason.in_(_keys(rows, "possible_reason")))).all())
+    event_names = _keys(rows, "event_at_alert").union(
+        *(crud.event_names(value) for row in rows if isinstance(value := row.get("event_during_24_hours"), str)))
+    event_ids = dict(db.execute(select(Event.event, Event.id).where(Event.event.in_(event_names))).all())
+    valid = []
+    for number, row, error in chunk:
+        if error:
+            _fail(result, number, [error])
+            continue
+        study_code, reason, event = row.get("study_code"), row.get("possible_reason"), row.get("event_at_alert")
+        errors = [f"{column}: Input should be a valid string"
+                  for column, value in (("study_code", study_code), ("possible_reason", reason), ("event_at_alert", event))
+                  if value is not None and not isinstance(value, str)]
+        if study_code is None:
+            errors.append("study_code: Field required")
+        elif isinstance(study_code, str) and study_code not in patient_ids:
+            errors.append(f"study_code: no patient {study_code!r}")
+        if isinstance(reason, str) and reason not in reason_ids:
+            errors.append(f"possible_reason: unknown reason {reason!r}")
+        if isinstance(event, str) and event not in event_ids:
+            errors.append(f"event_at_alert: unknown event {event!r}")
+        if errors:
+            _fail(result, number, errors)
+            continue
+        values = {
+            **row,
+            "patient_id": patient_ids[study_code],
+            "possible_reason_id": reason_ids.get(reason),
+            "event_at_alert_id": event_ids.get(event),
+        }
+        try:
+            record = PatientDayRecordBase.model_validate(values)
+        except ValidationError as exc:
+            _fail(result, number, _messages(exc))
+            continue
+        valid.append((number, record.model_dump()))
+
+    # Link each record to the known events in its event_during_24_hours
+    def link_events(ids, rows):
+        links = [
+            {"record_id": record_id, "event_id": event_ids[name]}
+            for record_id, (_, values) in zip(ids, rows)
+            for name in crud.event_names(values["event_during_24_hours"])
+            if name in event_ids
+        ]
+        if links:
+            db.execute(insert(PatientDayRecordEvent), links)
+
+    _insert(db, PatientDayRecord, valid, result, link_events)
+
+IMPORTERS = {
+    "patients": import_patient_chunk,
+    "day_records": import_day_record_chunk,
+}
+
+# Import a whole file. Chunks are committed as they go, so rows before an
+# unreadable part of the file stay imported.
+def import_file(dataset: str, stream, format: str, chunk_size: int = CHUNK_SIZE) -> ImportResult:
+    import_chunk = IMPORTERS[dataset]
+    result = ImportResult(dataset=dataset)
+    with Session(engine) as db:
+        for chunk in _chunks(read_rows(stream, format), chunk_size):
+            import_chunk(db, chunk, result)
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="Import patients or day records from a CSV or NDJSON file")
+    parser.add_argument("dataset", choices=IMPORTERS)
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=FORMATS, help="defaults to ndjson for .ndjson/.jsonl files, csv otherwise")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+
+    format = args.format or ("ndjson" if args.path.endswith((".ndjson", ".jsonl")) else "csv")
+    with open(args.path, "rb") as stream:
+        result = import_file(args.dataset, stream, format, args.chunk_size)
+    print(result.model_dump_json(indent=2))
+    sys.exit(1 if result.errors else 0)
+
+if __name__ == "__main__":
+    main()
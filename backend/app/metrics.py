@@ -0,0 +1,200 @@
+import threading
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+
+# Request and database metrics in the Prometheus text format, served at
+# /metrics. Kept in-process without a client library: a pure ASGI middleware
+# times each request against its route template and hooks on the engines
+# count statements, attributing them to the request through a context
+# variable. Recording is a few dict and list operations under a lock.
+#
+# Counts are per worker process; scrape each worker (or run one) to see all
+# of them.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 250)
+# Requests that match no route share one label, so stray URLs don't add series
+UNMATCHED_ROUTE = "<unmatched>"
+
+class Histogram:
+    def __init__(self, name: str, help: str, buckets: tuple, labels: tuple[str, ...] = ()):
+        self.name, self.help, self.buckets, self.labels = name, help, buckets, labels
+        # label values -> [bucket counts..., +Inf count, sum]
+        self.series: dict[tuple, list] = {}
+
+    def observe(self, value: float, *label_values):
+        series = self.series.get(label_values)
+        if series is None:
+            series = self.series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[i] += 1
+                break
+        else:
+            series[len(self.buckets)] += 1
+        series[-1] += value
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for label_values, series in sorted(self.series.items()):
+            labels = _labels(self.labels, label_values)
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), series):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels((*self.labels, 'le'), (*label_values, bound))} {cumulative}")
+            lines.append(f"{self.name}_sum{labels} {series[-1]}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = (), type: str = "counter"):
+        self.name, self.help, self.labels, self.type = name, help, labels, type
+        self.values: dict[tuple, float] = {}
+
+    def inc(self, *label_values, amount: float = 1):
+        self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        lines += [f"{self.name}{_labels(self.labels, label_values)} {value}"
+                  for label_values, value in sorted(self.values.items())]
+        return lines
+
+def Gauge(name: str, help: str, labels: tuple[str, ...] = ()) -> Counter:
+    return Counter(name, help, labels, type="gauge")
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: tuple, values: tuple) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+_lock = threading.Lock()
+
+requests_total = Counter("http_requests_total", "HTTP requests by route and status", ("method", "route", "status"))
+request_seconds = Histogram("http_request_duration_seconds", "HTTP request latency", LATENCY_BUCKETS, ("method", "route"))
+requests_in_flight = Gauge("http_requests_in_flight", "HTTP requests being served")
+request_statements = Histogram("http_request_sql_statements", "SQL statements executed per request",
+                               STATEMENT_BUCKETS, ("method", "route"))
+request_sql_seconds = Histogram("http_request_sql_duration_seconds", "Time spent in SQL per request",
+                                LATENCY_BUCKETS, ("method", "route"))
+statements_total = Counter("sql_statements_total", "SQL statements executed", ("engine",))
+statement_seconds = Histogram("sql_statement_duration_seconds", "SQL statement latency", LATENCY_BUCKETS, ("engine",))
+pool_checkouts = Counter("db_pool_checkouts_total", "Connections checked out of the pool", ("engine",))
+pool_connects = Counter("db_pool_connections_opened_total", "New database connections opened", ("engine",))
+startup_seconds = Gauge("app_startup_seconds", "Time this worker took to start, by phase", ("phase",))
+
+# Engines whose pools are reported on each scrape, by label
+_engines: dict = {}
+
+# SQL done on behalf of the current request: [statements, seconds]
+_request_sql: ContextVar[Optional[list]] = ContextVar("request_sql", default=None)
+# ASGI scope of the current request; routing fills in scope["route"]
+_request_scope: ContextVar[Optional[dict]] = ContextVar("request_scope", default=None)
+
+# "METHOD /route/{template}" of the request being served, or None outside one
+def current_route() -> Optional[str]:
+    scope = _request_scope.get()
+    if scope is None:
+        return None
+    route = scope.get("route")
+    return f"{scope['method']} {route.path if route is not None else scope['path']}"
+
+def instrument_engine(engine, label: str):
+    _engines[label] = engine
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["metrics_started"].pop()
+        with _lock:
+            statements_total.inc(label)
+            statement_seconds.observe(elapsed, label)
+        request_sql = _request_sql.get()
+        if request_sql is not None:
+            request_sql[0] += 1
+            request_sql[1] += elapsed
+
+    @event.listens_for(engine, "checkout")
+    def _checkout(dbapi_connection, connection_record, connection_proxy):
+        with _lock:
+            pool_checkouts.inc(label)
+
+    @event.listens_for(engine, "connect")
+    def _connect(dbapi_connection, connection_record):
+        with _lock:
+            pool_connects.inc(label)
+
+# Times each HTTP request and attributes the SQL it runs to its route
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        status = 500
+        request_sql = [0, 0.0]
+        token = _request_sql.set(request_sql)
+        scope_token = _request_scope.set(scope)
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        with _lock:
+            requests_in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            _request_sql.reset(token)
+            _request_scope.reset(scope_token)
+            route = scope.get("route")
+            labels = (scope["method"], route.path if route is not None else UNMATCHED_ROUTE)
+            with _lock:
+                requests_in_flight.inc(amount=-1)
+                requests_total.inc(*labels, status)
+                request_seconds.observe(elapsed, *labels)
+                request_statements.observe(request_sql[0], *labels)
+                request_sql_seconds.observe(request_sql[1], *labels)
+
+# Phase name -> seconds, set once by startup.prepare_database
+def record_startup(phases: dict[str, float]):
+    with _lock:
+        startup_seconds.values = {(phase,): seconds for phase, seconds in phases.items()}
+
+def _pool_lines() -> list[str]:
+    gauges = {
+        "db_pool_size": ("Configured pool size", lambda pool: pool.size()),
+        "db_pool_checked_out": ("Connections currently in use", lambda pool: pool.checkedout()),
+        "db_pool_overflow": ("Connections open beyond the pool size", lambda pool: max(pool.overflow(), 0)),
+    }
+    lines = []
+    for name, (help, read) in gauges.items():
+        lines += [f"# HELP {name} {help}", f"# TYPE {name} gauge"]
+        for label, engine in sorted(_engines.items()):
+            pool = engine.pool
+            # Single-connection pools (in-memory databases) have no sizing
+            if hasattr(pool, "checkedout"):
+                lines.append(f"{name}{_labels(('engine',), (label,))} {read(pool)}")
+    return lines
+
+def render() -> str:
+    with _lock:
+        lines = []
+        for metric in (requests_total, request_seconds, requests_in_flight, request_statements, request_sql_seconds,
+                       statements_total, statement_seconds, pool_checkouts, pool_connects, startup_seconds):
+            lines += metric.render()
+    return "\n".join(lines + _pool_lines()) + "\n"
@@ -3,6 +3,7 @@ from typing import Optional, List
 from enum import Enum
 from datetime import date, time, datetime
 from pydantic import validator
+from sqlalchemy import Index, text
 
 # Gender Enum (Only Male and Female)
 class GenderEnum(str, Enum):
@@ -14,11 +15,8 @@ class StatusEnum(str, Enum):
     active = "Active"
     inactive = "Inactive"
 
-# Patient model
-class Patient(SQLModel, table=True):
-    __tablename__ = "patients"  # Explicitly set table name
-
-    id: Optional[int] = Field(default=None, primary_key=True)
+# Fields shared by the Patient table and its response shapes
+class PatientBase(SQLModel):
     study_code: str = Field(index=True, unique=True)
     abbreviation_name: str
     year_of_birth: int
@@ -26,11 +24,22 @@ class Patient(SQLModel, table=True):
     status: StatusEnum = Field(default=StatusEnum.active)
     # status: Enum = Enum("Active", "Inactive")
     # status_date: Optional[date] = Field(default=None)
-    # Relationship to PatientDayRecord
     summary: str = Field(default="")
-    day_records: list["PatientDayRecord"] = Relationship(back_populates="patient")
-    model_log: list["ModelLog"] = Relationship(back_populates="patient",sa_relationship_kwargs={"cascade": "all, delete"})
-    pipeline_log: list["PipelineLog"] = Relationship(back_populates="patient",sa_relationship_kwargs={"cascade": "all, delete"})
+
+# Patient model
+class Patient(PatientBase, table=True):
+    __tablename__ = "patients"  # Explicitly set table name
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    # Bumped by every update; PATCH only applies to the version the client read
+    version: int = Field(default=1, sa_column_kwargs={"server_default": "1"})
+    # Set while the patient is withdrawn (soft-deleted); see crud.delete_patient
+    deleted_at: Optional[datetime] = Field(default=None, exclude=True)
+    # Children go with the patient through ON DELETE CASCADE; passive_deletes
+    # keeps the ORM from loading them first
+    day_records: list["PatientDayRecord"] = Relationship(back_populates="patient", passive_deletes="all")
+    model_log: list["ModelLog"] = Relationship(back_populates="patient", passive_deletes="all")
+    pipeline_log: list["PipelineLog"] = Relationship(back_populates="patient", passive_deletes="all")
 
 # PossibleReason model
 class PossibleReason(SQLModel, table=True):
@@ -46,12 +55,19 @@ class Event(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     event: str = Field(unique=True)
 
-# PatientDayRecord model
-class PatientDayRecord(SQLModel, table=True):
-    __tablename__ = "patient_day_records"  # Explicitly set table name
+# Links a day record to each event named in its event_during_24_hours
+class PatientDayRecordEvent(SQLModel, table=True):
+    __tablename__ = "patient_day_record_events"
+    # "Records with event X" reads this index alone; the primary key serves
+    # the per-record direction
+    __table_args__ = (Index("ix_patient_day_record_events_event_id_record_id", "event_id", "record_id"),)
 
-    id: Optional[int] = Field(default=None, primary_key=True)
-    patient_id: int = Field(foreign_key="patients.id")  # Reference to patients table
+    record_id: int = Field(foreign_key="patient_day_records.id", primary_key=True, ondelete="CASCADE")
+    event_id: int = Field(foreign_key="events.id", primary_key=True, ondelete="CASCADE")
+
+# Fields shared by the PatientDayRecord table and its response shapes
+class PatientDayRecordBase(SQLModel):
+    patient_id: int = Field(foreign_key="patients.id", index=True, ondelete="CASCADE")  # Reference to patients table
     date_of_alert: Optional[str] = None
     time_of_alert: Optional[str] = None
     date_of_assessment: Optional[str] = Field(default=None)
@@ -60,25 +76,31 @@ class PatientDayRecord(SQLModel, table=True):
     new_information: Optional[int] = None  # Scale 0-7
     expected_alert: Optional[int] = None  # Scale 0-7
     event_at_alert_id: Optional[int] = Field(default=None, foreign_key="events.id")  # Reference to events table
-    event_during_24_hours: Optional[str]  # Comma-separated values
+    event_during_24_hours: Optional[str]  # Comma-separated event names, mirrored in patient_day_record_events
     notes: Optional[str] = None
+
+# PatientDayRecord model
+class PatientDayRecord(PatientDayRecordBase, table=True):
+    __tablename__ = "patient_day_records"  # Explicitly set table name
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    # Bumped by every update; PATCH only applies to the version the client read
+    version: int = Field(default=1, sa_column_kwargs={"server_default": "1"})
     
     patient: Patient = Relationship(back_populates="day_records")
     possible_reason: PossibleReason = Relationship()
     event_at_alert: Event = Relationship()
+    events: list[Event] = Relationship(link_model=PatientDayRecordEvent)
 
-class ModelLog(SQLModel, table=True):
-    __tablename__ = "model_log"
-    id: Optional[int] = Field(default=None, primary_key=True)
-    patient_id: int = Field(foreign_key="patients.id")  # Reference to patients table
+# Fields shared by the ModelLog table and its request bodies
+class ModelLogBase(SQLModel):
+    patient_id: int = Field(foreign_key="patients.id", ondelete="CASCADE")  # Reference to patients table
     content: str
     raw_content: str
     date: date
     time: time
     ack: bool = Field(default=False)
-    
-    patient: Patient = Relationship(back_populates="model_log")
-    
+
     @validator('date', pre=True)
     def validate_date(cls, v):
         if isinstance(v, str):
@@ -91,10 +113,21 @@ class ModelLog(SQLModel, table=True):
             return time.fromisoformat(v)
         return v
 
-class PipelineLog(SQLModel, table=True):
-    __tablename__ = "pipeline_log"
+class ModelLog(ModelLogBase, table=True):
+    __tablename__ = "model_log"
+    # Serves the per-patient listing ordered by date/time without a sort step
+    __table_args__ = (
+        Index("ix_model_log_patient_id_date_time", "patient_id", "date", "time"),
+        # Only unacknowledged alerts, so per-patient counts of them stay small
+        Index("ix_model_log_patient_id_unacked", "patient_id", sqlite_where=text("ack = 0")),
+    )
     id: Optional[int] = Field(default=None, primary_key=True)
-    patient_id: int = Field(foreign_key="patients.id")  # Reference to patients table
+    
+    patient: Patient = Relationship(back_populates="model_log")
+
+# Fields shared by the PipelineLog table and its request bodies
+class PipelineLogBase(SQLModel):
+    patient_id: int = Field(foreign_key="patients.id", ondelete="CASCADE")  # Reference to patients table
     date: date
     time: time
     content: str
@@ -102,7 +135,6 @@ class PipelineLog(SQLModel, table=True):
     # Email mode: 0 off while 1 on
     # email_mode: bool
     # change_email_mode_timestamp: datetime
-    patient: Patient = Relationship(back_populates="pipeline_log")
 
     @validator('date', pre=True)
     def validate_date(cls, v):
@@ -116,6 +148,23 @@ class PipelineLog(SQLModel, table=True):
             return time.fromisoformat(v)
         return v
 
+# Pipeline payloads stored once and shared by every log that repeats them
+# (see dedup.py); refcount is kept by triggers on pipeline_log
+class LogBlob(SQLModel, table=True):
+    __tablename__ = "log_blobs"
+    hash: str = Field(primary_key=True)  # SHA-256 hex of content
+    content: str
+    size: int
+    refcount: int = Field(default=0)
+
+class PipelineLog(PipelineLogBase, table=True):
+    __tablename__ = "pipeline_log"
+    __table_args__ = (Index("ix_pipeline_log_patient_id_date_time", "patient_id", "date", "time"),)
+    id: Optional[int] = Field(default=None, primary_key=True)
+    # Set when raw_content lives in log_blobs; the column then holds ''
+    raw_content_hash: Optional[str] = Field(default=None, foreign_key="log_blobs.hash", exclude=True)
+    patient: Patient = Relationship(back_populates="pipeline_log")
+
 class SystemLog(SQLModel, table=True):
     __tablename__ = "system_log"
     id: Optional[int] = Field(default=None, primary_key=True)
@@ -123,3 +172,10 @@ class SystemLog(SQLModel, table=True):
     email_mode: bool
     change_email_mode_timestamp: datetime
     
+
+# Last heartbeat of each model/pipeline process, shared by all API workers
+class Heartbeat(SQLModel, table=True):
+    __tablename__ = "heartbeats"
+    name: str = Field(primary_key=True)
+    running: bool
+    last_seen: datetime
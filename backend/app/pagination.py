@@ -0,0 +1,68 @@
+import base64
+import json
+from datetime import date, time
+from typing import Optional
+
+from fastapi import HTTPException, Response
+
+# Keyset pagination helpers shared by the list endpoints.
+# A page carries the cursor of the next page in the X-Next-Cursor header so
+# the body stays a plain JSON array; the header is absent on the last page.
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def encode_cursor(*values) -> str:
+    payload = json.dumps([v.isoformat() if isinstance(v, (date, time)) else v for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def _decode(cursor: str, size: int) -> list:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+# Cursor over an integer primary key
+def decode_id_cursor(cursor: Optional[str]) -> Optional[int]:
+    if cursor is None:
+        return None
+    (last_id,) = _decode(cursor, 1)
+    if not isinstance(last_id, int):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return last_id
+
+# Cursor over the (date, time, id) ordering of the log tables
+def decode_log_cursor(cursor: Optional[str]) -> Optional[tuple[date, time, int]]:
+    if cursor is None:
+        return None
+    last_date, last_time, last_id = _decode(cursor, 3)
+    try:
+        return date.fromisoformat(last_date), time.fromisoformat(last_time), int(last_id)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+# Cursor over a (sort value, id) ordering, e.g. the patient stats listing
+def decode_sort_cursor(cursor: Optional[str]) -> Optional[tuple[str | int, int]]:
+    if cursor is None:
+        return None
+    value, last_id = _decode(cursor, 2)
+    if not isinstance(value, (str, int)) or not isinstance(last_id, int):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return value, last_id
+
+# Trim a page fetched with limit + 1 rows and advertise the next cursor if there is one
+def paginate(response: Response, rows: list, limit: int, key) -> list:
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(*key(rows[-1]))
+    return rows
+
+def id_key(row):
+    return (row.id,)
+
+def log_key(row):
+    return (row.date, row.time, row.id)
@@ -0,0 +1,52 @@
+import json
+from datetime import date, time
+from enum import Enum
+from typing import Optional
+
+from fastapi import HTTPException, Response
+
+try:
+    import orjson
+except ImportError:  # Falls back to the stdlib encoder
+    orjson = None
+
+# Sparse fieldsets and direct encoding for the list endpoints.
+# The list endpoints select only the columns named in ?fields=id,date,content
+# (by default every column the model shows) as plain rows, and encode them with
+# orjson straight into the response. This replaces building model instances,
+# validating each one against response_model and running jsonable_encoder.
+# The rows come from our own tables, so validation has nothing to catch, and
+# the bodies are the same as before.
+
+# Columns a model shows in responses, in response_model order
+def fields_of(model) -> list[str]:
+    return [name for name, field in model.model_fields.items() if not field.exclude and name in model.__table__.c]
+
+def parse_fields(model, fields: Optional[str]) -> list[str]:
+    available = fields_of(model)
+    if fields is None:
+        return available
+    requested = list(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    unknown = [name for name in requested if name not in available]
+    if unknown or not requested:
+        raise HTTPException(status_code=400, detail=f"Unknown fields {unknown}, expected some of {available}")
+    return requested
+
+def _default(value):
+    if isinstance(value, (date, time)):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    raise TypeError(f"Cannot encode {type(value).__name__}")
+
+def dumps(value) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, default=_default, separators=(",", ":")).encode()
+
+# JSON array of rows whose leading columns are `fields`; columns after them
+# (selected only for the cursor) are left out. Keeps the headers set on the
+# endpoint's response, such as the next page cursor.
+def rows_response(response: Response, rows: list, fields: list[str]) -> Response:
+    body = dumps([dict(zip(fields, row)) for row in rows])
+    return Response(body, media_type="application/json", headers=dict(response.headers))
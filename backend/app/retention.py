@@ -0,0 +1,200 @@
+import sys
+import os
+# Add project root directory to sys.path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../"))
+sys.path.insert(0, project_root)
+import argparse
+import zlib
+from dataclasses import replace
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from typing import Optional
+
+from sqlalchemy import (
+    Boolean, Column, Date, DateTime, Integer, LargeBinary, MetaData, String, Table, Time, delete, func, insert, select,
+)
+from sqlalchemy.engine import make_url
+from sqlmodel import Session
+from backend.app.config import get_settings
+from backend.app.database import engine, make_engine
+from backend.app import dedup
+from backend.app.models import ModelLog, PipelineLog
+
+# Tiered retention for the log tables.
+# Logs older than RETENTION_DAYS are moved, BATCH_SIZE rows at a time, into
+# a sidecar archive database with raw_content zlib-compressed. The hot
+# database keeps only recent logs, so the per-patient listings stay in the
+# page cache. Archived logs no longer show up in listings or search; the
+# by_id endpoints and the exports (see export.py) still include them and
+# decompress raw_content.
+#
+#     python -m backend.app.retention --dry-run
+#     python -m backend.app.retention --days 90 --vacuum
+
+BATCH_SIZE = 5000
+COMPRESSION_LEVEL = 6
+
+archive_metadata = MetaData()
+
+def _archive_table(name: str, *extra):
+    return Table(
+        name, archive_metadata,
+        Column("id", Integer, primary_key=True),
+        Column("patient_id", Integer, nullable=False, index=True),
+        Column("date", Date, nullable=False),
+        Column("time", Time, nullable=False),
+        Column("content", String, nullable=False),
+        *extra,
+        Column("raw_content", LargeBinary, nullable=False),  # zlib
+        Column("archived_at", DateTime, nullable=False),
+    )
+
+# Log model -> its archive table
+ARCHIVES = {
+    ModelLog: _archive_table("model_log_archive", Column("ack", Boolean, nullable=False)),
+    PipelineLog: _archive_table("pipeline_log_archive"),
+}
+
+SOURCES = {model.__tablename__: model for model in ARCHIVES}
+
+def archive_url(settings=None) -> str:
+    settings = settings or get_settings()
+    if settings.archive_database_url:
+        return settings.archive_database_url
+    url = make_url(settings.database_url)
+    if url.database in (None, "", ":memory:"):
+        return "sqlite://"
+    root, extension = os.path.splitext(url.database or "")
+    return url.set(database=f"{root}.archive{extension or '.db'}").render_as_string(hide_password=False)
+
+def archive_exists() -> bool:
+    url = make_url(archive_url())
+    return url.get_backend_name() != "sqlite" or url.database in (None, "", ":memory:") or os.path.exists(url.database)
+
+@lru_cache
+def get_archive_engine():
+    archive_engine = make_engine(replace(get_settings(), database_url=archive_url()))
+    archive_metadata.create_all(archive_engine)
+    return archive_engine
+
+def cutoff_date(days: int, today: Optional[date] = None) -> date:
+    return (today or date.today()) - timedelta(days=days)
+
+# Rows of `model` dated before `cutoff`: how many and their raw_content size
+def pending(db: Session, model, cutoff: date) -> tuple[int, int]:
+    raw_content = model.raw_content
+    if model is PipelineLog:
+        # Deduplicated payloads live in log_blobs, and are archived in full
+        raw_content = dedup.raw_content
+    query = select(func.count(), func.coalesce(func.sum(func.length(raw_content)), 0)).select_from(model)
+    if model is PipelineLog:
+        query = dedup.join_blobs(query)
+    count, size = db.execute(query.where(model.date < cutoff)).one()
+    return count, size
+
+# Move the logs of `model` dated before `cutoff` to the archive. Each batch
+# is written to the archive first and then deleted here, so an interrupted
+# run leaves rows in both places and the next run simply archives them again.
+# Returns (rows, raw bytes, compressed bytes).
+def archive_logs(db: Session, model, cutoff: date, batch_size: int = BATCH_SIZE) -> tuple[int, int, int]:
+    archive = ARCHIVES[model]
+    columns = [model.__table__.c[column.name] for column in archive.columns if column.name != "archived_at"]
+    query = select(*columns)
+    if model is PipelineLog:
+        # Deduplicated payloads are archived in full
+        query = dedup.join_blobs(select(*(dedup.raw_content if column.name == "raw_content" else column for column in columns)))
+    # OR REPLACE makes re-archiving a row left behind by an interrupted run harmless
+    archive_insert = insert(archive).prefix_with("OR REPLACE")
+    rows_moved = raw_bytes = compressed_bytes = 0
+    last_id = 0
+    archive_engine = get_archive_engine()
+    while True:
+        rows = db.execute(
+            query.where(model.date < cutoff, model.id > last_id).order_by(model.id).limit(batch_size)
+        ).mappings().all()
+        if not rows:
+            break
+        archived_at = datetime.now()
+        batch = []
+        for row in rows:
+            raw = row["raw_content"].encode()
+            packed = zlib.compress(raw, COMPRESSION_LEVEL)
+            raw_bytes += len(raw)
+            compressed_bytes += len(packed)
+            batch.append({**row, "raw_content": packed, "archived_at": archived_at})
+        with archive_engine.begin() as conn:
+            conn.execute(archive_insert, batch)
+        ids = [row["id"] for row in rows]
+        db.execute(delete(model).where(model.id.in_(ids)))
+        db.commit()
+        rows_moved += len(rows)
+        last_id = ids[-1]
+    return rows_moved, raw_bytes, compressed_bytes
+
+# An archived log as a (detached) model instance, or None
+def get_archived_log(model, log_id: int):
+    if not archive_exists():
+        return None
+    archive = ARCHIVES[model]
+    with get_archive_engine().connect() as conn:
+        row = conn.execute(select(archive).where(archive.c.id == log_id)).mappings().first()
+    if row is None:
+        return None
+    values = {key: value for key, value in row.items() if key != "archived_at"}
+    values["raw_content"] = zlib.decompress(values["raw_content"]).decode()
+    return model(**values)
+
+# Drop the archived logs of a patient who has been deleted
+def delete_archived_logs(patient_id: int):
+    if not archive_exists():
+        return
+    with get_archive_engine().begin() as conn:
+        for archive in ARCHIVES.values():
+            conn.execute(delete(archive).where(archive.c.patient_id == patient_id))
+
+def _file_size(url: str) -> Optional[int]:
+    url = make_url(url)
+    if url.get_backend_name() != "sqlite" or not url.database or not os.path.exists(url.database):
+        return None
+    return sum(os.path.getsize(path) for path in (url.database, url.database + "-wal") if os.path.exists(path))
+
+# Rebuild the hot database so the space freed by archiving goes back to the
+# file system. Needs no other writers for its duration.
+def vacuum():
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.exec_driver_sql("VACUUM")
+        conn.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+
+def _megabytes(size: Optional[int]) -> str:
+    return "?" if size is None else f"{size / 1024 / 1024:.1f} MiB"
+
+def main():
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="Move old model and pipeline logs to the compressed archive")
+    parser.add_argument("--days", type=int, default=settings.retention_days,
+                        help=f"archive logs dated more than this many days ago (default {settings.retention_days})")
+    parser.add_argument("--source", choices=SOURCES, action="append", help="log table to archive (default: both)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--dry-run", action="store_true", help="only report what would be archived")
+    parser.add_argument("--vacuum", action="store_true", help="VACUUM the main database afterwards")
+    args = parser.parse_args()
+
+    cutoff = cutoff_date(args.days)
+    models = [SOURCES[source] for source in args.source or SOURCES]
+    print(f"Archiving logs dated before {cutoff} to {archive_url()}")
+    with Session(engine) as db:
+        for model in models:
+            if args.dry_run:
+                count, size = pending(db, model, cutoff)
+                print(f"{model.__tablename__}: {count} rows, {_megabytes(size)} of raw_content")
+                continue
+            count, raw_bytes, compressed_bytes = archive_logs(db, model, cutoff, args.batch_size)
+            print(f"{model.__tablename__}: archived {count} rows, raw_content {_megabytes(raw_bytes)}"
+                  f" -> {_megabytes(compressed_bytes)}")
+    if args.vacuum and not args.dry_run:
+        before = _file_size(settings.database_url)
+        vacuum()
+        print(f"VACUUM: {_megabytes(before)} -> {_megabytes(_file_size(settings.database_url))}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+from fastapi import APIRouter, Query
+from backend.app import slow_queries
+from backend.app.schemas import SlowQueryReport
+
+router = APIRouter()
+
+# Slow statements seen by this worker, grouped by normalized SQL; recent=N
+# adds the latest N executions as recorded
+@router.get("/slow-queries", response_model=SlowQueryReport)
+def get_slow_queries(recent: int = Query(0, ge=0)):
+    log = slow_queries.log
+    entries = log.recent()
+    return SlowQueryReport(
+        threshold_ms=log.threshold_ms,
+        capacity=log.size,
+        recorded=len(entries),
+        statements=log.statements(),
+        recent=entries[:recent],
+    )
+
+# Start over, e.g. after adding an index
+@router.delete("/slow-queries", status_code=204)
+def clear_slow_queries():
+    slow_queries.log.clear()
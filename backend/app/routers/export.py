@@ -0,0 +1,20 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from typing import Literal
+from backend.app import export
+
+router = APIRouter()
+
+# Stream a whole dataset as CSV, NDJSON or Parquet
+@router.get("/{dataset}")
+def export_dataset(dataset: str, format: Literal["csv", "ndjson", "parquet"] = "csv"):
+    if dataset not in export.DATASETS:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+    if format == "parquet" and export.arrow() is None:
+        raise HTTPException(status_code=501, detail="Parquet export requires pyarrow")
+    media_type, extension = export.FORMATS[format]
+    return StreamingResponse(
+        export.WRITERS[format](*export.dataset_rows(dataset)),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{dataset}.{extension}"'},
+    )
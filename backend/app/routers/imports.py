@@ -0,0 +1,23 @@
+import tempfile
+from fastapi import APIRouter, HTTPException, Request
+from starlette.concurrency import run_in_threadpool
+from typing import Literal
+from backend.app import importer
+from backend.app.schemas import ImportResult
+
+router = APIRouter()
+
+# Uploads up to this size stay in memory, larger ones go to a temp file
+SPOOL_SIZE = 8 * 1024 * 1024
+
+# Import patients or day records from the CSV/NDJSON request body
+@router.post("/{dataset}", response_model=ImportResult)
+async def import_dataset(dataset: str, request: Request, format: Literal["csv", "ndjson"] = "csv"):
+    if dataset not in importer.IMPORTERS:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE) as upload:
+        async for part in request.stream():
+            upload.write(part)
+        upload.seek(0)
+        # Parsing and inserting is blocking work; keep it off the event loop
+        return await run_in_threadpool(importer.import_file, dataset, upload, format)
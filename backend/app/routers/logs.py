@@ -1,40 +1,73 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import Session
-from backend.app.database import get_session
-from backend.app.models import ModelLog, PipelineLog, SystemLog
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from starlette.concurrency import run_in_threadpool
+from backend.app.database import AnySession, get_db
+from backend.app.async_crud import call
+from backend.app.models import ModelLog, PipelineLog, SystemLog, ModelLogBase, PipelineLogBase
+from backend.app.schemas import BatchInsertResult, AckRequest, AckResult, DedupStats
+from backend.app import dedup, retention
+from backend.app.projection import parse_fields, rows_response
 import backend.app.crud as crud
+from backend.app.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, decode_log_cursor, paginate, log_key
 from datetime import datetime
-# from typing import Optional
+from typing import Optional
 
 router = APIRouter()
 
+# 422 in the shape of FastAPI's validation errors, one per log of the batch
+# whose patient doesn't exist
+def unknown_patients_error(unknown: crud.UnknownPatients) -> HTTPException:
+    return HTTPException(status_code=422, detail=[
+        {"loc": ["body", index, "patient_id"], "msg": "Patient not found", "type": "value_error"}
+        for index in unknown.indexes
+    ])
+
 # --- ModelLog Endpoints ---
 
 @router.post("/model_log/", response_model=ModelLog)
-def create_model_log(log: ModelLog, db: Session = Depends(get_session)):
-    return crud.create_model_log(db=db, log=log)
-
+async def create_model_log(log: ModelLog, db: AnySession = Depends(get_db)):
+    return await call(crud.create_model_log, db, log=log)
+
+@router.post("/model_log/batch", response_model=BatchInsertResult)
+async def create_model_logs_batch(logs: list[ModelLogBase], db: AnySession = Depends(get_db)):
+    try:
+        ids = await call(crud.create_model_logs, db, logs=logs)
+    except crud.UnknownPatients as unknown:
+        raise unknown_patients_error(unknown)
+    return BatchInsertResult(count=len(ids), ids=ids)
+
+# Acknowledge many alerts in one statement
+@router.post("/model_log/ack", response_model=AckResult)
+async def ack_model_logs(request: AckRequest, db: AnySession = Depends(get_db)):
+    count = await call(crud.ack_model_logs, db, ids=request.ids, patient_id=request.patient_id, up_to=request.up_to)
+    return AckResult(acknowledged=count)
+
+# ?fields=id,date,time,content picks the columns returned; raw_content is the heavy one
 @router.get("/model_log/{patient_id}", response_model=list[ModelLog])
-def get_model_logs(patient_id: int, skip: int = 0, limit: int = None, db: Session = Depends(get_session)):
-    return crud.get_model_logs(db=db, patient_id=patient_id, skip=skip, limit=limit)
+async def get_model_logs(patient_id: int, response: Response, cursor: Optional[str] = None, limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), fields: Optional[str] = None, db: AnySession = Depends(get_db)):
+    fields = parse_fields(ModelLog, fields)
+    logs = await call(crud.get_log_rows, db, model=ModelLog, patient_id=patient_id, fields=fields, before=decode_log_cursor(cursor), limit=limit + 1)
+    return rows_response(response, paginate(response, logs, limit, log_key), fields)
 
 @router.get("/model_log/by_id/{log_id}", response_model=ModelLog)
-def get_model_log_by_id(log_id: int, db: Session = Depends(get_session)):
-    log = crud.get_model_log_by_id(db=db, log_id=log_id)
+async def get_model_log_by_id(log_id: int, db: AnySession = Depends(get_db)):
+    log = await call(crud.get_model_log_by_id, db, log_id=log_id)
+    if not log:
+        # The archive is read through a sync engine, so keep it off the event loop
+        log = await run_in_threadpool(retention.get_archived_log, ModelLog, log_id)
     if not log:
         raise HTTPException(status_code=404, detail="ModelLog not found")
     return log
 
 @router.put("/model_log/{log_id}", response_model=ModelLog)
-def update_model_log(log_id: int, log: ModelLog, db: Session = Depends(get_session)):
-    updated_log = crud.update_model_log(db=db, log_id=log_id, updated_log=log)
+async def update_model_log(log_id: int, log: ModelLog, db: AnySession = Depends(get_db)):
+    updated_log = await call(crud.update_model_log, db, log_id=log_id, updated_log=log)
     if not updated_log:
         raise HTTPException(status_code=404, detail="ModelLog not found")
     return updated_log
 
 @router.delete("/model_log/{log_id}", response_model=dict)
-def delete_model_log(log_id: int, db: Session = Depends(get_session)):
-    deleted_log = crud.delete_model_log(db=db, log_id=log_id)
+async def delete_model_log(log_id: int, db: AnySession = Depends(get_db)):
+    deleted_log = await call(crud.delete_model_log, db, log_id=log_id)
     if not deleted_log:
         raise HTTPException(status_code=404, detail="ModelLog not found")
     return {"message": "ModelLog deleted successfully"}
@@ -42,30 +75,48 @@ def delete_model_log(log_id: int, db: Session = Depends(get_session)):
 # --- PipelineLog Endpoints ---
 
 @router.post("/pipeline_log/", response_model=PipelineLog)
-def create_pipeline_log(log: PipelineLog, db: Session = Depends(get_session)):
-    return crud.create_pipeline_log(db=db, log=log)
-
+async def create_pipeline_log(log: PipelineLog, db: AnySession = Depends(get_db)):
+    return await call(crud.create_pipeline_log, db, log=log)
+
+@router.post("/pipeline_log/batch", response_model=BatchInsertResult)
+async def create_pipeline_logs_batch(logs: list[PipelineLogBase], db: AnySession = Depends(get_db)):
+    try:
+        ids = await call(crud.create_pipeline_logs, db, logs=logs)
+    except crud.UnknownPatients as unknown:
+        raise unknown_patients_error(unknown)
+    return BatchInsertResult(count=len(ids), ids=ids)
+
+# How much storage payload deduplication saves
+@router.get("/pipeline_log/dedup_stats", response_model=DedupStats)
+async def get_pipeline_log_dedup_stats(db: AnySession = Depends(get_db)):
+    return await call(dedup.dedup_stats, db)
+
+# ?fields=id,date,time,content picks the columns returned; raw_content is the heavy one
 @router.get("/pipeline_log/{patient_id}", response_model=list[PipelineLog])
-def get_pipeline_logs(patient_id: int, skip: int = 0, limit: int = None, db: Session = Depends(get_session)):
-    return crud.get_pipeline_logs(db=db, patient_id=patient_id, skip=skip, limit=limit)
+async def get_pipeline_logs(patient_id: int, response: Response, cursor: Optional[str] = None, limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), fields: Optional[str] = None, db: AnySession = Depends(get_db)):
+    fields = parse_fields(PipelineLog, fields)
+    logs = await call(crud.get_log_rows, db, model=PipelineLog, patient_id=patient_id, fields=fields, before=decode_log_cursor(cursor), limit=limit + 1)
+    return rows_response(response, paginate(response, logs, limit, log_key), fields)
 
 @router.get("/pipeline_log/by_id/{log_id}", response_model=PipelineLog)
-def get_pipeline_log_by_id(log_id: int, db: Session = Depends(get_session)):
-    log = crud.get_pipeline_log_by_id(db=db, log_id=log_id)
+async def get_pipeline_log_by_id(log_id: int, db: AnySession = Depends(get_db)):
+    log = await call(crud.get_pipeline_log_by_id, db, log_id=log_id)
+    if not log:
+        log = await run_in_threadpool(retention.get_archived_log, PipelineLog, log_id)
     if not log:
         raise HTTPException(status_code=404, detail="PipelineLog not found")
     return log
 
 @router.put("/pipeline_log/{log_id}", response_model=PipelineLog)
-def update_pipeline_log(log_id: int, log: PipelineLog, db: Session = Depends(get_session)):
-    updated_log = crud.update_pipeline_log(db=db, log_id=log_id, updated_log=log)
+async def update_pipeline_log(log_id: int, log: PipelineLog, db: AnySession = Depends(get_db)):
+    updated_log = await call(crud.update_pipeline_log, db, log_id=log_id, updated_log=log)
     if not updated_log:
         raise HTTPException(status_code=404, detail="PipelineLog not found")
     return updated_log
 
 @router.delete("/pipeline_log/{log_id}", response_model=dict)
-def delete_pipeline_log(log_id: int, db: Session = Depends(get_session)):
-    deleted_log = crud.delete_pipeline_log(db=db, log_id=log_id)
+async def delete_pipeline_log(log_id: int, db: AnySession = Depends(get_db)):
+    deleted_log = await call(crud.delete_pipeline_log, db, log_id=log_id)
     if not deleted_log:
         raise HTTPException(status_code=404, detail="PipelineLog not found")
     return {"message": "PipelineLog deleted successfully"}
@@ -102,34 +153,34 @@ def delete_pipeline_log(log_id: int, db: Session = Depends(get_session)):
 #     return {"message": "SystemLog deleted successfully"}
 
 @router.post("/system_log", response_model=SystemLog)
-def create_system_log(log: SystemLog, db: Session = Depends(get_session)):
+async def create_system_log(log: SystemLog, db: AnySession = Depends(get_db)):
     # Ensure timestamp is converted to datetime
     if isinstance(log.change_email_mode_timestamp, str):
         log.change_email_mode_timestamp = datetime.fromisoformat(log.change_email_mode_timestamp.rstrip("Z"))
-    return crud.create_system_log(db=db, log=log)
+    return await call(crud.create_system_log, db, log=log)
 
 #get status send email
 @router.get("/system_log/latest", response_model=SystemLog)
-def get_latest_system_log(db: Session = Depends(get_session)):
-    logs = crud.get_system_logs(db=db, skip=0, limit=1, order_by="desc")  # Fetch latest log
+async def get_latest_system_log(db: AnySession = Depends(get_db)):
+    logs = await call(crud.get_system_logs, db, skip=0, limit=1, order_by="desc")  # Fetch latest log
     if not logs:
         raise HTTPException(status_code=404, detail="No SystemLog found")
     return logs[0]
 
 @router.get("/system_log", response_model=SystemLog)
-def get_latest_system_log(db: Session = Depends(get_session)):
-    logs = crud.get_system_logs(db=db, skip=0, limit=1, order_by="desc")  # Fetch latest log
+async def get_latest_system_log(db: AnySession = Depends(get_db)):
+    logs = await call(crud.get_system_logs, db, skip=0, limit=1, order_by="desc")  # Fetch latest log
     if not logs:
         raise HTTPException(status_code=404, detail="No SystemLog found")
     return logs
 
 @router.put("/system_log", response_model=SystemLog)
-def update_system_log(log: SystemLog, db: Session = Depends(get_session)):
+async def update_system_log(log: SystemLog, db: AnySession = Depends(get_db)):
     # Ensure timestamp is converted to datetime
     if isinstance(log.change_email_mode_timestamp, str):
         log.change_email_mode_timestamp = datetime.fromisoformat(log.change_email_mode_timestamp.rstrip("Z"))
 
-    updated_log = crud.update_system_log(db=db, updated_log=log)
+    updated_log = await call(crud.update_system_log, db, updated_log=log)
     if not updated_log:
         raise HTTPException(status_code=404, detail="SystemLog not found")
     return updated_log
@@ -1,33 +1,63 @@
-from fastapi import APIRouter, BackgroundTasks
+from fastapi import APIRouter
 from datetime import datetime, timedelta
 import asyncio
-from typing import Optional
 from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
+from backend.app.broadcast import hub
+from backend.app.database import engine, settings
+from backend.app.heartbeat import HeartbeatState, make_heartbeat_store
 
 router = APIRouter()
 
-# Global variables to track status
-last_heartbeat: Optional[datetime] = None
-is_model_running: bool = False
 TIMEOUT_SECONDS = 300  # Timeout threshold 5 minutes
+WATCH_INTERVAL_SECONDS = 2  # How often each worker looks for status changes to push
+DEFAULT_NAME = "model"
+
+# Heartbeats are shared by all workers; the running flag is derived on read
+store = make_heartbeat_store(settings.heartbeat_store, engine)
+# Last status this worker pushed to its stream clients, per name
+_announced: dict[str, bool] = {}
 
 class HeartbeatData(BaseModel):
     running: bool = True
+    name: str = DEFAULT_NAME
+
+def is_running(state: HeartbeatState | None, now: datetime) -> bool:
+    return state is not None and state.running and now - state.last_seen <= timedelta(seconds=TIMEOUT_SECONDS)
+
+def status_of(name: str) -> dict:
+    return {"name": name, "running": is_running(store.get(name), datetime.now())}
+
+# Push a status change to this worker's stream clients once
+def _announce(name: str, running: bool):
+    if _announced.get(name, False) != running:
+        _announced[name] = running
+        hub.publish("model_status", {"name": name, "running": running})
 
 @router.post("/heartbeat")
 async def heartbeat(data: HeartbeatData):
     """Endpoint for model to send heartbeat with status"""
-    global last_heartbeat, is_model_running
-    last_heartbeat = datetime.now()
-    is_model_running = data.running
-    return {"status": "ok", "running": is_model_running}
+    state = await run_in_threadpool(store.beat, data.name, data.running, datetime.now())
+    _announce(state.name, state.running)
+    return {"status": "ok", "running": state.running}
 
 @router.get("/status")
-async def get_status():
+async def get_status(name: str = DEFAULT_NAME):
     """Get current model status"""
-    global is_model_running
-    # Check for timeout
-    if last_heartbeat and datetime.now() - last_heartbeat > timedelta(seconds=TIMEOUT_SECONDS):
-        is_model_running = False
-    return {"running": is_model_running}
+    return await run_in_threadpool(status_of, name)
+
+@router.get("/statuses")
+async def get_statuses():
+    """Status of every model and pipeline that has sent a heartbeat"""
+    states = await run_in_threadpool(store.all)
+    now = datetime.now()
+    return [{"name": s.name, "running": is_running(s, now), "last_seen": s.last_seen} for s in states]
 
+async def watch_heartbeats():
+    """Push timeouts and changes reported to other workers, so stream clients never poll"""
+    while True:
+        await asyncio.sleep(WATCH_INTERVAL_SECONDS)
+        states = await run_in_threadpool(store.all)
+        now = datetime.now()
+        for state in states:
+            _announce(state.name, is_running(state, now))
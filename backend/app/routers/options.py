@@ -1,46 +1,72 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import Session
-from backend.app.database import get_session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from backend.app.database import AnySession, get_db
+from backend.app.async_crud import call
 from backend.app.models import PossibleReason, Event
 import backend.app.crud as crud
+from backend.app.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, decode_id_cursor, paginate, id_key
+from backend.app.cache import possible_reasons_cache, events_cache
+from typing import Optional
 
 router = APIRouter()
 
+VERSION_HEADER = "X-Options-Version"
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    candidates = [tag.strip().removeprefix("W/") for tag in request.headers.get("if-none-match", "").split(",")]
+    return etag in candidates or "*" in candidates
+
+# List a cached option table; unchanged data is answered with 304 and no database access
+async def _cached_list(cache, request: Request, response: Response, cursor: Optional[str], limit: int, db: AnySession):
+    snapshot = cache.fresh() or await call(cache.load, db)
+    headers = {"ETag": snapshot.etag, VERSION_HEADER: snapshot.version, "Cache-Control": "no-cache"}
+    if _etag_matches(request, snapshot.etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return paginate(response, snapshot.page(decode_id_cursor(cursor), limit + 1), limit, id_key)
+
+# Content version of each option table, the same in every worker for the same data
+@router.get("/version")
+async def get_options_version(db: AnySession = Depends(get_db)):
+    versions = {}
+    for name, cache in (("possible_reasons", possible_reasons_cache), ("events", events_cache)):
+        versions[name] = (cache.fresh() or await call(cache.load, db)).version
+    return versions
+
 # --- PossibleReasons Routes ---
 
 # Create a PossibleReason
 @router.post("/possible-reasons/", response_model=PossibleReason)
-def create_possible_reason(reason: PossibleReason, db: Session = Depends(get_session)):
-    return crud.create_possible_reason(db=db, reason=reason)
+async def create_possible_reason(reason: PossibleReason, db: AnySession = Depends(get_db)):
+    return await call(crud.create_possible_reason, db, reason=reason)
 
 # Get All PossibleReasons
 @router.get("/possible-reasons/", response_model=list[PossibleReason])
-def get_possible_reasons(skip: int = 0, limit: int = None, db: Session = Depends(get_session)):
-    return crud.get_possible_reasons(db=db, skip=skip, limit=limit)
+async def get_possible_reasons(request: Request, response: Response, cursor: Optional[str] = None, limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), db: AnySession = Depends(get_db)):
+    return await _cached_list(possible_reasons_cache, request, response, cursor, limit, db)
 
 # Get a Single PossibleReason by ID
 @router.get("/possible-reasons/{reason_id}", response_model=PossibleReason)
-def get_possible_reason(reason_id: int, db: Session = Depends(get_session)):
-    reason = crud.get_possible_reason_by_id(db=db, reason_id=reason_id)
+async def get_possible_reason(reason_id: int, db: AnySession = Depends(get_db)):
+    reason = await call(crud.get_possible_reason_by_id, db, reason_id=reason_id)
     if not reason:
         raise HTTPException(status_code=404, detail="PossibleReason not found")
     return reason
 
 # Update a PossibleReason
 @router.put("/possible-reasons/{reason_id}", response_model=PossibleReason)
-def update_possible_reason(reason_id: int, reason: PossibleReason, db: Session = Depends(get_session)):
-    updated_reason = crud.update_possible_reason(db=db, reason_id=reason_id, updated_reason=reason)
+async def update_possible_reason(reason_id: int, reason: PossibleReason, db: AnySession = Depends(get_db)):
+    updated_reason = await call(crud.update_possible_reason, db, reason_id=reason_id, updated_reason=reason)
     if not updated_reason:
         raise HTTPException(status_code=404, detail="PossibleReason not found")
     return updated_reason
 
 # Delete a PossibleReason
 @router.delete("/possible-reasons/{reason_id}", response_model=dict)
-def delete_possible_reason(reason_id: int, db: Session = Depends(get_session)):
-    reason = db.get(PossibleReason, reason_id)
+async def delete_possible_reason(reason_id: int, db: AnySession = Depends(get_db)):
+    reason = await call(crud.get_possible_reason_by_id, db, reason_id=reason_id)
     if reason and reason.reason == "reasons":
         raise HTTPException(status_code=403, detail="Cannot delete the default 'reasons' record")
-    deleted_reason = crud.delete_possible_reason(db=db, reason_id=reason_id)
+    deleted_reason = await call(crud.delete_possible_reason, db, reason_id=reason_id)
     if not deleted_reason:
         raise HTTPException(status_code=404, detail="PossibleReason not found")
     return {"message": "PossibleReason deleted successfully"}
@@ -49,37 +75,37 @@ def delete_possible_reason(reason_id: int, db: Session = Depends(get_session)):
 
 # Create an Event
 @router.post("/events/", response_model=Event)
-def create_event(event: Event, db: Session = Depends(get_session)):
-    return crud.create_event(db=db, event=event)
+async def create_event(event: Event, db: AnySession = Depends(get_db)):
+    return await call(crud.create_event, db, event=event)
 
 # Get All Events
 @router.get("/events/", response_model=list[Event])
-def get_events(skip: int = 0, limit: int = None, db: Session = Depends(get_session)):
-    return crud.get_events(db=db, skip=skip, limit=limit)
+async def get_events(request: Request, response: Response, cursor: Optional[str] = None, limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), db: AnySession = Depends(get_db)):
+    return await _cached_list(events_cache, request, response, cursor, limit, db)
 
 # Get a Single Event by ID
 @router.get("/events/{event_id}", response_model=Event)
-def get_event(event_id: int, db: Session = Depends(get_session)):
-    event = crud.get_event_by_id(db=db, event_id=event_id)
+async def get_event(event_id: int, db: AnySession = Depends(get_db)):
+    event = await call(crud.get_event_by_id, db, event_id=event_id)
     if not event:
         raise HTTPException(status_code=404, detail="Event not found")
     return event
 
 # Update an Event
 @router.put("/events/{event_id}", response_model=Event)
-def update_event(event_id: int, event: Event, db: Session = Depends(get_session)):
-    updated_event = crud.update_event(db=db, event_id=event_id, updated_event=event)
+async def update_event(event_id: int, event: Event, db: AnySession = Depends(get_db)):
+    updated_event = await call(crud.update_event, db, event_id=event_id, updated_event=event)
     if not updated_event:
         raise HTTPException(status_code=404, detail="Event not found")
     return updated_event
 
 # Delete an Event
 @router.delete("/events/{event_id}", response_model=dict)
-def delete_event(event_id: int, db: Session = Depends(get_session)):
-    event = db.get(Event, event_id)
+async def delete_event(event_id: int, db: AnySession = Depends(get_db)):
+    event = await call(crud.get_event_by_id, db, event_id=event_id)
     if event and event.event == "events":
         raise HTTPException(status_code=403, detail="Cannot delete the default 'events' record")
-    deleted_event = crud.delete_event(db=db, event_id=event_id)
+    deleted_event = await call(crud.delete_event, db, event_id=event_id)
     if not deleted_event:
         raise HTTPException(status_code=404, detail="Event not found")
     return {"message": "Event deleted successfully"}
@@ -1,44 +1,69 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import Session
-from backend.app.database import get_session
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from backend.app.database import AnySession, get_db
+from backend.app.async_crud import call
 from backend.app.models import PatientDayRecord
 import backend.app.crud as crud
+from backend.app.schemas import PatientDayRecordPatch
+from backend.app.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, decode_id_cursor, paginate, id_key
+from typing import Optional
+from datetime import date
 
 router = APIRouter()
 
-# Get all PatientDayRecords for a specific patient
+# Get PatientDayRecords for a patient and/or an event during the 24 hours
 @router.get("/", response_model=list[PatientDayRecord])
-def get_patient_day_records(patient_id: int, db: Session = Depends(get_session)):
-    records = crud.get_patient_day_records(db=db, patient_id=patient_id)
+async def get_patient_day_records(response: Response, patient_id: Optional[int] = None, event_id: Optional[int] = None, alert_since: Optional[date] = None, cursor: Optional[str] = None, limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), db: AnySession = Depends(get_db)):
+    records = await call(crud.get_patient_day_records, db, patient_id=patient_id, event_id=event_id, alert_since=alert_since,
+                         after_id=decode_id_cursor(cursor), limit=limit + 1)
     if not records:
         raise HTTPException(status_code=404, detail="Day records not found")
-    return records
+    return paginate(response, records, limit, id_key)
 
 # Get a single PatientDayRecord by ID
 @router.get("/{record_id}", response_model=PatientDayRecord)
-def get_patient_day_record(record_id: int, db: Session = Depends(get_session)):
-    record = crud.get_patient_day_record_by_id(db=db, record_id=record_id)
+async def get_patient_day_record(record_id: int, db: AnySession = Depends(get_db)):
+    record = await call(crud.get_patient_day_record_by_id, db, record_id=record_id)
     if not record:
         raise HTTPException(status_code=404, detail="Day record not found")
     return record
 
 # Create a new PatientDayRecord
 @router.post("/", response_model=PatientDayRecord)
-def create_patient_day_record(record: PatientDayRecord, db: Session = Depends(get_session)):
-    return crud.create_patient_day_record(db=db, record=record)
+async def create_patient_day_record(record: PatientDayRecord, db: AnySession = Depends(get_db)):
+    try:
+        return await call(crud.create_patient_day_record, db, record=record)
+    except crud.MissingReference as missing:
+        raise HTTPException(status_code=422, detail=str(missing))
 
 # Update an existing PatientDayRecord
 @router.put("/{record_id}", response_model=PatientDayRecord)
-def update_patient_day_record(record_id: int, updated_record: PatientDayRecord, db: Session = Depends(get_session)):
-    record = crud.update_patient_day_record(db=db, record_id=record_id, updated_record=updated_record)
+async def update_patient_day_record(record_id: int, updated_record: PatientDayRecord, db: AnySession = Depends(get_db)):
+    try:
+        record = await call(crud.update_patient_day_record, db, record_id=record_id, updated_record=updated_record)
+    except crud.MissingReference as missing:
+        raise HTTPException(status_code=422, detail=str(missing))
+    if not record:
+        raise HTTPException(status_code=404, detail="Day record not found")
+    return record
+
+# Change only the fields sent, if the record is still at the given version;
+# 409 when someone else saved it first
+@router.patch("/{record_id}", response_model=PatientDayRecord)
+async def patch_patient_day_record(record_id: int, patch: PatientDayRecordPatch, db: AnySession = Depends(get_db)):
+    try:
+        record = await call(crud.patch_patient_day_record, db, record_id=record_id, changes=patch.changes(), version=patch.version)
+    except crud.VersionConflict as conflict:
+        raise HTTPException(status_code=409, detail=f"Day record was changed by someone else (now version {conflict.current_version})")
+    except crud.MissingReference as missing:
+        raise HTTPException(status_code=422, detail=str(missing))
     if not record:
         raise HTTPException(status_code=404, detail="Day record not found")
     return record
 
 # Delete a PatientDayRecord
 @router.delete("/{record_id}", response_model=dict)
-def delete_patient_day_record(record_id: int, db: Session = Depends(get_session)):
-    record = crud.delete_patient_day_record(db=db, record_id=record_id)
+async def delete_patient_day_record(record_id: int, db: AnySession = Depends(get_db)):
+    record = await call(crud.delete_patient_day_record, db, record_id=record_id)
     if not record:
         raise HTTPException(status_code=404, detail="Day record not found")
     return {"message": "Day record deleted successfully"}
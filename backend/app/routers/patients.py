@@ -1,38 +1,70 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import Session
-from backend.app.database import get_session
-from backend.app.models import Patient
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from starlette.concurrency import run_in_threadpool
+from backend.app import retention
+from backend.app.database import AnySession, get_db, settings
+from backend.app.async_crud import call
+from backend.app.models import Patient, StatusEnum
 import backend.app.crud as crud
+from backend.app.schemas import PatientDashboard, PatientPatch, PatientWithStats
+from backend.app.projection import parse_fields, rows_response
+from backend.app.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, decode_id_cursor, decode_sort_cursor, paginate, id_key
 from fastapi.responses import JSONResponse
+from typing import Literal, Optional
 
 router = APIRouter()
 
 # Create a Patient
 @router.post("/", response_model=Patient)
-def create_patient(patient: Patient, db: Session = Depends(get_session)):
-    existing_patient = crud.get_patient_by_id(db=db, patient_id=patient.id)
+async def create_patient(patient: Patient, db: AnySession = Depends(get_db)):
+    existing_patient = await call(crud.get_patient_by_id, db, patient_id=patient.id, include_withdrawn=True)
     if existing_patient:
         raise HTTPException(status_code=400, detail="Patient with this ID already exists")
-    return crud.create_patient(db=db, patient=patient)
+    return await call(crud.create_patient, db, patient=patient)
 
-# Get All Patients
+# Get All Patients; ?fields=id,study_code picks the columns returned
 @router.get("/", response_model=list[Patient])
-def get_patients(skip: int = 0, limit: int = None, db: Session = Depends(get_session)):
-    return crud.get_patients(db=db, skip=skip, limit=limit)
+async def get_patients(response: Response, cursor: Optional[str] = None, limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), fields: Optional[str] = None, db: AnySession = Depends(get_db)):
+    fields = parse_fields(Patient, fields)
+    patients = await call(crud.get_patient_rows, db, fields=fields, after_id=decode_id_cursor(cursor), limit=limit + 1)
+    return rows_response(response, paginate(response, patients, limit, id_key), fields)
+
+# Get All Patients with unacknowledged alerts, last alert time and day record count
+@router.get("/stats", response_model=list[PatientWithStats])
+async def get_patient_stats(
+    response: Response,
+    status: Optional[StatusEnum] = None,
+    min_unacked: Optional[int] = Query(None, ge=0),
+    sort: Literal[crud.PATIENT_STATS_SORTS] = "id",
+    order: Literal["asc", "desc"] = "asc",
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AnySession = Depends(get_db),
+):
+    patients = await call(crud.get_patient_stats, db, status=status, min_unacked=min_unacked, sort=sort,
+                          descending=order == "desc", after=decode_sort_cursor(cursor), limit=limit + 1)
+    return paginate(response, patients, limit, lambda row: (row["sort_key"], row["id"]))
 
 # Get a Single Patient by ID
 @router.get("/{patient_id}", response_model=Patient)
-def get_patient(patient_id: int, db: Session = Depends(get_session)):
-    patient = crud.get_patient_by_id(db=db, patient_id=patient_id)
+async def get_patient(patient_id: int, db: AnySession = Depends(get_db)):
+    patient = await call(crud.get_patient_by_id, db, patient_id=patient_id)
     if not patient:
         raise HTTPException(status_code=404, detail="Patient not found")
     return patient
 
+# Everything the patient page needs in one response
+@router.get("/{patient_id}/dashboard", response_model=PatientDashboard)
+async def get_patient_dashboard(patient_id: int, log_limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), db: AnySession = Depends(get_db)):
+    dashboard = await call(crud.get_patient_dashboard, db, patient_id=patient_id, log_limit=log_limit)
+    if not dashboard:
+        raise HTTPException(status_code=404, detail="Patient not found")
+    return dashboard
+
 # Get a Single Patient by Study Code
 @router.get("/get_patient_by_study_code/{study_code}", response_model=Patient)
-def get_patient(study_code: str, db: Session = Depends(get_session)):
+async def get_patient(study_code: str, db: AnySession = Depends(get_db)):
     # patient = crud.get_patient_by_id(db=db, patient_id=patient_id)
-    patient = crud.get_patient_by_study_code(db=db, patient_code=study_code)
+    patient = await call(crud.get_patient_by_study_code, db, patient_code=study_code)
     if not patient:
         return JSONResponse(
             status_code=404,
@@ -42,17 +74,42 @@ def get_patient(study_code: str, db: Session = Depends(get_session)):
 
 # Update a Patient
 @router.put("/{patient_id}", response_model=Patient)
-def update_patient(patient_id: int, patient: Patient, db: Session = Depends(get_session)):
-    updated_patient = crud.update_patient(db=db, patient_id=patient_id, patient=patient)
+async def update_patient(patient_id: int, patient: Patient, db: AnySession = Depends(get_db)):
+    updated_patient = await call(crud.update_patient, db, patient_id=patient_id, patient=patient)
     if not updated_patient:
         raise HTTPException(status_code=404, detail="Patient not found")
     return updated_patient
 
-# Delete a Patient
+# Change only the fields sent, if the patient is still at the given version;
+# 409 when someone else saved it first
+@router.patch("/{patient_id}", response_model=Patient)
+async def patch_patient(patient_id: int, patch: PatientPatch, db: AnySession = Depends(get_db)):
+    try:
+        patient = await call(crud.patch_patient, db, patient_id=patient_id, changes=patch.changes(), version=patch.version)
+    except crud.VersionConflict as conflict:
+        raise HTTPException(status_code=409, detail=f"Patient was changed by someone else (now version {conflict.current_version})")
+    if not patient:
+        raise HTTPException(status_code=404, detail="Patient not found")
+    return patient
+
+# Delete a Patient with all their records and logs, or with ?soft=true
+# (default PATIENT_SOFT_DELETE) only withdraw them until restored
 @router.delete("/{patient_id}", response_model=dict)
-def delete_patient(patient_id: int, db: Session = Depends(get_session)):
-    deleted_patient = crud.delete_patient(db=db, patient_id=patient_id)
+async def delete_patient(patient_id: int, soft: Optional[bool] = None, db: AnySession = Depends(get_db)):
+    soft = settings.patient_soft_delete if soft is None else soft
+    deleted_patient = await call(crud.delete_patient, db, patient_id=patient_id, soft=soft)
     if not deleted_patient:
         raise HTTPException(status_code=404, detail="Patient not found")
+    if soft:
+        return {"message": "Patient withdrawn; restore to bring them back"}
+    # The archive is written through a sync engine, so keep it off the event loop
+    await run_in_threadpool(retention.delete_archived_logs, patient_id)
     return {"message": "Patient and associated records deleted successfully"}
 
+# Undo a soft delete
+@router.post("/{patient_id}/restore", response_model=Patient)
+async def restore_patient(patient_id: int, db: AnySession = Depends(get_db)):
+    patient = await call(crud.restore_patient, db, patient_id=patient_id)
+    if not patient:
+        raise HTTPException(status_code=404, detail="Patient not found")
+    return patient
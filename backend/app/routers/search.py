@@ -0,0 +1,26 @@
+from fastapi import APIRouter, Depends, Query
+from backend.app.database import AnySession, get_db
+from backend.app.async_crud import call
+from backend.app import search as fts_search
+from backend.app.schemas import SearchHit
+from datetime import date
+from typing import Literal, Optional
+
+router = APIRouter()
+
+# Full-text search over model logs, pipeline logs and day record notes
+@router.get("/", response_model=list[SearchHit])
+async def search(
+    q: str = Query(..., min_length=1),
+    source: list[Literal["model_log", "pipeline_log", "notes"]] = Query(["model_log", "pipeline_log", "notes"]),
+    order: Literal[fts_search.ORDERS] = "rank",
+    patient_id: Optional[int] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    limit: int = Query(50, ge=1, le=500),
+    db: AnySession = Depends(get_db),
+):
+    if not q.strip():
+        return []
+    return await call(fts_search.search, db, q=q, sources=list(dict.fromkeys(source)), order=order, patient_id=patient_id,
+                      date_from=date_from, date_to=date_to, limit=limit)
@@ -0,0 +1,74 @@
+import asyncio
+from collections import Counter
+from typing import Optional
+from fastapi import APIRouter, Query
+from fastapi.responses import StreamingResponse
+from sqlmodel import Session
+from starlette.concurrency import run_in_threadpool
+from backend.app.broadcast import hub, format_sse
+from backend.app.database import engine
+from backend.app.routers import model_status
+import backend.app.crud as crud
+
+router = APIRouter()
+
+KEEPALIVE_SECONDS = 15
+WATCH_INTERVAL_SECONDS = 1  # How often each worker looks for new and acknowledged model logs
+WATCH_BATCH_SIZE = 1000  # Most new logs pushed per look; the rest follow on the next
+
+def _last_model_log_id() -> int:
+    with Session(engine) as db:
+        return crud.get_last_model_log_id(db)
+
+def _model_log_changes(after_id: int, patient_ids: Optional[set[int]]):
+    with Session(engine) as db:
+        return crud.get_model_log_changes(db, after_id, patient_ids, WATCH_BATCH_SIZE)
+
+async def watch_model_logs():
+    """Push model logs and acknowledgements written through any worker to this worker's stream clients"""
+    last_id = await run_in_threadpool(_last_model_log_id)
+    # Unacknowledged alerts per followed patient at the last look
+    unacked: Optional[dict[int, int]] = None
+    while True:
+        await asyncio.sleep(WATCH_INTERVAL_SECONDS)
+        if not hub.subscriber_count:
+            last_id, unacked = await run_in_threadpool(_last_model_log_id), None
+            continue
+        patient_ids = hub.watched_patients()
+        logs, counts = await run_in_threadpool(_model_log_changes, last_id, patient_ids)
+        for log in logs:
+            hub.publish("model_log", log.model_dump(), patient_id=log.patient_id)
+        if logs:
+            last_id = logs[-1].id
+        # Fewer unacknowledged alerts than before plus the new ones: some were acknowledged
+        added = Counter(log.patient_id for log in logs if not log.ack)
+        for patient_id, before in (unacked or {}).items():
+            count = before + added[patient_id] - counts.get(patient_id, 0)
+            if count > 0 and (patient_ids is None or patient_id in patient_ids):
+                hub.publish("model_log_ack", {"patient_id": patient_id, "count": count}, patient_id=patient_id)
+        unacked = counts
+
+async def event_stream(patient_ids):
+    subscription = hub.subscribe(patient_ids)
+    try:
+        # Reconnect delay for EventSource, then the state a new client needs
+        yield "retry: 3000\n\n"
+        yield format_sse("model_status", await run_in_threadpool(model_status.status_of, model_status.DEFAULT_NAME))
+        while True:
+            try:
+                yield await asyncio.wait_for(subscription.queue.get(), KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                # Comment line keeps proxies from closing an idle connection
+                yield ": keepalive\n\n"
+    finally:
+        hub.unsubscribe(subscription)
+
+# Server-Sent Events feed of model status changes and new model logs.
+# Without patient_id every model log is sent; with one or more, only theirs.
+@router.get("/")
+async def stream_events(patient_id: Optional[list[int]] = Query(None)):
+    return StreamingResponse(
+        event_stream(patient_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
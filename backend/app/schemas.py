@@ -0,0 +1,170 @@
+from typing import ClassVar, Optional
+from pydantic import field_validator, model_validator
+from sqlmodel import SQLModel, Field
+from datetime import datetime
+from backend.app.models import Patient, PatientBase, PatientDayRecordBase, ModelLog, GenderEnum, StatusEnum
+
+# Response schemas that are not backed by a table
+
+# Result of a batch insert: the ids assigned to the new rows, in request order
+class BatchInsertResult(SQLModel):
+    count: int
+    ids: list[int]
+
+# Day record with its reason and event resolved to their names
+class PatientDayRecordRead(PatientDayRecordBase):
+    id: int
+    version: int
+    possible_reason_name: Optional[str] = None
+    event_at_alert_name: Optional[str] = None
+
+# Everything the patient page shows, in one response
+class PatientDashboard(SQLModel):
+    patient: Patient
+    day_records: list[PatientDayRecordRead]
+    # The newest log_limit model logs, then any older unacknowledged ones
+    model_logs: list[ModelLog]
+    unacked_model_logs: int
+    # Cursor for /api/logs/model_log/{patient_id} past the newest log_limit
+    # logs; None when model_logs holds all of them
+    model_logs_next_cursor: Optional[str] = None
+
+# Patient row with the aggregates shown on the home grid
+class PatientWithStats(PatientBase):
+    id: int
+    version: int
+    unacked_alerts: int
+    last_alert: Optional[datetime] = None
+    day_record_count: int
+
+# A rejected row of an import file; row is the 1-based record number
+class ImportRowError(SQLModel):
+    row: int
+    errors: list[str]
+
+# Outcome of a bulk import: valid rows are inserted, the rest reported
+class ImportResult(SQLModel):
+    dataset: str
+    inserted: int = 0
+    failed: int = 0
+    errors: list[ImportRowError] = []
+
+# One full-text search match; date/time are the log's or the record's alert
+class SearchHit(SQLModel):
+    source: str
+    id: int
+    patient_id: int
+    date: Optional[str] = None
+    time: Optional[str] = None
+    rank: float
+    snippet: str
+
+# Alerts to acknowledge: the given ids, or a patient's alerts up to a time
+class AckRequest(SQLModel):
+    ids: Optional[list[int]] = Field(default=None, max_length=10_000)
+    patient_id: Optional[int] = None
+    up_to: Optional[datetime] = None
+
+    @model_validator(mode="after")
+    def check_target(self):
+        if (self.ids is None) == (self.patient_id is None):
+            raise ValueError("Give either ids or patient_id")
+        if self.up_to is not None and self.patient_id is None:
+            raise ValueError("up_to only applies with patient_id")
+        return self
+
+# Number of alerts that went from unacknowledged to acknowledged
+class AckResult(SQLModel):
+    acknowledged: int
+
+# Storage saved by pipeline log payload deduplication (see dedup.py)
+class DedupStats(SQLModel):
+    total_logs: int
+    deduplicated_logs: int
+    blobs: int
+    # Payload bytes as the deduplicated logs see them, and as stored once per blob
+    logical_bytes: int
+    stored_bytes: int
+    ratio: Optional[float] = None
+
+# A statement that went over SLOW_QUERY_MS (see slow_queries.py)
+class SlowQuery(SQLModel):
+    at: datetime
+    engine: str
+    route: Optional[str] = None
+    duration_ms: float
+    statement: str
+    # Parameter types only; values are never kept
+    parameters: list | dict
+    plan: Optional[list[str]] = None
+
+# Slow executions of one normalized statement
+class SlowStatement(SQLModel):
+    statement: str
+    count: int
+    total_ms: float
+    mean_ms: float
+    max_ms: float
+    routes: dict[str, int]
+    engines: dict[str, int]
+    last_seen: datetime
+    # From the latest execution
+    example: str
+    parameters: list | dict
+    plan: Optional[list[str]] = None
+
+class SlowQueryReport(SQLModel):
+    threshold_ms: float
+    capacity: int
+    recorded: int
+    statements: list[SlowStatement]
+    recent: list[SlowQuery] = []
+
+# Base for PATCH bodies: the fields to change plus the version the client
+# last read. Fields that are left out stay as they are.
+class VersionedPatch(SQLModel):
+    NOT_NULL: ClassVar[set[str]] = set()
+
+    version: int
+
+    # Columns that cannot be NULL may be left out, but not set to null
+    @model_validator(mode="after")
+    def check_required(self):
+        nulled = [name for name in self.model_fields_set & self.NOT_NULL if getattr(self, name) is None]
+        if nulled:
+            raise ValueError(f"{', '.join(sorted(nulled))} cannot be null")
+        return self
+
+    def changes(self) -> dict:
+        return self.model_dump(exclude_unset=True, exclude={"version"})
+
+class PatientPatch(VersionedPatch):
+    NOT_NULL: ClassVar[set[str]] = {"study_code", "abbreviation_name", "year_of_birth", "gender", "status", "summary"}
+
+    study_code: Optional[str] = None
+    abbreviation_name: Optional[str] = None
+    year_of_birth: Optional[int] = None
+    gender: Optional[GenderEnum] = None
+    status: Optional[StatusEnum] = None
+    summary: Optional[str] = None
+
+class PatientDayRecordPatch(VersionedPatch):
+    NOT_NULL: ClassVar[set[str]] = {"patient_id"}
+
+    patient_id: Optional[int] = None
+    date_of_alert: Optional[str] = None
+    time_of_alert: Optional[str] = None
+    date_of_assessment: Optional[str] = None
+    time_of_assessment: Optional[str] = None
+    possible_reason_id: Optional[int] = None
+    new_information: Optional[int] = None
+    expected_alert: Optional[int] = None
+    event_at_alert_id: Optional[int] = None
+    event_during_24_hours: Optional[str] = None
+    notes: Optional[str] = None
+
+    # Forms submit '' for an unselected option
+    @field_validator("possible_reason_id", "event_at_alert_id", mode="before")
+    @classmethod
+    def blank_to_none(cls, value):
+        return None if value == "" else value
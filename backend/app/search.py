@@ -0,0 +1,84 @@
+from datetime import date
+from typing import Optional
+
+from fastapi import HTTPException
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from sqlmodel import Session
+from backend.app.schemas import SearchHit
+
+# Ranked full-text search over the FTS5 indexes defined in fts.py
+
+# Log times are stored as HH:MM:SS.ffffff; give them back the way the other
+# endpoints do (time.isoformat(), which leaves out zero microseconds)
+def _time(column: str) -> str:
+    return f"CASE WHEN {column} LIKE '%.000000' THEN substr({column}, 1, 8) ELSE {column} END"
+
+# source -> (statement, FTS table, date column, patient column); each
+# statement yields source, id, patient_id, date, time, rank and snippet
+SOURCES = {
+    "model_log": (f"""
+        SELECT 'model_log' AS source, m.id, m.patient_id, m.date, {_time("m.time")} AS time, model_log_fts.rank AS rank,
+               snippet(model_log_fts, -1, '<mark>', '</mark>', '…', 16) AS snippet
+        FROM model_log_fts JOIN model_log m ON m.id = model_log_fts.rowid
+        WHERE model_log_fts MATCH :q
+    """, "model_log_fts", "m.date", "m.patient_id"),
+    "pipeline_log": (f"""
+        SELECT 'pipeline_log' AS source, p.id, p.patient_id, p.date, {_time("p.time")} AS time, pipeline_log_fts.rank AS rank,
+               snippet(pipeline_log_fts, -1, '<mark>', '</mark>', '…', 16) AS snippet
+        FROM pipeline_log_fts JOIN pipeline_log p ON p.id = pipeline_log_fts.rowid
+        WHERE pipeline_log_fts MATCH :q
+    """, "pipeline_log_fts", "p.date", "p.patient_id"),
+    "notes": ("""
+        SELECT 'notes' AS source, r.id, r.patient_id, r.date_of_alert AS date, r.time_of_alert AS time,
+               patient_day_record_notes_fts.rank AS rank,
+               snippet(patient_day_record_notes_fts, -1, '<mark>', '</mark>', '…', 16) AS snippet
+        FROM patient_day_record_notes_fts JOIN patient_day_records r ON r.id = patient_day_record_notes_fts.rowid
+        WHERE patient_day_record_notes_fts MATCH :q
+    """, "patient_day_record_notes_fts", "r.date_of_alert", "r.patient_id"),
+}
+
+# The query as typed is FTS5 syntax ("exact phrase", OR, NEAR, prefix*).
+# Text that isn't valid syntax (e.g. "heart-rate", "SpO2: 88") is searched
+# as plain terms instead.
+def plain_terms(q: str) -> str:
+    return " ".join('"' + term.replace('"', '""') + '"' for term in q.split())
+
+# "rank" scores every match, which is instant for specific terms but takes
+# a noticeable fraction of a second for a word in most of a million logs.
+# "recent" walks the index newest first and stops at the limit.
+ORDERS = ("rank", "recent")
+
+def _statement(source: str, order: str, patient_id, date_from, date_to) -> str:
+    statement, fts, date_column, patient_column = SOURCES[source]
+    # Leave out withdrawn patients
+    statement += f" AND {patient_column} NOT IN (SELECT id FROM patients WHERE deleted_at IS NOT NULL)"
+    if patient_id is not None:
+        statement += f" AND {patient_column} = :patient_id"
+    # Dates are ISO text in SQLite, so they compare as strings
+    if date_from is not None:
+        statement += f" AND {date_column} >= :date_from"
+    if date_to is not None:
+        statement += f" AND {date_column} <= :date_to"
+    return statement + (" ORDER BY rank" if order == "rank" else f" ORDER BY {fts}.rowid DESC") + " LIMIT :limit"
+
+# Matches across the chosen sources, best first (bm25: lower is better) or
+# newest first
+def search(db: Session, q: str, sources: list[str], order: str = "rank", patient_id: Optional[int] = None,
+           date_from: Optional[date] = None, date_to: Optional[date] = None, limit: int = 50) -> list[SearchHit]:
+    statement = " UNION ALL ".join(
+        f"SELECT * FROM ({_statement(source, order, patient_id, date_from, date_to)})" for source in sources
+    ) + (" ORDER BY rank" if order == "rank" else " ORDER BY date DESC, time DESC") + " LIMIT :limit"
+    params = {
+        "patient_id": patient_id,
+        "date_from": date_from.isoformat() if date_from else None,
+        "date_to": date_to.isoformat() if date_to else None,
+        "limit": limit,
+    }
+    for match in (q, plain_terms(q)):
+        try:
+            rows = db.execute(text(statement), {**params, "q": match}).mappings().all()
+            return [SearchHit(**row) for row in rows]
+        except OperationalError:
+            db.rollback()
+    raise HTTPException(status_code=400, detail="Invalid search query")
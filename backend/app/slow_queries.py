@@ -0,0 +1,156 @@
+import re
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+from functools import lru_cache
+from typing import Optional
+
+from sqlalchemy import event
+from backend.app import metrics
+from backend.app.config import get_settings
+
+# In-memory log of slow SQL statements, served at /api/debug/slow-queries.
+# Hooks on the engines time every statement; one that takes at least
+# SLOW_QUERY_MS is kept, SLOW_QUERY_LOG_SIZE at most, with the route that ran
+# it and SQLite's EXPLAIN QUERY PLAN. Parameter values are never kept, only
+# their types, since they are patient data. Statements are grouped by their
+# text with literals and IN lists folded, so the same query from different
+# patients adds up in one place. SLOW_QUERY_MS=0 logs every statement, which
+# shows N+1 patterns on a test server.
+
+# Statements EXPLAIN QUERY PLAN accepts
+_EXPLAINABLE = re.compile(r"\s*(SELECT|INSERT|UPDATE|DELETE|WITH|REPLACE)\b", re.IGNORECASE)
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDERS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_ROWS = re.compile(r"\(\?, \.\.\.\)(?:\s*,\s*\(\?, \.\.\.\))+")
+_SPACE = re.compile(r"\s+")
+
+MAX_STATEMENT_LENGTH = 4000
+
+# The statement with literals replaced by ? and placeholder lists by (?, ...)
+@lru_cache(maxsize=2048)
+def normalize(statement: str) -> str:
+    statement = _SPACE.sub(" ", statement).strip()
+    statement = _NUMBER.sub("?", _STRING.sub("?", statement))
+    statement = _PLACEHOLDERS.sub("(?, ...)", statement)
+    return _ROWS.sub("(?, ...), ...", statement)
+
+def _run_length(types: list[str]) -> list[str]:
+    runs = []
+    for name in types:
+        if runs and runs[-1][0] == name:
+            runs[-1][1] += 1
+        else:
+            runs.append([name, 1])
+    return [name if count == 1 else f"{name} x{count}" for name, count in runs]
+
+def _types(parameters):
+    if isinstance(parameters, dict):
+        return {name: type(value).__name__ for name, value in parameters.items()}
+    return _run_length([type(value).__name__ for value in parameters or ()])
+
+# Types of the bound parameters, e.g. ['int', 'str x3']; for executemany the
+# first row's and how many rows there were
+def parameter_shape(parameters, executemany: bool):
+    if executemany:
+        return {"rows": len(parameters), "row": _types(parameters[0]) if parameters else []}
+    return _types(parameters)
+
+# EXPLAIN QUERY PLAN on the connection that ran the statement, as indented lines
+def query_plan(conn, statement: str, parameters, executemany: bool) -> Optional[list[str]]:
+    if conn.dialect.name != "sqlite" or not _EXPLAINABLE.match(statement):
+        return None
+    if executemany:
+        parameters = parameters[0] if parameters else ()
+    try:
+        cursor = conn.connection.cursor()
+        try:
+            cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)
+            rows = cursor.fetchall()
+        finally:
+            cursor.close()
+    except Exception as exc:
+        return [f"(no plan: {exc})"]
+    depth = {0: -1}
+    lines = []
+    for node, parent, _, detail in rows:
+        depth[node] = depth.get(parent, -1) + 1
+        lines.append("  " * depth[node] + detail)
+    return lines
+
+class SlowQueryLog:
+    def __init__(self, threshold_ms: float, size: int):
+        self.threshold_ms = threshold_ms
+        self.size = size
+        self.entries: deque = deque(maxlen=max(size, 1))
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.size > 0
+
+    def record(self, entry: dict):
+        with self._lock:
+            self.entries.append(entry)
+
+    def recent(self, limit: Optional[int] = None) -> list[dict]:
+        with self._lock:
+            entries = list(self.entries)
+        entries.reverse()
+        return entries[:limit] if limit is not None else entries
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+
+    # One summary per normalized statement, most total time first
+    def statements(self) -> list[dict]:
+        groups: dict[str, dict] = {}
+        # Oldest first, so the latest occurrence leaves its plan and parameters
+        for entry in reversed(self.recent()):
+            group = groups.get(entry["normalized"])
+            if group is None:
+                group = groups[entry["normalized"]] = {
+                    "statement": entry["normalized"], "count": 0, "total_ms": 0.0, "max_ms": 0.0,
+                    "routes": Counter(), "engines": Counter(),
+                }
+            group["count"] += 1
+            group["total_ms"] += entry["duration_ms"]
+            group["max_ms"] = max(group["max_ms"], entry["duration_ms"])
+            group["routes"][entry["route"] or "(no request)"] += 1
+            group["engines"][entry["engine"]] += 1
+            group.update(example=entry["statement"], parameters=entry["parameters"], plan=entry["plan"],
+                         last_seen=entry["at"])
+        for group in groups.values():
+            group["mean_ms"] = group["total_ms"] / group["count"]
+            group["routes"] = dict(group["routes"].most_common())
+            group["engines"] = dict(group["engines"])
+        return sorted(groups.values(), key=lambda group: group["total_ms"], reverse=True)
+
+log = SlowQueryLog(get_settings().slow_query_ms, get_settings().slow_query_log_size)
+
+def instrument_engine(engine, label: str):
+    if not log.enabled:
+        return
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("slow_query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        duration_ms = (time.perf_counter() - conn.info["slow_query_started"].pop()) * 1000
+        if duration_ms < log.threshold_ms:
+            return
+        log.record({
+            "at": datetime.now(),
+            "engine": label,
+            "route": metrics.current_route(),
+            "duration_ms": round(duration_ms, 3),
+            "statement": statement[:MAX_STATEMENT_LENGTH],
+            "normalized": normalize(statement)[:MAX_STATEMENT_LENGTH],
+            "parameters": parameter_shape(parameters, executemany),
+            "plan": query_plan(conn, statement, parameters, executemany),
+        })
@@ -0,0 +1,203 @@
+import argparse
+import ast
+import asyncio
+import glob
+import logging
+import os
+import sys
+import time
+from typing import Optional
+
+from sqlalchemy import inspect
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from sqlalchemy.pool import QueuePool
+from sqlmodel import SQLModel, Session
+from backend.app import dedup, fts, metrics
+from backend.app.cache import possible_reasons_cache, events_cache
+from backend.app.config import get_settings
+from backend.app.database import engine, async_engine, create_tables
+
+# What a worker does with the database before it takes requests.
+# STARTUP_MODE=create (the dev and bench profiles) runs create_all on every
+# start, as before. STARTUP_MODE=check (the prod profile) never touches the
+# schema: one query reads the Alembic revision, and the worker refuses to start
+# unless it is the head of the migrations shipped with the code. It then opens
+# its pooled connections and loads the option caches, so the first requests
+# don't pay for them. Migrations run once per deploy, from
+#
+#     python -m backend.app.startup migrate
+#
+# instead of every worker issuing DDL at the same moment, so N workers start
+# the same way whatever order they come up in. A database that create_all
+# built is stamped with the head revision, by create mode or by `migrate`,
+# as long as its tables match the models.
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Shows up next to uvicorn's own startup lines
+logger = logging.getLogger("uvicorn.error")
+
+class SchemaDrift(RuntimeError):
+    pass
+
+def alembic_config():
+    from alembic.config import Config
+    config = Config(os.path.join(BACKEND_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(BACKEND_DIR, "alembic"))
+    return config
+
+# `revision` and `down_revision` of a migration script
+def _revision_ids(path: str) -> tuple:
+    values = {}
+    for node in ast.parse(open(path, encoding="utf-8").read()).body:
+        if isinstance(node, ast.AnnAssign):
+            target, value = node.target, node.value
+        elif isinstance(node, ast.Assign) and len(node.targets) == 1:
+            target, value = node.targets[0], node.value
+        else:
+            continue
+        if isinstance(target, ast.Name) and target.id in ("revision", "down_revision"):
+            values[target.id] = ast.literal_eval(value)
+    return values["revision"], values.get("down_revision")
+
+# Revisions the code was written for: those in backend/alembic/versions that
+# no other migration builds on. The scripts are parsed rather than loaded
+# through alembic.script, which takes longer to import than the check takes.
+def head_revisions() -> set[str]:
+    revisions, parents = set(), set()
+    for path in glob.glob(os.path.join(BACKEND_DIR, "alembic", "versions", "*.py")):
+        revision, down_revision = _revision_ids(path)
+        revisions.add(revision)
+        if isinstance(down_revision, (tuple, list)):
+            parents.update(down_revision)
+        elif down_revision is not None:
+            parents.add(down_revision)
+    return revisions - parents
+
+# Revisions recorded in the database; empty if it was never migrated
+def current_revisions(connection) -> set[str]:
+    try:
+        return {row[0] for row in connection.exec_driver_sql("SELECT version_num FROM alembic_version")}
+    except (OperationalError, ProgrammingError):
+        return set()
+
+# Differences between the tables and the models; the FTS tables are not
+# part of the models (see alembic/env.py)
+def schema_differences(connection) -> list:
+    from alembic.autogenerate import compare_metadata
+    from alembic.migration import MigrationContext
+    context = MigrationContext.configure(connection, opts={
+        "include_name": lambda name, type_, parent_names: not (type_ == "table" and fts.is_search_table(name)),
+    })
+    return compare_metadata(context, SQLModel.metadata)
+
+# Record a database that has the tables but no revision (built by create_all,
+# create_db.py or seed.py) as being at the head revision. Returns False when
+# there is nothing to stamp: a revision is recorded or there are no tables.
+# Raises SchemaDrift when the tables don't match the models, since the
+# revision they correspond to can't be told.
+def stamp_unversioned(engine) -> bool:
+    from alembic.migration import MigrationContext
+    from alembic.script import ScriptDirectory
+    with engine.begin() as connection:
+        if current_revisions(connection) or not inspect(connection).has_table("patients"):
+            return False
+        differences = schema_differences(connection)
+        if differences:
+            # Column changes come as lists of tuples, the rest as tuples
+            kinds = sorted({(difference[0] if isinstance(difference, list) else difference)[0] for difference in differences})
+            raise SchemaDrift(
+                f"Database has no Alembic revision and its tables differ from the models ({', '.join(kinds)}); "
+                f"run `alembic stamp <revision>` with the revision it was built at, then migrate"
+            )
+        if connection.dialect.name == "sqlite":
+            fts.create_search_index(connection)
+            dedup.create_blob_triggers(connection)
+        MigrationContext.configure(connection).stamp(ScriptDirectory.from_config(alembic_config()), "head")
+    return True
+
+def check_schema(engine) -> set[str]:
+    expected = head_revisions()
+    with engine.connect() as connection:
+        current = current_revisions(connection)
+    if current != expected:
+        raise SchemaDrift(
+            f"Database is at revision {', '.join(sorted(current)) or '(none)'} but the code expects "
+            f"{', '.join(sorted(expected))}; run `python -m backend.app.startup migrate` first"
+        )
+    return current
+
+# Check out every connection the pool keeps, so they are opened and their
+# PRAGMAs applied now; in-memory databases have nothing to open
+def warm_pool(engine):
+    if not isinstance(engine.pool, QueuePool):
+        return
+    connections = [engine.connect() for _ in range(engine.pool.size())]
+    for connection in connections:
+        connection.close()
+
+async def warm_async_pool(async_engine):
+    if not isinstance(async_engine.sync_engine.pool, QueuePool):
+        return
+    connections = await asyncio.gather(*(async_engine.connect() for _ in range(async_engine.sync_engine.pool.size())))
+    for connection in connections:
+        await connection.close()
+
+def warm_caches(engine):
+    with Session(engine) as db:
+        for cache in (possible_reasons_cache, events_cache):
+            cache.load(db)
+
+# Run from the app's startup hook; `started` is perf_counter() when the app
+# module began importing. Records how long each phase took in /metrics.
+async def prepare_database(started: Optional[float] = None):
+    mode = get_settings().startup_mode
+    begun = time.perf_counter()
+    phases = {"import": begun - started} if started is not None else {}
+    if mode == "check":
+        revisions = check_schema(engine)
+        phases["schema"] = time.perf_counter() - begun
+        warm_pool(engine)
+        if async_engine is not None:
+            await warm_async_pool(async_engine)
+        warm_caches(engine)
+        phases["warm"] = time.perf_counter() - begun - phases["schema"]
+        detail = f"schema at {', '.join(sorted(revisions))}"
+    else:
+        create_tables(engine)
+        detail = "tables created if missing"
+        try:
+            if stamp_unversioned(engine):
+                detail += ", stamped at the head revision"
+        except SchemaDrift as drift:
+            # Still starts, as before; `check` and `migrate` will refuse it
+            logger.warning("%s", drift)
+        phases["schema"] = time.perf_counter() - begun
+    phases["total"] = time.perf_counter() - (started if started is not None else begun)
+    metrics.record_startup(phases)
+    logger.info("Worker %d started in %.0f ms (%s mode, %s; %s)", os.getpid(), phases["total"] * 1000, mode, detail,
+                ", ".join(f"{phase} {seconds * 1000:.0f} ms" for phase, seconds in phases.items() if phase != "total"))
+
+def main():
+    parser = argparse.ArgumentParser(description="Schema commands for deployments; workers never migrate on their own")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("migrate", help="upgrade the database to the latest revision and add the default options")
+    commands.add_parser("check", help="exit with an error unless the database is at the latest revision")
+    args = parser.parse_args()
+
+    try:
+        if args.command == "migrate":
+            from alembic import command
+            from backend.app.create_db import add_default_options
+            # Upgrading a database create_all built would recreate its tables
+            if stamp_unversioned(engine):
+                print("Stamped the existing tables with the head revision")
+            command.upgrade(alembic_config(), "head")
+            add_default_options()
+        revisions = check_schema(engine)
+    except SchemaDrift as drift:
+        sys.exit(str(drift))
+    print(f"Database is at revision {', '.join(sorted(revisions))}")
+
+if __name__ == "__main__":
+    main()
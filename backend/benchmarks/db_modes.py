@@ -0,0 +1,140 @@
+"""Compare the sync (threadpool) and async (aiosqlite) database paths.
+
+Starts the API under uvicorn once per mode (DB_ASYNC=0 / DB_ASYNC=1) against a
+throwaway database, then drives it with a mix of model status checks, model
+log listings and model log inserts at increasing client counts.
+
+    python -m backend.benchmarks.db_modes --clients 50 100 250 500 --duration 10
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+def start_server(async_db: bool, database_path: str, port: int) -> subprocess.Popen:
+    env = dict(os.environ, DB_ASYNC="1" if async_db else "0", DB_PROFILE="bench",
+               DATABASE_URL=f"sqlite:///{database_path}", PYTHONPATH=REPO_ROOT)
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.main:app", "--port", str(port), "--log-level", "warning"],
+        env=env, cwd=REPO_ROOT,
+    )
+
+async def wait_until_up(client: httpx.AsyncClient):
+    for _ in range(100):
+        try:
+            await client.get("/")
+            return
+        except httpx.TransportError:
+            await asyncio.sleep(0.1)
+    raise RuntimeError("server did not start")
+
+async def seed(client: httpx.AsyncClient, patients: int, logs_per_patient: int) -> list[int]:
+    patient_ids = []
+    for i in range(patients):
+        response = await client.post("/api/patients/", json={
+            "study_code": f"BENCH{i:04d}", "abbreviation_name": "B", "year_of_birth": 1980, "gender": "Male"})
+        patient_ids.append(response.json()["id"])
+        await client.post("/api/logs/model_log/batch", json=[
+            {"patient_id": patient_ids[-1], "content": "alert", "raw_content": "{}",
+             "date": f"2024-01-{1 + j % 28:02d}", "time": f"{j % 24:02d}:00:00"} for j in range(logs_per_patient)])
+    return patient_ids
+
+async def run_level(client: httpx.AsyncClient, patient_ids: list[int], clients: int, duration: float):
+    latencies = {"status": [], "list": [], "insert": []}
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def worker(rng: random.Random):
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            roll = rng.random()
+            started = time.perf_counter()
+            if roll < 0.4:
+                kind, request = "status", client.get("/api/model/status")
+            elif roll < 0.8:
+                kind, request = "list", client.get(f"/api/logs/model_log/{rng.choice(patient_ids)}", params={"limit": 50})
+            else:
+                kind, request = "insert", client.post("/api/logs/model_log/", json={
+                    "patient_id": rng.choice(patient_ids), "content": "alert", "raw_content": "{}",
+                    "date": "2024-02-01", "time": "12:00:00"})
+            try:
+                response = await request
+                if response.status_code >= 400:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies[kind].append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(random.Random(i)) for i in range(clients)))
+    elapsed = time.perf_counter() - started
+    return latencies, errors, elapsed
+
+async def bench_mode(async_db: bool, args) -> list[dict]:
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        port = free_port()
+        server = start_server(async_db, os.path.join(tmp, "bench.db"), port)
+        try:
+            limits = httpx.Limits(max_connections=max(args.clients), max_keepalive_connections=max(args.clients))
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60) as client:
+                await wait_until_up(client)
+                patient_ids = await seed(client, args.patients, args.logs)
+                for clients in args.clients:
+                    latencies, errors, elapsed = await run_level(client, patient_ids, clients, args.duration)
+                    every = [v for values in latencies.values() for v in values]
+                    results.append({
+                        "mode": "async" if async_db else "sync",
+                        "clients": clients,
+                        "rps": len(every) / elapsed,
+                        "errors": errors,
+                        "p50_ms": percentile(every, 50) * 1000,
+                        "p95_ms": percentile(every, 95) * 1000,
+                        "p99_ms": percentile(every, 99) * 1000,
+                        "status_p99_ms": percentile(latencies["status"], 99) * 1000,
+                    })
+        finally:
+            server.terminate()
+            server.wait()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, nargs="+", default=[50, 100, 250, 500])
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per client level")
+    parser.add_argument("--patients", type=int, default=50)
+    parser.add_argument("--logs", type=int, default=500, help="model logs seeded per patient")
+    parser.add_argument("--modes", nargs="+", choices=["sync", "async"], default=["sync", "async"])
+    args = parser.parse_args()
+
+    rows = []
+    for mode in args.modes:
+        rows.extend(asyncio.run(bench_mode(mode == "async", args)))
+
+    print(f"{'mode':<6} {'clients':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'status p99':>10} {'errors':>6}")
+    for row in rows:
+        print(f"{row['mode']:<6} {row['clients']:>7} {row['rps']:>8.0f} {row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} "
+              f"{row['p99_ms']:>8.1f} {row['status_p99_ms']:>10.1f} {row['errors']:>6}")
+
+if __name__ == "__main__":
+    main()
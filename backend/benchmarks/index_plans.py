@@ -0,0 +1,97 @@
+"""Before/after EXPLAIN QUERY PLAN and timings for the per-patient query indexes.
+
+Builds a throwaway SQLite database with synthetic rows, runs the statements
+issued by crud.get_model_logs, crud.get_pipeline_logs and
+crud.get_patient_day_records without the indexes, then creates them and runs
+the same statements again.
+
+    python -m backend.benchmarks.index_plans --rows 3000000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time as timer
+from datetime import date, time, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from sqlalchemy import create_engine, desc, select, text
+from backend.app.database import create_tables
+from backend.app.models import SQLModel, ModelLog, PipelineLog, PatientDayRecord
+
+# (label, statement) pairs matching the crud listing queries
+def query_paths(patient_id: int):
+    return [
+        ("get_model_logs", select(ModelLog).where(ModelLog.patient_id == patient_id)
+            .order_by(desc(ModelLog.date), desc(ModelLog.time)).limit(100)),
+        ("get_pipeline_logs", select(PipelineLog).where(PipelineLog.patient_id == patient_id)),
+        ("get_patient_day_records", select(PatientDayRecord).where(PatientDayRecord.patient_id == patient_id)),
+    ]
+
+def seed(conn, rows: int, patients: int, rng: random.Random):
+    conn.exec_driver_sql("INSERT INTO patients (id, study_code, abbreviation_name, year_of_birth, gender, status, summary) "
+                         "VALUES " + ",".join(f"({i}, 'P{i:05d}', 'X', 1970, 'male', 'active', '')" for i in range(1, patients + 1)))
+    start = date(2023, 1, 1)
+    def log_rows(n):
+        for _ in range(n):
+            yield (rng.randint(1, patients), (start + timedelta(days=rng.randint(0, 700))).isoformat(),
+                   time(rng.randint(0, 23), rng.randint(0, 59), rng.randint(0, 59)).isoformat(), "alert", "{}")
+    dbapi = conn.connection.dbapi_connection
+    dbapi.executemany("INSERT INTO model_log (patient_id, date, time, content, raw_content, ack) VALUES (?, ?, ?, ?, ?, 0)", log_rows(rows))
+    dbapi.executemany("INSERT INTO pipeline_log (patient_id, date, time, content, raw_content) VALUES (?, ?, ?, ?, ?)", log_rows(rows))
+    dbapi.executemany("INSERT INTO patient_day_records (patient_id, event_during_24_hours) VALUES (?, '')",
+                      ((rng.randint(1, patients),) for _ in range(rows // 10)))
+    conn.commit()
+
+def measure(conn, patient_ids, repeat: int):
+    results = {}
+    for position, (label, statement) in enumerate(query_paths(patient_ids[0])):
+        compiled = statement.compile(conn, compile_kwargs={"literal_binds": True})
+        plan = [row[-1] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}")]
+        started = timer.perf_counter()
+        for _ in range(repeat):
+            for patient_id in patient_ids:
+                conn.execute(query_paths(patient_id)[position][1]).fetchall()
+        elapsed = (timer.perf_counter() - started) / (repeat * len(patient_ids))
+        results[label] = (plan, elapsed)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=3_000_000, help="rows per log table")
+    parser.add_argument("--patients", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=20, help="distinct patients queried")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        create_tables(engine)
+        with engine.connect() as conn:
+            indexes = [index for table in SQLModel.metadata.sorted_tables for index in table.indexes
+                       if table.name in ("model_log", "pipeline_log", "patient_day_records")]
+            for index in indexes:
+                index.drop(conn)
+            print(f"seeding {args.rows:,} rows per log table ...")
+            seed(conn, args.rows, args.patients, rng)
+            conn.exec_driver_sql("ANALYZE")
+            patient_ids = [rng.randint(1, args.patients) for _ in range(args.queries)]
+
+            before = measure(conn, patient_ids, args.repeat)
+            for index in indexes:
+                index.create(conn)
+            conn.exec_driver_sql("ANALYZE")
+            conn.commit()
+            after = measure(conn, patient_ids, args.repeat)
+
+        for label in before:
+            print(f"\n== {label}")
+            print("  before:", " | ".join(before[label][0]), f"({before[label][1] * 1000:.2f} ms/query)")
+            print("  after: ", " | ".join(after[label][0]), f"({after[label][1] * 1000:.2f} ms/query)")
+        engine.dispose()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,306 @@
+"""End-to-end load test of the API with realistic request mixes.
+
+Drives the real FastAPI app either in-process through httpx's ASGI transport
+(`--transport asgi`: no sockets, measures the app and database alone) or
+through a uvicorn server (`--transport uvicorn`: adds HTTP parsing and the
+event loop a deployment runs). Each scenario runs `--clients` concurrent
+clients for `--duration` seconds against a freshly seeded throwaway database:
+
+    heartbeats      model/pipeline heartbeat storm with status polling
+    alerts          model alert ingestion, single and batched, plus pipeline logs
+    patient_page    what opening a patient page loads: dashboard, day records,
+                    options and a page of alerts
+    day_records     concurrent day record edits and new records
+
+Results can be written as JSON and compared with an earlier run; the compare
+step exits non-zero when throughput drops or tail latency grows beyond the
+given thresholds, so it can gate a change to crud.py or database.py.
+
+    python -m backend.benchmarks.load run --output before.json
+    python -m backend.benchmarks.load run --baseline before.json --max-latency-increase 15
+    python -m backend.benchmarks.load compare before.json after.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import httpx
+
+from backend.benchmarks.db_modes import REPO_ROOT, free_port, percentile, start_server, wait_until_up
+
+SCENARIOS = ("heartbeats", "alerts", "patient_page", "day_records")
+
+def log_payload(rng: random.Random, patient_id: int) -> dict:
+    return {
+        "patient_id": patient_id, "content": rng.choice(["Low SpO2", "Tachycardia", "Fever"]),
+        "raw_content": json.dumps({"spo2": rng.randint(80, 100), "hr": rng.randint(50, 160)}),
+        "date": f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+        "time": f"{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:00",
+    }
+
+def day_record_payload(rng: random.Random, patient_id: int) -> dict:
+    return {
+        "patient_id": patient_id, "event_during_24_hours": "", "notes": f"Reviewed {rng.randint(0, 10**6)}",
+        "date_of_alert": f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}", "time_of_alert": "08:00:00",
+        "date_of_assessment": "2024-12-31", "time_of_assessment": "09:00:00",
+        "new_information": rng.random() < 0.5, "expected_alert": rng.random() < 0.5,
+    }
+
+# Patients with alerts and day records, created through the API
+async def seed(client: httpx.AsyncClient, patients: int, logs_per_patient: int, records_per_patient: int) -> dict:
+    rng = random.Random(0)
+    patient_ids, record_ids = [], []
+    for i in range(patients):
+        response = await client.post("/api/patients/", json={
+            "study_code": f"LOAD{i:05d}", "abbreviation_name": "L", "year_of_birth": 1980, "gender": "Female"})
+        response.raise_for_status()
+        patient_id = response.json()["id"]
+        patient_ids.append(patient_id)
+        (await client.post("/api/logs/model_log/batch",
+                           json=[log_payload(rng, patient_id) for _ in range(logs_per_patient)])).raise_for_status()
+        for _ in range(records_per_patient):
+            response = await client.post("/api/patient-day-records/", json=day_record_payload(rng, patient_id))
+            response.raise_for_status()
+            record_ids.append(response.json())
+    return {"patient_ids": patient_ids, "records": record_ids}
+
+# Each step returns (endpoint label, request awaitable)
+def heartbeat_step(client, data, rng):
+    if rng.random() < 0.7:
+        name = rng.choice(["model", "pipeline", "model-2", "model-3"])
+        return "POST /api/model/heartbeat", client.post("/api/model/heartbeat", json={"running": True, "name": name})
+    if rng.random() < 0.5:
+        return "GET /api/model/status", client.get("/api/model/status")
+    return "GET /api/model/statuses", client.get("/api/model/statuses")
+
+def alert_step(client, data, rng):
+    patient_id = rng.choice(data["patient_ids"])
+    roll = rng.random()
+    if roll < 0.6:
+        return "POST /api/logs/model_log/", client.post("/api/logs/model_log/", json=log_payload(rng, patient_id))
+    if roll < 0.8:
+        return "POST /api/logs/model_log/batch", client.post(
+            "/api/logs/model_log/batch", json=[log_payload(rng, patient_id) for _ in range(20)])
+    return "POST /api/logs/pipeline_log/", client.post("/api/logs/pipeline_log/", json=log_payload(rng, patient_id))
+
+PATIENT_PAGE_REQUESTS = [
+    ("GET /api/patients/{id}/dashboard", "/api/patients/{id}/dashboard", {}),
+    ("GET /api/patient-day-records/", "/api/patient-day-records/", {"patient_id": "{id}"}),
+    ("GET /api/logs/model_log/{id}", "/api/logs/model_log/{id}", {"limit": 50}),
+    ("GET /api/options/possible-reasons/", "/api/options/possible-reasons/", {}),
+    ("GET /api/options/events/", "/api/options/events/", {}),
+]
+
+def patient_page_step(client, data, rng):
+    patient_id = str(rng.choice(data["patient_ids"]))
+    label, path, params = rng.choice(PATIENT_PAGE_REQUESTS)
+    params = {key: str(value).replace("{id}", patient_id) for key, value in params.items()}
+    return label, client.get(path.replace("{id}", patient_id), params=params)
+
+def day_record_step(client, data, rng):
+    if rng.random() < 0.8:
+        record = rng.choice(data["records"])
+        return "PUT /api/patient-day-records/{id}", client.put(
+            f"/api/patient-day-records/{record['id']}", json={**record, "notes": f"Edited {rng.randint(0, 10**6)}"})
+    return "POST /api/patient-day-records/", client.post(
+        "/api/patient-day-records/", json=day_record_payload(rng, rng.choice(data["patient_ids"])))
+
+STEPS = {
+    "heartbeats": heartbeat_step,
+    "alerts": alert_step,
+    "patient_page": patient_page_step,
+    "day_records": day_record_step,
+}
+
+def summarize(latencies: list[float], errors: int, elapsed: float) -> dict:
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+async def run_scenario(client: httpx.AsyncClient, data: dict, scenario: str, clients: int, duration: float) -> dict:
+    step = STEPS[scenario]
+    latencies: dict[str, list[float]] = {}
+    errors: dict[str, int] = {}
+    deadline = time.perf_counter() + duration
+
+    async def worker(rng: random.Random):
+        while time.perf_counter() < deadline:
+            label, request = step(client, data, rng)
+            started = time.perf_counter()
+            try:
+                response = await request
+                failed = response.status_code >= 400
+            except httpx.HTTPError:
+                failed = True
+            latencies.setdefault(label, []).append(time.perf_counter() - started)
+            errors[label] = errors.get(label, 0) + failed
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(random.Random(f"{scenario}-{i}")) for i in range(clients)))
+    elapsed = time.perf_counter() - started
+    every = [value for values in latencies.values() for value in values]
+    return {
+        **summarize(every, sum(errors.values()), elapsed),
+        "endpoints": {label: summarize(values, errors[label], elapsed) for label, values in sorted(latencies.items())},
+    }
+
+async def run_all(client: httpx.AsyncClient, args) -> dict:
+    await wait_until_up(client)
+    data = await seed(client, args.patients, args.logs, args.records)
+    results = {}
+    for scenario in args.scenarios:
+        results[scenario] = await run_scenario(client, data, scenario, args.clients, args.duration)
+        print(f"{scenario}: {results[scenario]['rps']:.0f} req/s, p99 {results[scenario]['p99_ms']:.1f} ms", file=sys.stderr)
+    return results
+
+def _client_kwargs(args) -> dict:
+    limits = httpx.Limits(max_connections=args.clients, max_keepalive_connections=args.clients)
+    return {"limits": limits, "timeout": 60}
+
+# The app reads its settings on import, so point it at the throwaway
+# database before importing backend.main
+async def run_asgi(args, database_path: str) -> dict:
+    os.environ.update(DATABASE_URL=f"sqlite:///{database_path}", DB_PROFILE="bench", DB_ASYNC="1" if args.async_db else "0")
+    from backend.main import app
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", **_client_kwargs(args)) as client:
+            return await run_all(client, args)
+
+async def run_uvicorn(args, database_path: str) -> dict:
+    port = free_port()
+    server = start_server(args.async_db, database_path, port)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", **_client_kwargs(args)) as client:
+            return await run_all(client, args)
+    finally:
+        server.terminate()
+        server.wait()
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run(args) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        database_path = os.path.join(tmp, "load.db")
+        runner = run_asgi if args.transport == "asgi" else run_uvicorn
+        scenarios = asyncio.run(runner(args, database_path))
+    return {
+        "meta": {
+            "started": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "transport": args.transport,
+            "async_db": args.async_db,
+            "clients": args.clients,
+            "duration": args.duration,
+            "patients": args.patients,
+        },
+        "scenarios": scenarios,
+    }
+
+def print_results(results: dict):
+    print(f"{'scenario / endpoint':<44} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>6}")
+    for scenario, row in results["scenarios"].items():
+        rows = [(scenario, row)] + [(f"  {label}", values) for label, values in row["endpoints"].items()]
+        for name, values in rows:
+            print(f"{name:<44} {values['rps']:>8.0f} {values['p50_ms']:>8.1f} {values['p95_ms']:>8.1f} "
+                  f"{values['p99_ms']:>8.1f} {values['errors']:>6}")
+
+def _change(old: float, new: float) -> float:
+    return (new - old) / old * 100 if old else 0.0
+
+# Regressions of `current` against `baseline`, per scenario, as messages
+def compare(baseline: dict, current: dict, max_throughput_drop: float, max_latency_increase: float,
+            max_error_rate: float) -> list[str]:
+    failures = []
+    differing = [key for key in ("transport", "async_db", "clients", "duration", "patients")
+                 if baseline["meta"].get(key) != current["meta"].get(key)]
+    if differing:
+        print(f"warning: the runs differ in {', '.join(differing)}; the comparison may not mean much")
+    print(f"{'scenario':<16} {'req/s':>18} {'p95 ms':>20} {'p99 ms':>20}")
+    for scenario, new in current["scenarios"].items():
+        old = baseline["scenarios"].get(scenario)
+        if old is None:
+            continue
+        rps, p95, p99 = (_change(old[key], new[key]) for key in ("rps", "p95_ms", "p99_ms"))
+        print(f"{scenario:<16} {old['rps']:>7.0f} -> {new['rps']:>6.0f} {rps:+5.0f}% "
+              f"{old['p95_ms']:>7.1f} -> {new['p95_ms']:>6.1f} {p95:+5.0f}% "
+              f"{old['p99_ms']:>7.1f} -> {new['p99_ms']:>6.1f} {p99:+5.0f}%")
+        if -rps > max_throughput_drop:
+            failures.append(f"{scenario}: throughput down {-rps:.0f}% (limit {max_throughput_drop:g}%)")
+        for label, change in (("p95", p95), ("p99", p99)):
+            if change > max_latency_increase:
+                failures.append(f"{scenario}: {label} latency up {change:.0f}% (limit {max_latency_increase:g}%)")
+        error_rate = new["errors"] / new["requests"] if new["requests"] else 0.0
+        if error_rate > max_error_rate:
+            failures.append(f"{scenario}: {error_rate:.1%} of requests failed (limit {max_error_rate:.1%})")
+    return failures
+
+def _add_thresholds(parser: argparse.ArgumentParser):
+    parser.add_argument("--max-throughput-drop", type=float, default=10.0, help="percent (default 10)")
+    parser.add_argument("--max-latency-increase", type=float, default=20.0, help="percent, for p95 and p99 (default 20)")
+    parser.add_argument("--max-error-rate", type=float, default=0.0, help="fraction of failed requests (default 0)")
+
+def _check(baseline: dict, current: dict, args):
+    failures = compare(baseline, current, args.max_throughput_drop, args.max_latency_increase, args.max_error_rate)
+    for failure in failures:
+        print(f"REGRESSION {failure}")
+    sys.exit(1 if failures else 0)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run the scenarios")
+    run_parser.add_argument("--transport", choices=["asgi", "uvicorn"], default="asgi")
+    run_parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    run_parser.add_argument("--clients", type=int, default=50, help="concurrent clients per scenario")
+    run_parser.add_argument("--duration", type=float, default=10.0, help="seconds per scenario")
+    run_parser.add_argument("--patients", type=int, default=50)
+    run_parser.add_argument("--logs", type=int, default=200, help="model logs seeded per patient")
+    run_parser.add_argument("--records", type=int, default=5, help="day records seeded per patient")
+    run_parser.add_argument("--sync-db", dest="async_db", action="store_false", help="run with DB_ASYNC=0")
+    run_parser.add_argument("--output", help="write the results as JSON to this file")
+    run_parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+    _add_thresholds(run_parser)
+
+    compare_parser = commands.add_parser("compare", help="compare two JSON results")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    _add_thresholds(compare_parser)
+    args = parser.parse_args()
+
+    if args.command == "compare":
+        with open(args.baseline) as f, open(args.current) as g:
+            _check(json.load(f), json.load(g), args)
+
+    results = run(args)
+    print_results(results)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            _check(json.load(f), results, args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+"""Seed a database with synthetic study data at production scale.
+
+Runs create_db.init_db() on the configured DATABASE_URL and then adds:
+
+  * N patients with study codes in the site-patient pattern (24EIc-003-017),
+  * M day records per patient, one per day of their stay, with reasons and
+    events (and the patient_day_record_events links) filled in,
+  * model and pipeline logs, K per patient on average. Alert volume is
+    skewed (`--skew`: a few hot patients get most of the alerts) and alerts
+    come in bursts; pipeline logs tick at a steady rate with a small set of
+    repeated payloads, as the real pipeline's do.
+
+Rows go in through executemany on the raw connection in chunks, with the
+full-text index dropped during the load and rebuilt in one pass at the end.
+The same --seed gives the same data.
+
+    DATABASE_URL=sqlite:///./bench.db DB_ECHO=0 python -m backend.benchmarks.seed \\
+        --patients 2000 --day-records 14 --logs 2500 --pipeline-logs 2500
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time as timer
+from datetime import date, datetime, timedelta
+from itertools import islice
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from backend.app import fts
+from backend.app.config import get_settings
+from backend.app.create_db import init_db
+from backend.app.database import engine
+from backend.app.dedup import hash_payload
+
+CHUNK_SIZE = 50_000
+
+REASONS = [
+    "Artefact", "Patient movement", "Sensor displacement", "Clinical deterioration", "Sepsis",
+    "Dehydration", "Fever", "Pain", "Medication effect", "Unknown",
+]
+EVENTS = [
+    "Fluid bolus", "Antibiotics started", "Oxygen started", "Transfer to ICU", "Inotropes started",
+    "Blood transfusion", "Intubation", "Seizure", "Death", "Discharge",
+]
+ALERTS = ["Low SpO2", "Tachycardia", "Bradycardia", "Hypotension", "Fever", "Tachypnoea"]
+# (content, raw_content) the pipeline repeats every cycle
+PIPELINE_PAYLOADS = [
+    ("no new data", json.dumps({"status": "idle", "queue": 0})),
+    ("no new data", json.dumps({"status": "waiting", "queue": 0, "sensor": "connected"})),
+    *((f"processed {n} samples", json.dumps({"status": "ok", "samples": n, "dropped": 0})) for n in (60, 120, 240)),
+    ("sensor disconnected", json.dumps({"status": "error", "error": "sensor disconnected", "retry_in": 30})),
+    ("model restarted", json.dumps({"status": "restarted", "reason": "watchdog"})),
+]
+PIPELINE_WEIGHTS = [50, 20, 10, 8, 4, 6, 2]
+
+# SQLite storage formats used by the app's column types
+def _date(value: datetime) -> str:
+    return value.strftime("%Y-%m-%d")
+
+def _time(value: datetime) -> str:
+    return value.strftime("%H:%M:%S.%f")
+
+# Zipf-like weights, shuffled so the hot patients are spread over the ids
+def hot_weights(count: int, skew: float, rng: random.Random) -> list[float]:
+    weights = [1 / (rank + 1) ** skew for rank in range(count)]
+    rng.shuffle(weights)
+    return weights
+
+# Split `total` in proportion to `weights` (largest remainder), summing exactly
+def split(total: int, weights: list[float]) -> list[int]:
+    scale = total / sum(weights)
+    shares = [weight * scale for weight in weights]
+    counts = [int(share) for share in shares]
+    by_remainder = sorted(range(len(shares)), key=lambda i: shares[i] - counts[i], reverse=True)
+    for i in by_remainder[:total - sum(counts)]:
+        counts[i] += 1
+    return counts
+
+# `count` sorted times in [start, start + span) that cluster in bursts of a
+# few alerts a minute or two apart
+def burst_times(rng: random.Random, count: int, start: datetime, span: float) -> list[datetime]:
+    seconds = []
+    while len(seconds) < count:
+        at = rng.uniform(0, span)
+        for _ in range(min(count - len(seconds), 1 + int(rng.expovariate(1 / 5)))):
+            seconds.append(min(at, span - 1))
+            at += rng.expovariate(1 / 90)
+    return [start + timedelta(seconds=second) for second in sorted(seconds)]
+
+def study_codes(count: int, sites: int, rng: random.Random) -> list[str]:
+    per_site = split(count, [rng.uniform(0.5, 1.5) for _ in range(sites)])
+    width = max(3, len(str(max(per_site))))
+    return [f"24EIc-{site + 1:03d}-{number:0{width}d}" for site, total in enumerate(per_site)
+            for number in range(1, total + 1)]
+
+def _names(conn, table: str, column: str, values: list[str]) -> dict[str, int]:
+    conn.executemany(f"INSERT OR IGNORE INTO {table} ({column}) VALUES (?)", [(value,) for value in values])
+    return dict(conn.execute(f"SELECT {column}, id FROM {table}"))
+
+def _next_id(conn, table: str) -> int:
+    return conn.execute(f"SELECT coalesce(max(id), 0) + 1 FROM {table}").fetchone()[0]
+
+def insert_rows(conn, statement: str, rows, chunk_size: int) -> int:
+    inserted = 0
+    rows = iter(rows)
+    while chunk := list(islice(rows, chunk_size)):
+        conn.executemany(statement, chunk)
+        conn.commit()
+        inserted += len(chunk)
+    return inserted
+
+class Seeder:
+    def __init__(self, args):
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.start = datetime.combine(args.start, datetime.min.time())
+
+    def patients(self, conn):
+        rng, args = self.rng, self.args
+        first_id = _next_id(conn, "patients")
+        self.patient_ids = list(range(first_id, first_id + args.patients))
+        stay = timedelta(days=max(args.day_records, 1))
+        latest = max(args.days - stay.days, 0)
+        self.admissions = [self.start + timedelta(days=rng.randint(0, latest), seconds=rng.randint(0, 86399))
+                           for _ in self.patient_ids]
+        self.stay_seconds = stay.total_seconds()
+        # Seeding an already populated database: keep the new study codes unique
+        prefix = f"S{args.seed}-" if first_id > 1 else ""
+        codes = study_codes(args.patients, args.sites, rng)
+        rows = (
+            (patient_id, prefix + code, "".join(rng.choice("ABCDEGHKLMNPQRSTV") for _ in range(rng.randint(2, 3))),
+             rng.randint(1930, 2005), rng.choice(["male", "female"]),
+             "active" if rng.random() < 0.85 else "inactive", "")
+            for patient_id, code in zip(self.patient_ids, codes)
+        )
+        return insert_rows(conn, "INSERT INTO patients (id, study_code, abbreviation_name, year_of_birth, gender, status, summary) "
+                                 "VALUES (?, ?, ?, ?, ?, ?, ?)", rows, args.chunk_size)
+
+    def day_records(self, conn):
+        rng, args = self.rng, self.args
+        reasons = _names(conn, "possible_reasons", "reason", REASONS)
+        events = _names(conn, "events", "event", EVENTS)
+        # Only the names above, not init_db's placeholder rows
+        reason_ids = [reasons[reason] for reason in REASONS]
+        event_ids = {event: events[event] for event in EVENTS}
+        event_names = EVENTS
+        first_id = _next_id(conn, "patient_day_records")
+        links = []
+
+        def rows():
+            record_id = first_id
+            for patient_id, admission in zip(self.patient_ids, self.admissions):
+                for day in range(args.day_records):
+                    alert = admission + timedelta(days=day, minutes=rng.randint(0, 600))
+                    assessment = alert + timedelta(minutes=rng.randint(5, 240))
+                    events = rng.sample(event_names, k=min(len(event_names), int(rng.expovariate(1.5))))
+                    links.extend((record_id, event_ids[name]) for name in events)
+                    yield (
+                        record_id, patient_id, _date(alert), alert.strftime("%H:%M"),
+                        _date(assessment), assessment.strftime("%H:%M"), rng.choice(reason_ids),
+                        rng.randint(0, 7), rng.randint(0, 7),
+                        event_ids[rng.choice(event_names)] if rng.random() < 0.3 else None,
+                        ",".join(events), "Reviewed with the ward team" if rng.random() < 0.2 else None,
+                    )
+                    record_id += 1
+
+        count = insert_rows(conn, "INSERT INTO patient_day_records (id, patient_id, date_of_alert, time_of_alert, "
+                                  "date_of_assessment, time_of_assessment, possible_reason_id, new_information, "
+                                  "expected_alert, event_at_alert_id, event_during_24_hours, notes) "
+                                  "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows(), args.chunk_size)
+        insert_rows(conn, "INSERT INTO patient_day_record_events (record_id, event_id) VALUES (?, ?)", links, args.chunk_size)
+        return count
+
+    def model_logs(self, conn):
+        rng, args = self.rng, self.args
+        counts = split(args.logs * args.patients, hot_weights(args.patients, args.skew, rng))
+
+        def rows():
+            for patient_id, admission, count in zip(self.patient_ids, self.admissions, counts):
+                # Alerts from before the last day of the stay have mostly been seen
+                reviewed_before = admission + timedelta(seconds=self.stay_seconds - 86400)
+                for at in burst_times(rng, count, admission, self.stay_seconds):
+                    alert = rng.choice(ALERTS)
+                    raw = json.dumps({"alert": alert, "spo2": rng.randint(78, 100), "hr": rng.randint(40, 190),
+                                      "rr": rng.randint(8, 50), "temp": round(rng.uniform(35.5, 40.5), 1)})
+                    yield patient_id, _date(at), _time(at), f"{alert} alert", raw, int(at < reviewed_before and rng.random() < 0.95)
+
+        return insert_rows(conn, "INSERT INTO model_log (patient_id, date, time, content, raw_content, ack) "
+                                 "VALUES (?, ?, ?, ?, ?, ?)", rows(), args.chunk_size)
+
+    def pipeline_logs(self, conn):
+        rng, args = self.rng, self.args
+        deduplicate = get_settings().pipeline_log_dedup
+        if deduplicate:
+            conn.executemany("INSERT OR IGNORE INTO log_blobs (hash, content, size, refcount) VALUES (?, ?, ?, 0)",
+                             [(hash_payload(raw), raw, len(raw.encode())) for _, raw in PIPELINE_PAYLOADS])
+        payloads = [(content, "", hash_payload(raw)) if deduplicate else (content, raw, None)
+                    for content, raw in PIPELINE_PAYLOADS]
+
+        def rows():
+            for patient_id, admission in zip(self.patient_ids, self.admissions):
+                interval = self.stay_seconds / max(args.pipeline_logs, 1)
+                for tick in range(args.pipeline_logs):
+                    at = admission + timedelta(seconds=tick * interval + rng.uniform(0, 5))
+                    content, raw, digest = rng.choices(payloads, PIPELINE_WEIGHTS)[0]
+                    yield patient_id, _date(at), _time(at), content, raw, digest
+
+        return insert_rows(conn, "INSERT INTO pipeline_log (patient_id, date, time, content, raw_content, raw_content_hash) "
+                                 "VALUES (?, ?, ?, ?, ?, ?)", rows(), args.chunk_size)
+
+def _timed(label: str, step, conn):
+    started = timer.perf_counter()
+    count = step(conn)
+    elapsed = timer.perf_counter() - started
+    if count is not None:
+        print(f"{label}: {count:,} rows in {elapsed:.1f} s ({count / max(elapsed, 1e-9):,.0f} rows/s)")
+    else:
+        print(f"{label}: {elapsed:.1f} s")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--patients", type=int, default=1000)
+    parser.add_argument("--day-records", type=int, default=14, help="day records per patient (one per day of stay)")
+    parser.add_argument("--logs", type=int, default=1000, help="model logs per patient, on average")
+    parser.add_argument("--pipeline-logs", type=int, default=1000, help="pipeline logs per patient")
+    parser.add_argument("--skew", type=float, default=1.0,
+                        help="Zipf exponent for alerts per patient; 0 spreads them evenly (default 1.0)")
+    parser.add_argument("--sites", type=int, default=5)
+    parser.add_argument("--start", type=date.fromisoformat, default=date(2024, 1, 1), help="first admission date")
+    parser.add_argument("--days", type=int, default=365, help="days over which admissions are spread")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+
+    init_db()
+    seeder = Seeder(args)
+    started = timer.perf_counter()
+    with engine.connect() as connection:
+        fts.drop_search_index(connection)
+        connection.commit()
+        conn = connection.connection.dbapi_connection
+        # Only this load's connection: a crash here leaves a throwaway database
+        conn.execute("PRAGMA synchronous=OFF")
+        _timed("patients", seeder.patients, conn)
+        _timed("day records", seeder.day_records, conn)
+        _timed("model logs", seeder.model_logs, conn)
+        _timed("pipeline logs", seeder.pipeline_logs, conn)
+        _timed("search index", lambda _: fts.create_search_index(connection), conn)
+        _timed("analyze", lambda conn: conn.execute("ANALYZE") and None, conn)
+        connection.commit()
+    print(f"done in {timer.perf_counter() - started:.1f} s")
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,20 @@
+import time
+# Start of the worker's startup time, reported once it is ready
+STARTED = time.perf_counter()
 import sys
 import os
+import asyncio
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from backend.app.database import engine
-from backend.app.models import SQLModel
-from backend.app.routers import patients, options, patient_day_records, logs, model_status
+from fastapi.responses import JSONResponse, PlainTextResponse
+from sqlalchemy.exc import IntegrityError
+from backend.app.database import async_engine
+from backend.app.pagination import NEXT_CURSOR_HEADER
+from backend.app.routers import patients, options, patient_day_records, logs, model_status, stream, export, imports, search, debug
+from backend.app.broadcast import hub
+from backend.app import metrics, startup
+from backend.app.compression import CompressionMiddleware
 
 # Initialize FastAPI app
 app = FastAPI()
@@ -22,12 +30,31 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, "ETag", "X-Options-Version"],
 )
 
-# Create all tables in the database
+# gzip for large responses such as log listings and exports
+app.add_middleware(CompressionMiddleware)
+
+# Per-route latency and SQL counts, served at /metrics
+app.add_middleware(metrics.MetricsMiddleware)
+
+# Create or check the schema (STARTUP_MODE) before taking requests
 @app.on_event("startup")
 async def on_startup():
-    SQLModel.metadata.create_all(engine)
+    await startup.prepare_database(STARTED)
+    # Events found by the watchers are delivered on this loop
+    hub.bind(asyncio.get_running_loop())
+    app.state.heartbeat_watcher = asyncio.create_task(model_status.watch_heartbeats())
+    app.state.model_log_watcher = asyncio.create_task(stream.watch_model_logs())
+
+# Close pooled aiosqlite connections before the event loop goes away
+@app.on_event("shutdown")
+async def on_shutdown():
+    app.state.heartbeat_watcher.cancel()
+    app.state.model_log_watcher.cancel()
+    if async_engine is not None:
+        await async_engine.dispose()
 
 # Custom ValidationError handler
 @app.exception_handler(HTTPException)
@@ -37,6 +64,19 @@ async def validation_exception_handler(request: Request, exc: HTTPException):
         content={"detail": exc.detail},
     )
 
+# Constraint violations the routers don't check for first: 409 when a unique
+# value is taken, 422 when the request refers to a row that doesn't exist.
+# The session dependency rolls the transaction back as it closes.
+@app.exception_handler(IntegrityError)
+async def integrity_error_handler(request: Request, exc: IntegrityError):
+    message = str(exc.orig)
+    if message.startswith("UNIQUE constraint failed: "):
+        fields = [column.split(".")[-1] for column in message.removeprefix("UNIQUE constraint failed: ").split(", ")]
+        return JSONResponse(status_code=409, content={"detail": f"{', '.join(fields)} already in use"})
+    if message.startswith("FOREIGN KEY constraint failed"):
+        return JSONResponse(status_code=422, content={"detail": "Refers to a record that does not exist"})
+    return JSONResponse(status_code=422, content={"detail": message})
+
 # Include the routers
 app.include_router(patients.router, prefix="/api/patients", tags=["patients"])
 app.include_router(logs.router, prefix="/api/logs", tags=["logs"])
@@ -44,6 +84,16 @@ app.include_router(patient_day_records.router, prefix="/api/patient-day-records"
 app.include_router(options.router, prefix="/api/options", tags=["options"])
 
 app.include_router(model_status.router, prefix="/api/model", tags=["model"])
+app.include_router(stream.router, prefix="/api/stream", tags=["stream"])
+app.include_router(export.router, prefix="/api/export", tags=["export"])
+app.include_router(imports.router, prefix="/api/import", tags=["import"])
+app.include_router(search.router, prefix="/api/search", tags=["search"])
+app.include_router(debug.router, prefix="/api/debug", tags=["debug"])
+
+# Prometheus scrape endpoint
+@app.get("/metrics", include_in_schema=False)
+def get_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
 # Root endpoint
 @app.get("/")
@@ -73,7 +73,8 @@ function DayRecordForm({ patientId, recordData, onSave }) {
       // const url = recordData ? `patient-day-records/${recordData.id}` : 'patient-day-records/';
           // Check if this is an existing record (not from log selection)
     const isExistingRecord = recordData && !recordData.isNewRecord;
-    const method = isExistingRecord ? api.put : api.post;
+    // Existing records send their version; the server answers 409 if it is stale
+    const method = isExistingRecord ? api.patch : api.post;
     const url = isExistingRecord ? `patient-day-records/${recordData.id}` : 'patient-day-records/';
 
       const response = await method(url, { ...formData, patient_id: patientId });
@@ -93,6 +94,9 @@ function DayRecordForm({ patientId, recordData, onSave }) {
         event_during_24_hours: '',
       });
     } catch (error) {
+      if (error.response && error.response.status === 409) {
+        alert('This record was changed by someone else. Reopen it to see their changes.');
+      }
       console.error('Error saving day record:', error);
     }
   };
@@ -4,7 +4,7 @@ import { Button, Box, IconButton, Switch, FormControlLabel, CircularProgress } f
 import { Link } from 'react-router-dom';
 import { Edit, Delete } from '@mui/icons-material';
 import PatientForm from '../components/PatientForm';
-import api from '../services/api';
+import api, { getAllPages, openEventStream } from '../services/api';
 
 function HomePage() {
   const [patients, setPatients] = useState([]);
@@ -20,36 +20,46 @@ function HomePage() {
     fetchEmailMode();
     checkModelStatus();
 
-      // Set up polling interval for model status
-    const statusInterval = setInterval(checkModelStatus, 10000); // Check every 10 seconds
+    // Model status changes are pushed by the backend instead of polled
+    const events = openEventStream();
+    events.addEventListener('model_status', (event) => {
+      const status = JSON.parse(event.data);
+      if (status.name === 'model') {
+        applyModelStatus(status.running);
+      }
+    });
 
-    // Cleanup interval on unmount
-    return () => clearInterval(statusInterval);
+    // Close the stream on unmount
+    return () => events.close();
   }, []);
 
   const fetchPatients = () => {
-    api.get('patients/')
-      .then((response) => {
-        setPatients(response.data);
+    // Patients with their unacknowledged alerts, last alert and day record count
+    getAllPages('patients/stats')
+      .then((data) => {
+        setPatients(data);
       })
       .catch((error) => {
         console.error('Error fetching patients:', error);
       });
   };
 
+  const applyModelStatus = (currentStatus) => {
+    setModelStatus(currentStatus);
+
+    // Clear loading state if target status is reached or cleared
+    if (targetStatus === null || currentStatus === targetStatus) {
+      setTargetStatus(null);
+      setIsModelLoading(false);
+    }
+  };
+
   // Check model status from backend
   const checkModelStatus = async () => {
     try {
       const response = await api.get('model/status');
       if (response.data) {
-        const currentStatus = response.data.running;
-        setModelStatus(currentStatus);
-
-        // Clear loading state if target status is reached or cleared
-        if (targetStatus === null || currentStatus === targetStatus) {
-          setTargetStatus(null);
-          setIsModelLoading(false);
-        }
+        applyModelStatus(response.data.running);
       }
     } catch (error) {
       console.error('Error checking model status:', error);
@@ -148,9 +158,15 @@ function HomePage() {
     );
 
     // Send API request to update status
-    api.put(`patients/${id}`, { ...currentPatient, status: newStatus })
-      .then(() => {
+    api.patch(`patients/${id}`, { version: currentPatient.version, status: newStatus })
+      .then((response) => {
         console.log(`Patient ${id} status updated to ${newStatus}`);
+        // Keep the new version for the next change
+        setPatients((prevPatients) =>
+          prevPatients.map((patient) =>
+            patient.id === id ? { ...patient, version: response.data.version } : patient
+          )
+        );
       })
       .catch((error) => {
         console.error(`Error updating patient ${id} status:`, error);
@@ -207,6 +223,14 @@ function HomePage() {
     { field: 'abbreviation_name', headerName: 'Initials', width: 150 },
     { field: 'year_of_birth', headerName: 'Year of Birth', width: 130 },
     { field: 'gender', headerName: 'Gender', width: 100 },
+    { field: 'unacked_alerts', headerName: 'Unacked Alerts', type: 'number', width: 130 },
+    {
+      field: 'last_alert',
+      headerName: 'Last Alert',
+      width: 180,
+      valueFormatter: (value) => (value ? value.replace('T', ' ') : ''),
+    },
+    { field: 'day_record_count', headerName: 'Day Records', type: 'number', width: 120 },
     {
       field: 'status',
       headerName: 'Status',
@@ -1,6 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import { useParams, useNavigate } from 'react-router-dom';
-import api from '../services/api';
+import api, { openEventStream } from '../services/api';
 import { DataGrid, GridToolbar } from '@mui/x-data-grid';
 import {
   Button,
@@ -32,67 +32,81 @@ function PatientPage() {
   const [recordToDelete, setRecordToDelete] = useState(null);
 
   const [modelLogs, setModelLogs] = useState([]);
+  // Cursor of the next older page of model logs; null once they are all loaded
+  const [modelLogsCursor, setModelLogsCursor] = useState(null);
   const [selectedLog, setSelectedLog] = useState('');
-  const [possibleReasons, setPossibleReasons] = useState({});
 
 
   useEffect(() => {
-    // Fetch patient details
-    api.get(`patients/${patientId}`)
-      .then((response) => setPatient(response.data))
-      .catch((error) => console.error('Error fetching patient details:', error));
+    // Fetch the patient, day records and model logs in one request
+    fetchDashboard();
 
-    fetchPossibleReasons(); // Fetch possible reasons once
-    // // Fetch patient's day records
-    // fetchDayRecords();
-    // Fetch model logs
-    fetchModelLogs();
+    // Add a new model log to the list as soon as the backend reports it;
+    // acks don't say which logs, so reload the newest ones then
+    const events = openEventStream([patientId]);
+    events.addEventListener('model_log', (event) => addModelLogs([JSON.parse(event.data)], true));
+    events.addEventListener('model_log_ack', () => fetchModelLogs());
+    return () => events.close();
   }, [patientId]);
 
-  useEffect(() => {
-    if (Object.keys(possibleReasons).length > 0) {
-      fetchDayRecords(); // Fetch day records only after possibleReasons is set
-    }
-  }, [possibleReasons]); // Runs when possibleReasons updates
+  // Combine date & time fields and show the resolved reason name
+  const transformDayRecords = (records) =>
+    records.map((record) => ({
+      ...record,
+      alert_datetime: `${record.date_of_alert} ${record.time_of_alert}`,
+      assessment_datetime: `${record.date_of_assessment} ${record.time_of_assessment}`,
+      reason: record.possible_reason_name || "Unknown",
+    }));
+
+  // Merge logs into the list by id, new ones first or older ones last
+  const addModelLogs = (logs, newest = false) =>
+    setModelLogs((current) => {
+      const known = new Set(current.map((log) => log.id));
+      const added = logs.filter((log) => !known.has(log.id));
+      return newest ? [...added, ...current] : [...current, ...added];
+    });
 
-  const fetchPossibleReasons = () => {
-    api.get(`options/possible-reasons/`) // Adjust the endpoint if needed
+  const fetchDashboard = () => {
+    api.get(`patients/${patientId}/dashboard`)
       .then((response) => {
-        const reasonMap = response.data.reduce((acc, reason) => {
-          acc[reason.id] = reason.reason; // Store { id: reasonText }
-          return acc;
-        }, {});
-        setPossibleReasons(reasonMap);
+        setPatient(response.data.patient);
+        setDayRecords(transformDayRecords(response.data.day_records));
+        // The newest logs and every unacknowledged one; older pages load on demand
+        setModelLogs([...response.data.model_logs]);
+        setModelLogsCursor(response.data.model_logs_next_cursor || null);
       })
-      .catch((error) => console.error('Error fetching possible reasons:', error));
+      .catch((error) => console.error('Error fetching patient dashboard:', error));
   };
 
   const fetchDayRecords = () => {
-    api.get(`patient-day-records/?patient_id=${patientId}`)
-      .then((response) => {
-        // Transform the response data to combine date & time fields
-        const transformedData = response.data.map((record) => ({
-          ...record,
-          alert_datetime: `${record.date_of_alert} ${record.time_of_alert}`,
-          assessment_datetime: `${record.date_of_assessment} ${record.time_of_assessment}`,
-          reason: possibleReasons[record.possible_reason_id] || "Unknown",
-        }));
-        setDayRecords(transformedData);
-      })
-      .catch((error) => {
-        console.error('Error fetching day records:', error);
-        if (error.response?.status === 404) {
-          console.error('No records found for this patient');
-        }
-      });
+    api.get(`patients/${patientId}/dashboard`)
+      .then((response) => setDayRecords(transformDayRecords(response.data.day_records)))
+      .catch((error) => console.error('Error fetching day records:', error));
   };
 
+  // Reload the newest logs and the unacknowledged ones, as the dashboard has them
   const fetchModelLogs = () => {
-    api.get(`logs/model_log/${patientId}`)
-      .then((response) => setModelLogs([...response.data])) // Update to force new reference
+    api.get(`patients/${patientId}/dashboard`)
+      .then((response) => {
+        setModelLogs([...response.data.model_logs]);
+        setModelLogsCursor(response.data.model_logs_next_cursor || null);
+      })
       .catch((error) => console.error('Error fetching model logs:', error));
   };
 
+  // Load the next page of older logs; raw_content is never shown here, so
+  // leave it out of the response
+  const fetchOlderModelLogs = () => {
+    api.get(`logs/model_log/${patientId}`, {
+      params: { fields: 'id,patient_id,date,time,content,ack', limit: 100, cursor: modelLogsCursor },
+    })
+      .then((response) => {
+        addModelLogs(response.data);
+        setModelLogsCursor(response.headers['x-next-cursor'] || null);
+      })
+      .catch((error) => console.error('Error fetching older model logs:', error));
+  };
+
   const handleDialogOpen = (record = null) => {
     setCurrentRecord(record);
     setIsDialogOpen(true);
@@ -109,39 +123,22 @@ function PatientPage() {
     }
   };
 
-  const handleSaveRecord = (record) => {
-    const isNew = !record.id; // Check if the record is new
-    const method = isNew ? api.post : api.put;
-    const url = isNew
-      ? `patient-day-records/`
-      : `patient-day-records/${record.id}`;
+  // DayRecordForm has already saved the record; refresh and tidy up here
+  const handleSaveRecord = () => {
+    fetchDayRecords(); // Refetch the records after saving
 
-    // Add patient_id for new records explicitly
-    const payload = isNew ? { ...record, patient_id: patientId } : record;
+    // If this was created from a log, update the log's ack status
+    if (selectedLog) {
+      api.post('logs/model_log/ack', { ids: [selectedLog] })
+        .then(() => {
+          // Update the dropdown without reloading the logs
+          setModelLogs((logs) => logs.map((log) => (log.id === selectedLog ? { ...log, ack: true } : log)));
+          setSelectedLog(''); // Reset the selected log
+        })
+        .catch((error) => console.error('Error updating log status:', error));
+    }
 
-    method(url, payload)
-    .then((response) => {
-      fetchDayRecords(); // Refetch the records after saving
-      
-      // If this was created from a log, update the log's ack status
-      if (selectedLog) {
-        api.put(`logs/model_log/${selectedLog}`, { ack: true })
-          .then(() => {
-            fetchModelLogs(); // Refetch logs to update the dropdown
-            setSelectedLog(''); // Reset the selected log
-          })
-          .catch((error) => console.error('Error updating log status:', error));
-      }
-      
-      handleDialogClose();
-    })
-    .catch((error) => console.error('Error saving day record:', error));
-    // method(url, payload)
-    //   .then((response) => {
-    //     fetchDayRecords(); // Refetch the records after saving
-    //     handleDialogClose();
-    //   })
-    //   .catch((error) => console.error('Error saving day record:', error));
+    handleDialogClose();
   };
 
   const handleDeleteRecord = (recordId) => {
@@ -344,6 +341,11 @@ function PatientPage() {
               ))} */}
             </Select>
           </FormControl>
+          {modelLogsCursor && (
+            <Button onClick={fetchOlderModelLogs} sx={{ mb: 2, ml: 1 }}>
+              Load older alerts
+            </Button>
+          )}
           
           
           <Box mt={4} sx={{ height: 'auto', width: '100%', position: 'relative' }}>
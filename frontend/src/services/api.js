@@ -1,7 +1,7 @@
 import axios from 'axios';
 
 // Set base URL for the API
-const API_BASE_URL = 'http://localhost:8080/api'; // Backend base URL
+export const API_BASE_URL = 'http://localhost:8080/api'; // Backend base URL
 
 const api = axios.create({
   baseURL: API_BASE_URL,
@@ -9,11 +9,30 @@ const api = axios.create({
 
 export default api;
 
+// Fetch every page of a cursor-paginated list endpoint.
+// The backend returns the cursor of the next page in the X-Next-Cursor header.
+export const getAllPages = async (url, params = {}) => {
+  const items = [];
+  let cursor;
+  do {
+    const response = await api.get(url, { params: { ...params, cursor } });
+    items.push(...response.data);
+    cursor = response.headers['x-next-cursor'];
+  } while (cursor);
+  return items;
+};
+
+// Open the server-sent event stream of model status changes and new model logs.
+// Pass patient ids to only receive model logs for those patients.
+export const openEventStream = (patientIds = []) => {
+  const query = patientIds.map((id) => `patient_id=${encodeURIComponent(id)}`).join('&');
+  return new EventSource(`${API_BASE_URL}/stream/${query ? `?${query}` : ''}`);
+};
+
 // Fetch all patients
 export const getPatients = async () => {
   try {
-    const response = await api.get('patients/');
-    return response.data;
+    return await getAllPages('patients/');
   } catch (error) {
     console.error('Error fetching patients:', error);
     throw error;
@@ -34,9 +53,9 @@ export const getPatient = async (id) => {
 // Fetch all day records for a specific patient
 export const getDayRecords = async (patientId) => {
   try {
-    const response = await api.get(`patient-day-records/?patient_id=${patientId}`);
+    const records = await getAllPages('patient-day-records/', { patient_id: patientId });
     // Add unique `id` property to each record if not present
-    return response.data.map((record) => ({
+    return records.map((record) => ({
       id: record.id || `${record.patient_id}-${record.date_of_alert}-${record.time_of_alert}`, // Fallback if no id
       ...record,
     }));